@@ -10,9 +10,12 @@ load_dotenv()
 REPO_URL = os.getenv('REPO_URL', 'https://github.com/Yaotzinohell/LEETCODE_Solutions.git')
 REPO_BRANCH = os.getenv('REPO_BRANCH', 'dev')
 REPO_LOCAL_PATH = os.getenv('REPO_LOCAL_PATH', './repo_clone')
+# Several branches/repositories from one process: 'url#branch, url2#branch2' (branch defaults to REPO_BRANCH).
+# Each target is cloned under REPO_LOCAL_PATH and tracked in its own namespaced tracker file.
+REPO_TARGETS = os.getenv('REPO_TARGETS', '')
 
 # AI Provider Configuration
-AI_PROVIDER = os.getenv('AI_PROVIDER', 'openai')  # 'openai', 'anthropic', 'groq', 'ollama'
+AI_PROVIDER = os.getenv('AI_PROVIDER', 'openai')  # 'openai', 'anthropic', 'groq', 'ollama' or a fallback list like 'groq,openai,ollama'
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
@@ -35,6 +38,18 @@ EMAIL_SENDER = os.getenv('EMAIL_SENDER')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD')
 EMAIL_SMTP_SERVER = os.getenv('EMAIL_SMTP_SERVER', 'smtp.gmail.com')
 EMAIL_SMTP_PORT = int(os.getenv('EMAIL_SMTP_PORT', 587))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'true').lower() == 'true'  # STARTTLS; disable for a local test server
+EMAIL_BACKGROUND_SEND = os.getenv('EMAIL_BACKGROUND_SEND', 'true').lower() == 'true'  # queue mail for a sender thread
+EMAIL_QUEUE_SIZE = int(os.getenv('EMAIL_QUEUE_SIZE', 100))
+EMAIL_MAX_RETRIES = int(os.getenv('EMAIL_MAX_RETRIES', 3))
+EMAIL_IDLE_TIMEOUT_SECONDS = float(os.getenv('EMAIL_IDLE_TIMEOUT_SECONDS', 60))  # close the SMTP session when idle
+
+# Notification Mode: 'per_commit' (one email per folder per commit) or 'digest' (one email per author)
+NOTIFICATION_MODE = os.getenv('NOTIFICATION_MODE', 'per_commit').lower()
+DIGEST_MAX_ISSUES = int(os.getenv('DIGEST_MAX_ISSUES', 50))  # send an author's digest once it holds this many issues
+DIGEST_MAX_COMMITS = int(os.getenv('DIGEST_MAX_COMMITS', 20))  # ...or covers this many commits
+DIGEST_WINDOW_SECONDS = float(os.getenv('DIGEST_WINDOW_SECONDS', 0))  # 0: send at the end of each run
+DIGEST_STATE_FILE = os.getenv('DIGEST_STATE_FILE', './data/pending_digests.json')  # survives restarts
 
 # Analysis Configuration
 SUPPORTED_LANGUAGES = {
@@ -57,8 +72,71 @@ LOG_FILE = os.getenv('LOG_FILE', './logs/code_analyzer.log')
 
 # Tracking Configuration
 TRACKED_COMMITS_FILE = os.getenv('TRACKED_COMMITS_FILE', './data/analyzed_commits.json')
+TRACKING_BACKEND = os.getenv('TRACKING_BACKEND', 'sqlite')  # 'sqlite' or 'json'
+TRACKED_COMMITS_DB = os.getenv('TRACKED_COMMITS_DB', './data/analyzed_commits.db')
+TRACKER_BATCH_SIZE = max(1, int(os.getenv('TRACKER_BATCH_SIZE', 10)))  # commits per tracker write
 
 # Analysis Configuration
 CHECK_QN_FILE = os.getenv('CHECK_QN_FILE', 'false').lower() == 'true'
 MAX_FILE_SIZE_BYTES = int(os.getenv('MAX_FILE_SIZE_BYTES', 50000))  # 50KB limit for AI analysis
+CHUNKING_ENABLED = os.getenv('CHUNKING_ENABLED', 'true').lower() == 'true'  # split larger files
+CHUNK_MAX_TOKENS = int(os.getenv('CHUNK_MAX_TOKENS', 3000))
+CHUNK_OVERLAP_LINES = int(os.getenv('CHUNK_OVERLAP_LINES', 10))
+MAX_CHUNKED_FILE_SIZE_BYTES = int(os.getenv('MAX_CHUNKED_FILE_SIZE_BYTES', 500000))  # hard limit
 AI_TIMEOUT_SECONDS = int(os.getenv('AI_TIMEOUT_SECONDS', 60))
+AI_MAX_OUTPUT_TOKENS = int(os.getenv('AI_MAX_OUTPUT_TOKENS', 1024))  # reserved from the context window
+AI_STREAM_RESPONSES = os.getenv('AI_STREAM_RESPONSES', 'false').lower() == 'true'  # stop once the JSON answer closes
+AI_STRUCTURED_OUTPUT = os.getenv('AI_STRUCTURED_OUTPUT', 'true').lower() == 'true'  # provider JSON mode
+AI_PROMPT_CACHING = os.getenv('AI_PROMPT_CACHING', 'false').lower() == 'true'  # only pays off above ~1024 prefix tokens
+ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'full').lower()  # 'full', 'diff' or 'auto' (picked per file)
+DIFF_CONTEXT_LINES = int(os.getenv('DIFF_CONTEXT_LINES', 5))
+DIFF_CONTEXT_MODE = os.getenv('DIFF_CONTEXT_MODE', 'lines').lower()  # 'lines' or 'function'
+
+# Analysis Cache Configuration
+ANALYSIS_CACHE_ENABLED = os.getenv('ANALYSIS_CACHE_ENABLED', 'true').lower() == 'true'
+ANALYSIS_CACHE_FILE = os.getenv('ANALYSIS_CACHE_FILE', './data/analysis_cache.db')
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 5000))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+# Checkpoint Journal (per-file results of unfinished commits, reused after a crash or restart)
+CHECKPOINT_ENABLED = os.getenv('CHECKPOINT_ENABLED', 'true').lower() == 'true'
+CHECKPOINT_JOURNAL_FILE = os.getenv('CHECKPOINT_JOURNAL_FILE', './data/analysis_journal.jsonl')
+
+# Concurrency Configuration
+ANALYSIS_EXECUTION_MODE = os.getenv('ANALYSIS_EXECUTION_MODE', 'sequential').lower()  # 'sequential', 'threaded' or 'async'
+ANALYSIS_MAX_WORKERS = int(os.getenv('ANALYSIS_MAX_WORKERS', 8))
+
+# Commit Pipeline Configuration (extract -> analyze -> aggregate -> notify -> record, bounded queues in between)
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 4))  # commits waiting in front of each stage
+PIPELINE_EXTRACT_WORKERS = int(os.getenv('PIPELINE_EXTRACT_WORKERS', 1))  # git blob reads
+PIPELINE_ANALYSIS_WORKERS = int(os.getenv('PIPELINE_ANALYSIS_WORKERS', 2))  # commits analyzed at once
+PIPELINE_NOTIFY_WORKERS = int(os.getenv('PIPELINE_NOTIFY_WORKERS', 1))  # concurrent email sends
+
+# Batch Analysis Configuration (pack small files from one commit into one prompt)
+BATCH_ANALYSIS_ENABLED = os.getenv('BATCH_ANALYSIS_ENABLED', 'false').lower() == 'true'
+BATCH_MAX_TOKENS = int(os.getenv('BATCH_MAX_TOKENS', 6000))
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', 8))
+BATCH_SMALL_FILE_TOKENS = int(os.getenv('BATCH_SMALL_FILE_TOKENS', 1500))
+
+# Daemon Configuration (python -m src.main --daemon)
+DAEMON_POLL_INTERVAL_SECONDS = float(os.getenv('DAEMON_POLL_INTERVAL_SECONDS', 60))  # between `git ls-remote` checks
+
+# Webhook Configuration (python -m src.main --webhook)
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8085))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # GitHub webhook secret / GitLab secret token
+
+# Metrics Configuration (latency histograms, counters and token usage per stage)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_REPORT_FILE = os.getenv('METRICS_REPORT_FILE', './data/metrics_report.json')  # JSON report after each run
+METRICS_PROMETHEUS_FILE = os.getenv('METRICS_PROMETHEUS_FILE', '')  # Prometheus text file, rewritten after each run
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # serve /metrics in daemon and webhook mode; 0 disables
+
+# Tracing Configuration (spans per run, commit, file, provider call and parse)
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+TRACE_EXPORTER = os.getenv('TRACE_EXPORTER', 'jsonl').lower()  # 'jsonl' or 'otlp'
+TRACE_FILE = os.getenv('TRACE_FILE', './logs/traces.jsonl')
+OTLP_ENDPOINT = os.getenv('OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')  # OTLP/HTTP (JSON) collector
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'code-analyzer')
@@ -2,29 +2,100 @@
 Constants for AI Code Analyzer
 """
 
+# Prompts keep the static instructions first and the variable input last, after
+# PROMPT_INPUT_MARKER, so providers can cache the shared prefix across calls
+PROMPT_INPUT_MARKER = "### Input"
+
 # AI Analysis Prompt
-AI_CODE_ANALYSIS_PROMPT = """You are an expert code reviewer. Analyze the following code and identify:
+AI_CODE_ANALYSIS_PROMPT = """You are an expert code reviewer. Analyze the code given at the end of this prompt and
+identify:
 1. Logic errors or potential bugs
 2. Performance issues
 3. Security vulnerabilities
 4. Code quality problems
 5. Best practice violations
 
+Provide a detailed analysis in JSON format with this structure:
+{{
+    "has_errors": boolean,
+    "severity": "critical" | "high" | "medium" | "low" | "none",
+    "errors": [
+        {{
+            "line": number or null,
+            "type": string (e.g., "logic_error", "security_issue", "performance", "best_practice"),
+            "severity": "critical" | "high" | "medium" | "low",
+            "message": string,
+            "suggestion": string
+        }}
+    ],
+    "summary": string
+}}
+
+Be thorough but concise. Focus on actual issues, not stylistic preferences.
+
+### Input
+File: {file_path}
+Language: {language}
+
 Code:
 ```{language}
 {code}
-```
+```"""
+
+# Diff-only Analysis Prompt (excerpts around the lines changed by a commit)
+AI_DIFF_ANALYSIS_PROMPT = """You are an expert code reviewer. A commit changed the lines marked with "+" in the
+excerpts given at the end of this prompt. Each excerpt line is prefixed with its line number in the file,
+and "..." separates non-adjacent excerpts. Analyze the changed code (using the surrounding lines as
+context) and identify:
+1. Logic errors or potential bugs
+2. Performance issues
+3. Security vulnerabilities
+4. Code quality problems
+5. Best practice violations
 
+Provide a detailed analysis in JSON format with this structure:
+{{
+    "has_errors": boolean,
+    "severity": "critical" | "high" | "medium" | "low" | "none",
+    "errors": [
+        {{
+            "line": number or null (use the line numbers shown in the excerpts),
+            "type": string (e.g., "logic_error", "security_issue", "performance", "best_practice"),
+            "severity": "critical" | "high" | "medium" | "low",
+            "message": string,
+            "suggestion": string
+        }}
+    ],
+    "summary": string
+}}
+
+Be thorough but concise. Focus on actual issues in the changed code, not stylistic preferences.
+
+### Input
 File: {file_path}
 Language: {language}
 
+Excerpts:
+```{language}
+{code}
+```"""
+
+# Chunk Analysis Prompt (one part of a file too large to send whole)
+AI_CHUNK_ANALYSIS_PROMPT = """You are an expert code reviewer. The code given at the end of this prompt is one part of
+a large file. Each line is prefixed with its line number in the file. Analyze this part and identify:
+1. Logic errors or potential bugs
+2. Performance issues
+3. Security vulnerabilities
+4. Code quality problems
+5. Best practice violations
+
 Provide a detailed analysis in JSON format with this structure:
 {{
     "has_errors": boolean,
     "severity": "critical" | "high" | "medium" | "low" | "none",
     "errors": [
         {{
-            "line": number or null,
+            "line": number or null (use the line numbers shown),
             "type": string (e.g., "logic_error", "security_issue", "performance", "best_practice"),
             "severity": "critical" | "high" | "medium" | "low",
             "message": string,
@@ -34,7 +105,80 @@ Provide a detailed analysis in JSON format with this structure:
     "summary": string
 }}
 
-Be thorough but concise. Focus on actual issues, not stylistic preferences."""
+Be thorough but concise. Focus on actual issues, not stylistic preferences. Do not report code that
+is merely cut off at the start or end of this part.
+
+### Input
+File: {file_path}
+Language: {language}
+Part {chunk_index} of {chunk_count} (lines {start_line}-{end_line})
+
+Code:
+```{language}
+{code}
+```"""
+
+# Batch Analysis Prompt (several small files from one commit in a single request)
+AI_BATCH_ANALYSIS_PROMPT = """You are an expert code reviewer. Analyze each of the files given at the end of this
+prompt independently and identify for each one:
+1. Logic errors or potential bugs
+2. Performance issues
+3. Security vulnerabilities
+4. Code quality problems
+5. Best practice violations
+
+Respond with a JSON object whose "files" array contains exactly one object per file, in this structure:
+{{
+    "files": [
+        {{
+            "file": string (the file path exactly as given),
+            "has_errors": boolean,
+            "severity": "critical" | "high" | "medium" | "low" | "none",
+            "errors": [
+                {{
+                    "line": number or null,
+                    "type": string (e.g., "logic_error", "security_issue", "performance", "best_practice"),
+                    "severity": "critical" | "high" | "medium" | "low",
+                    "message": string,
+                    "suggestion": string
+                }}
+            ],
+            "summary": string
+        }}
+    ]
+}}
+
+Be thorough but concise. Focus on actual issues, not stylistic preferences.
+
+### Input
+{count} files:
+
+{files}"""
+
+AI_BATCH_FILE_TEMPLATE = """File: {file_path}
+Language: {language}
+```{language}
+{code}
+```"""
+
+# Model Context Limits (tokens), matched by longest model-name prefix
+MODEL_CONTEXT_LIMITS = {
+    'gpt-4o': {'context': 128000, 'max_output': 16384},
+    'gpt-4-turbo': {'context': 128000, 'max_output': 4096},
+    'gpt-4': {'context': 8192, 'max_output': 4096},
+    'gpt-3.5-turbo': {'context': 16385, 'max_output': 4096},
+    'claude-3-5': {'context': 200000, 'max_output': 8192},
+    'claude-3': {'context': 200000, 'max_output': 4096},
+    'claude': {'context': 200000, 'max_output': 4096},
+    'mixtral-8x7b-32768': {'context': 32768, 'max_output': 4096},
+    'llama-3.3-70b-versatile': {'context': 128000, 'max_output': 32768},
+    'llama-3.1': {'context': 128000, 'max_output': 8192},
+    'llama3': {'context': 8192, 'max_output': 4096},
+    'gemma': {'context': 8192, 'max_output': 4096},
+    'mistral': {'context': 8192, 'max_output': 4096},
+    'codellama': {'context': 16384, 'max_output': 4096},
+}
+DEFAULT_MODEL_CONTEXT_LIMITS = {'context': 8192, 'max_output': 2048}
 
 # Error Severity Levels
 SEVERITY_CRITICAL = 'critical'
@@ -6,16 +6,42 @@ import os
 import json
 import logging
 import asyncio
+import inspect
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
+
+from src.metrics import get_metrics
+from src.rate_limiter import get_rate_limiter, is_retryable_error
+from src.response_parser import JsonStreamScanner, extract_json, parse_analysis
+from src.token_budget import TokenBudget, UsageTotals
+from src.tracing import current_span, get_tracer, propagate
 
 logger = logging.getLogger(__name__)
 
+# Per-provider limits on concurrent in-flight requests, shared by all instances
+_provider_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_provider_semaphores_lock = threading.Lock()
+
+
+def get_provider_semaphore(provider: str, max_in_flight: int) -> threading.BoundedSemaphore:
+    """Get (or create) the shared in-flight semaphore for a provider"""
+    with _provider_semaphores_lock:
+        if provider not in _provider_semaphores:
+            _provider_semaphores[provider] = threading.BoundedSemaphore(max(1, max_in_flight))
+        return _provider_semaphores[provider]
+
 
 class AICodeAnalyzer:
     """Abstract base class for AI code analyzers"""
     
-    def __init__(self):
+    provider_name = 'base'
+    display_name = 'AI'
+    client_error = 'AI client not initialized'
+    
+    def __init__(self, cache=None, max_in_flight: int = 4):
         self.supported_languages = {
             '.py': 'python',
             '.js': 'javascript',
@@ -29,13 +55,730 @@ class AICodeAnalyzer:
             '.php': 'php',
             '.swift': 'swift'
         }
+        self.model = None
+        self.cache = cache
+        self.rate_limiter = None
+        self.max_in_flight = max_in_flight
+        self.max_file_size = 50000
+        self.analysis_mode = 'full'
+        self.diff_context_lines = 5
+        self.diff_enclosing_function = False
+        self.chunking_enabled = True
+        self.chunk_max_tokens = 3000
+        self.chunk_overlap_lines = 10
+        self.max_chunked_file_size = 500000
+        self.max_output_tokens = 1024
+        self.stream_responses = False
+        self.structured_output = False
+        self.prompt_caching = False
+        self._token_budget = None
+        self._token_budget_key = None
+        self.usage_totals = UsageTotals()
+        self.batch_enabled = False
+        self.batch_max_tokens = 6000
+        self.batch_max_files = 8
+        self.batch_small_file_tokens = 1500
+    
+    def analyze_file(self, file_path: str, content: Optional[str] = None,
+                     blob_sha: Optional[str] = None, changed_lines: Optional[List] = None) -> Dict:
+        """Analyze a single file.
+        
+        When content is given (e.g. read from a git blob) the file is not
+        touched on disk; otherwise it is read from file_path. changed_lines
+        ([(start, end), ...]) enables diff-only analysis in 'diff' mode.
+        """
+        try:
+            if content is None:
+                content = self._read_file_content(file_path)
+            result, request = self._prepare_analysis(file_path, content, blob_sha, changed_lines)
+            if result is not None:
+                return result
+            
+            return self._run_single(file_path, request)
+            
+        except Exception as e:
+            return self._error_result(file_path, e)
+    
+    async def analyze_file_async(self, file_path: str, content: Optional[str] = None,
+                                 blob_sha: Optional[str] = None, changed_lines: Optional[List] = None) -> Dict:
+        """Analyze a single file without blocking the event loop"""
+        try:
+            if content is None:
+                content = await asyncio.to_thread(self._read_file_content, file_path)
+            result, request = self._prepare_analysis(file_path, content, blob_sha, changed_lines)
+            if result is not None:
+                return result
+            
+            return await self._run_single_async(file_path, request)
+            
+        except Exception as e:
+            return self._error_result(file_path, e)
+    
+    def analyze_files_batch(self, files: List[Dict],
+                            on_result: Callable[[int, Dict], None] = None) -> List[Dict]:
+        """Analyze several files, packing small ones into shared prompts.
+        
+        files are dicts with 'file_path' and optional 'content', 'blob_sha'
+        and 'changed_lines'. Results come back in the same order.
+        on_result(index, result) is called (from a worker thread) for each
+        file as soon as its batch or request finishes.
+        """
+        results, singles, batches = self._plan_batches(files)
+        if on_result:
+            for index, result in results.items():
+                on_result(index, result)
+        
+        def run(job):
+            kind, payload = job
+            if kind == 'batch':
+                job_results = self._analyze_batch(payload)
+            else:
+                index, file_path, request = payload
+                job_results = [(index, self._run_single(file_path, request))]
+            if on_result:
+                for index, result in job_results:
+                    on_result(index, result)
+            return job_results
+        
+        jobs = [('batch', batch) for batch in batches] + [('single', single) for single in singles]
+        workers = max(1, min(len(jobs), self.max_in_flight))
+        if jobs:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch') as executor:
+                for job_results in executor.map(propagate(run), jobs):
+                    for index, result in job_results:
+                        results[index] = result
+        return [results[index] for index in range(len(files))]
+    
+    async def analyze_files_batch_async(self, files: List[Dict], on_result: Callable = None) -> List[Dict]:
+        """Async variant of analyze_files_batch; on_result is a coroutine function"""
+        results, singles, batches = self._plan_batches(files)
+        if on_result:
+            for index, result in results.items():
+                await on_result(index, result)
+        
+        async def run_single(index, file_path, request):
+            result = await self._run_single_async(file_path, request)
+            if on_result:
+                await on_result(index, result)
+            return [(index, result)]
+        
+        async def run_batch(batch):
+            try:
+                async with self._get_async_semaphore():
+                    response_text, usage = await self._invoke_model_async(
+                        batch['prompt'], batch['estimated_tokens']
+                    )
+                parsed = self._record_batch_response(batch, response_text, usage)
+            except Exception as e:
+                logger.warning(f"Batched request failed, falling back to per-file calls: {str(e)}")
+                parsed = {}
+            
+            job_results, fallbacks = self._split_batch_results(batch, parsed)
+            if on_result:
+                for index, result in job_results:
+                    await on_result(index, result)
+            for index, file_path, request in fallbacks:
+                job_results.extend(await run_single(index, file_path, request))
+            return job_results
+        
+        jobs = [run_batch(batch) for batch in batches] + [run_single(*single) for single in singles]
+        for job_results in await asyncio.gather(*jobs):
+            for index, result in job_results:
+                results[index] = result
+        return [results[index] for index in range(len(files))]
+    
+    def _plan_batches(self, files: List[Dict]) -> tuple:
+        """Split files into finished results, single requests and packed batches"""
+        results, singles, small = {}, [], []
+        for index, item in enumerate(files):
+            file_path = item['file_path']
+            try:
+                content = item.get('content')
+                if content is None:
+                    content = self._read_file_content(file_path)
+                result, request = self._prepare_analysis(
+                    file_path, content, item.get('blob_sha'), item.get('changed_lines'),
+                    batching=self.batch_enabled
+                )
+            except Exception as e:
+                result, request = self._error_result(file_path, e), None
+            
+            if result is not None:
+                results[index] = result
+                continue
+            
+            if request['batched']:
+                small.append((index, file_path, content, request))
+            else:
+                singles.append((index, file_path, request))
+        
+        return results, singles, self._pack_batches(small, singles)
+    
+    def _pack_batches(self, small: List[tuple], singles: List[tuple]) -> List[Dict]:
+        """Greedily pack small files into prompts within the batch token budget"""
+        from config.constants import AI_BATCH_ANALYSIS_PROMPT, AI_BATCH_FILE_TEMPLATE
+        
+        groups, current, current_tokens = [], [], 0
+        for entry in small:
+            tokens = entry[3]['estimated_tokens']
+            if current and (current_tokens + tokens > self.batch_max_tokens
+                            or len(current) >= self.batch_max_files):
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(entry)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        
+        batches = []
+        for group in groups:
+            if len(group) == 1:
+                index, file_path, _, request = group[0]
+                singles.append((index, file_path, request))
+                continue
+            
+            sections = [
+                AI_BATCH_FILE_TEMPLATE.format(file_path=file_path, language=request['language'], code=content)
+                for _, file_path, content, request in group
+            ]
+            prompt = AI_BATCH_ANALYSIS_PROMPT.format(count=len(group), files='\n\n'.join(sections))
+            batches.append({
+                'prompt': prompt,
+                'estimated_tokens': self.token_budget.count(prompt),
+                'entries': [(index, file_path, request) for index, file_path, _, request in group]
+            })
+        return batches
+    
+    def _analyze_batch(self, batch: Dict) -> List[tuple]:
+        """Send one batched prompt and split the answer back into per-file results"""
+        try:
+            with get_provider_semaphore(self.provider_name, self.max_in_flight):
+                response_text, usage = self._invoke_model(batch['prompt'], batch['estimated_tokens'])
+            parsed = self._record_batch_response(batch, response_text, usage)
+        except Exception as e:
+            logger.warning(f"Batched request failed, falling back to per-file calls: {str(e)}")
+            parsed = {}
+        
+        job_results, fallbacks = self._split_batch_results(batch, parsed)
+        for index, file_path, request in fallbacks:
+            job_results.append((index, self._run_single(file_path, request)))
+        return job_results
+    
+    def _record_batch_response(self, batch: Dict, response_text: str, usage: Optional[Dict]) -> Dict:
+        """Record token usage of a batched call and parse its per-file results"""
+        usage = dict(usage or {})
+        usage['estimated_prompt_tokens'] = batch['estimated_tokens']
+        self.usage_totals.add(usage)
+        with get_tracer().span('parse', provider=self.provider_name, files=len(batch['entries'])):
+            with get_metrics().timer('llm_parse_seconds', provider=self.provider_name):
+                return self._parse_batch_analysis(response_text)
+    
+    def _split_batch_results(self, batch: Dict, parsed: Dict) -> tuple:
+        """Match parsed results to batch entries; unmatched entries need per-file calls"""
+        job_results, fallbacks = [], []
+        for index, file_path, request in batch['entries']:
+            analysis = parsed.get(file_path)
+            if analysis is None:
+                fallbacks.append((index, file_path, request))
+                continue
+            analysis['batch_size'] = len(batch['entries'])
+            job_results.append((index, self._finish_analysis(file_path, request, analysis)))
+        
+        if fallbacks:
+            logger.warning(f"{len(fallbacks)} of {len(batch['entries'])} batched files missing "
+                           f"from response; analyzing them individually")
+        return job_results, fallbacks
+    
+    def _parse_batch_analysis(self, response_text: str) -> Dict:
+        """Parse a batched response into {file_path: analysis}"""
+        data = extract_json(response_text or '', (list, dict))
+        if data is None:
+            logger.warning("Could not parse batched JSON response")
+            return {}
+        
+        if isinstance(data, dict):
+            data = data.get('files', data)
+        if isinstance(data, dict):
+            return {path: result for path, result in data.items() if isinstance(result, dict)}
+        return {
+            result['file']: result for result in data
+            if isinstance(result, dict) and isinstance(result.get('file'), str)
+        }
+    
+    def _run_single(self, file_path: str, request: Dict) -> Dict:
+        """Run one prepared (non-batched) request to completion"""
+        try:
+            if request.get('chunks'):
+                analysis = self._analyze_chunks(request['chunks'])
+            else:
+                analysis = self._call_and_parse(request)
+            return self._finish_analysis(file_path, request, analysis)
+        except Exception as e:
+            return self._error_result(file_path, e)
+    
+    async def _run_single_async(self, file_path: str, request: Dict) -> Dict:
+        """Async variant of _run_single"""
+        try:
+            if request.get('chunks'):
+                from src.chunking import merge_chunk_results
+                analysis = merge_chunk_results(await asyncio.gather(
+                    *(self._call_and_parse_async(chunk) for chunk in request['chunks'])
+                ))
+            else:
+                analysis = await self._call_and_parse_async(request)
+            return self._finish_analysis(file_path, request, analysis)
+        except Exception as e:
+            return self._error_result(file_path, e)
+    
+    def _call_and_parse(self, call: Dict) -> Dict:
+        """Call the model under the provider's in-flight limit and parse the response.
+        
+        call holds the 'prompt', its 'estimated_tokens' and optional 'line_windows'.
+        """
+        with get_provider_semaphore(self.provider_name, self.max_in_flight):
+            analysis_text, usage = self._invoke_model(call['prompt'], call.get('estimated_tokens'))
+        return self._parse_call_result(call, analysis_text, usage)
+    
+    async def _call_and_parse_async(self, call: Dict) -> Dict:
+        """Async variant of _call_and_parse"""
+        async with self._get_async_semaphore():
+            analysis_text, usage = await self._invoke_model_async(call['prompt'], call.get('estimated_tokens'))
+        return self._parse_call_result(call, analysis_text, usage)
+    
+    def _invoke_model(self, prompt: str, estimated_tokens: Optional[int] = None) -> tuple:
+        """Call the model through the provider's rate limiter (quotas and retries), if any"""
+        with self._measure_call(estimated_tokens) as span:
+            if self.rate_limiter is None:
+                result = self._call_model(prompt)
+            else:
+                result = self.rate_limiter.call(
+                    lambda: self._call_model(prompt), (estimated_tokens or 0) + self.token_budget.max_output_tokens
+                )
+            self._record_call_usage(span, result[1])
+        return result
     
-    def analyze_file(self, file_path: str) -> Dict:
-        """Analyze a single file"""
+    async def _invoke_model_async(self, prompt: str, estimated_tokens: Optional[int] = None) -> tuple:
+        """Async variant of _invoke_model"""
+        with self._measure_call(estimated_tokens) as span:
+            if self.rate_limiter is None:
+                result = await self._call_model_async(prompt)
+            else:
+                result = await self.rate_limiter.call_async(
+                    lambda: self._call_model_async(prompt), (estimated_tokens or 0) + self.token_budget.max_output_tokens
+                )
+            self._record_call_usage(span, result[1])
+        return result
+    
+    @contextmanager
+    def _measure_call(self, estimated_tokens: Optional[int] = None):
+        """Time and trace one model call (with its rate-limit waits and retries) and count its outcome"""
+        metrics = get_metrics()
+        outcome = 'error'
+        with get_tracer().span('llm_call', provider=self.provider_name, model=self.model,
+                               estimated_tokens=estimated_tokens) as span:
+            try:
+                with metrics.timer('llm_call_seconds', provider=self.provider_name, model=self.model):
+                    yield span
+                outcome = 'ok'
+            except asyncio.CancelledError:
+                # A hedged call that lost the race
+                outcome = 'cancelled'
+                raise
+            finally:
+                span.set_attribute('outcome', outcome)
+                metrics.inc('llm_calls_total', provider=self.provider_name, model=self.model, outcome=outcome)
+    
+    def _record_call_usage(self, span, usage: Optional[Dict]) -> None:
+        """Count a call's token usage and attach it to its span"""
+        get_metrics().record_tokens(self.provider_name, self.model, usage)
+        usage = usage or {}
+        span.set_attributes(
+            prompt_tokens=usage.get('prompt_tokens'),
+            completion_tokens=usage.get('completion_tokens'),
+            cached_prompt_tokens=usage.get('cached_prompt_tokens')
+        )
+    
+    def _observe_headers(self, headers) -> None:
+        """Feed provider rate-limit response headers to the rate limiter"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.observe_headers(headers)
+    
+    def _error_result(self, file_path: str, error: Exception) -> Dict:
+        """Build the result for a failed analysis, flagging transient failures"""
+        logger.error(f"Error analyzing file {file_path}: {str(error)}")
+        return {'file': file_path, 'error': str(error), 'retryable': is_retryable_error(error)}
+    
+    def _parse_call_result(self, call: Dict, analysis_text: str, usage: Optional[Dict]) -> Dict:
+        """Parse a response, fix up line numbers and record token usage"""
+        # Extract JSON from response
+        with get_tracer().span('parse', provider=self.provider_name, response_chars=len(analysis_text or '')):
+            with get_metrics().timer('llm_parse_seconds', provider=self.provider_name):
+                analysis = self._parse_analysis(analysis_text)
+        if call.get('line_windows'):
+            self._map_error_lines(analysis, call['line_windows'])
+        
+        usage = dict(usage or {})
+        usage['estimated_prompt_tokens'] = call.get('estimated_tokens')
+        analysis['usage'] = usage
+        self.usage_totals.add(usage)
+        return analysis
+    
+    def _analyze_chunks(self, chunks: List[Dict]) -> Dict:
+        """Analyze the chunks of a large file in parallel and merge the results"""
+        from src.chunking import merge_chunk_results
+        
+        def analyze_chunk(chunk):
+            try:
+                return self._call_and_parse(chunk)
+            except Exception as e:
+                logger.error(f"Error analyzing lines {chunk['line_windows'][0]}: {str(e)}")
+                return {'error': str(e), 'retryable': is_retryable_error(e)}
+        
+        workers = max(1, min(len(chunks), self.max_in_flight))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chunk') as executor:
+            return merge_chunk_results(list(executor.map(propagate(analyze_chunk), chunks)))
+    
+    def _prepare_analysis(self, file_path: str, code_content: Optional[str],
+                          blob_sha: Optional[str] = None, changed_lines: Optional[List] = None,
+                          batching: bool = False):
+        """Validate input and check the cache.
+        
+        Returns (result, None) when no model call is needed, otherwise
+        (None, request) where request holds the prompt(s) and bookkeeping.
+        With batching, small full-file requests are marked 'batched' and
+        looked up under the batch prompt's cache key only.
+        """
+        if not self._client_available():
+            return {'file': file_path, 'error': self.client_error}, None
+        
+        if not code_content:
+            return {'file': file_path, 'error': 'Could not read file'}, None
+        
+        language = self._get_language(file_path)
+        if not language:
+            return {'file': file_path, 'error': 'Unsupported language'}, None
+        
+        # Pick full-file, diff-only or chunked analysis so the prompt fits the model
+        plan = self._plan_request(file_path, code_content, language, changed_lines)
+        if plan is None:
+            logger.warning(f"File too large ({len(code_content)} chars): {file_path}")
+            return {'file': file_path, 'error': 'File too large'}, None
+        
+        # Batched results are cached under their own prompt version
+        batched = (
+            batching and plan['mode'] == 'full'
+            and plan['estimated_tokens'] <= self.batch_small_file_tokens
+        )
+        
+        # Reuse a previous result for identical content, prompt and model
+        cache_key = self._cache_key(code_content, blob_sha, 'batch' if batched else plan['variant'])
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                cached['file'] = file_path
+                cached['language'] = language
+                logger.info(f"Cache hit for {file_path} ({self.display_name})")
+                # The current span is the file's (or, when batching, the batch's)
+                current_span().set_attribute('cache_hit', True)
+                return cached, None
+        
+        request = dict(plan, language=language, cache_key=cache_key, batched=batched)
+        if plan['mode'] == 'chunked':
+            request['chunks'] = self._build_chunk_requests(
+                file_path, code_content, language, plan['chunk_max_tokens']
+            )
+            logger.info(f"Analyzing {file_path} in {len(request['chunks'])} chunks")
+        return None, request
+    
+    def _plan_request(self, file_path: str, code_content: str, language: str,
+                      changed_lines: Optional[List]) -> Optional[Dict]:
+        """Choose the analysis mode for one file from the configured mode and token budget.
+        
+        'full' and 'diff' are preferences that fall back to chunking when the
+        prompt would not fit; 'auto' tries full, then diff, then chunked.
+        Returns None when the file cannot be analyzed at all.
+        """
+        budget = self.token_budget
+        
+        diff_plan = None
+        if changed_lines and self.analysis_mode in ('diff', 'auto'):
+            from src.diff_context import build_excerpt_windows
+            line_windows = build_excerpt_windows(
+                code_content, changed_lines, self.diff_context_lines, self.diff_enclosing_function
+            )
+            prompt = self._build_diff_prompt(file_path, code_content, language, line_windows, changed_lines)
+            diff_plan = {
+                'mode': 'diff',
+                'prompt': prompt,
+                'estimated_tokens': budget.count(prompt),
+                'line_windows': line_windows,
+                'variant': f"diff:{line_windows}"
+            }
+            if self.analysis_mode == 'diff' and budget.fits(diff_plan['estimated_tokens']):
+                return diff_plan
+        
+        if len(code_content) <= self.max_file_size:
+            prompt = self._build_prompt(file_path, code_content, language)
+            estimated_tokens = budget.count(prompt)
+            if budget.fits(estimated_tokens):
+                return {
+                    'mode': 'full',
+                    'prompt': prompt,
+                    'estimated_tokens': estimated_tokens,
+                    'line_windows': None,
+                    'variant': ''
+                }
+            logger.info(f"{file_path} needs ~{estimated_tokens} prompt tokens, "
+                        f"over the {budget.prompt_limit} budget for {self.model}")
+        
+        if diff_plan and budget.fits(diff_plan['estimated_tokens']):
+            return diff_plan
+        
+        if self.chunking_enabled and len(code_content) <= self.max_chunked_file_size:
+            # Leave room in each chunk's prompt for the instructions around the code
+            chunk_max_tokens = max(256, min(self.chunk_max_tokens, budget.prompt_limit - 1000))
+            return {
+                'mode': 'chunked',
+                'chunk_max_tokens': chunk_max_tokens,
+                'line_windows': None,
+                'variant': f"chunked:{chunk_max_tokens}:{self.chunk_overlap_lines}"
+            }
+        return None
+    
+    def _finish_analysis(self, file_path: str, request: Dict, analysis: Dict) -> Dict:
+        """Store a parsed analysis in the cache and annotate it"""
+        if request['cache_key'] and not analysis.get('error'):
+            self.cache.set(request['cache_key'], {k: v for k, v in analysis.items() if k != 'usage'})
+        analysis['file'] = file_path
+        analysis['language'] = request['language']
+        analysis['analysis_mode'] = request['mode']
+        
+        logger.info(f"Analyzed {file_path} with {self.display_name}")
+        return analysis
+    
+    def _call_model(self, prompt: str) -> tuple:
+        """Send the prompt to the provider and return (response text, usage dict)"""
         raise NotImplementedError
     
-    def _read_file_content(self, file_path: str, max_size: int = 50000) -> Optional[str]:
+    async def _call_model_async(self, prompt: str) -> tuple:
+        """Send the prompt with the provider's async client"""
+        raise NotImplementedError
+    
+    def _parse_analysis(self, response_text: str) -> Dict:
+        """Extract the JSON analysis from a model response"""
+        return parse_analysis(response_text)
+    
+    def _consume_stream(self, stream, pieces, usage: Optional[Dict] = None, prefix: str = '') -> tuple:
+        """Read streamed text until the JSON answer closes, then drop the connection.
+        
+        Closing the response early cancels the rest of the generation. Without
+        provider-reported counts, each streamed piece counts as one output token.
+        """
+        scanner = JsonStreamScanner()
+        scanner.feed(prefix)
+        received = 0
+        for piece in pieces:
+            received += 1
+            if scanner.feed(piece):
+                stream.response.close()
+                break
+        return scanner.answer_text, self._stream_usage(usage, received)
+    
+    async def _consume_stream_async(self, stream, pieces, usage: Optional[Dict] = None,
+                                    prefix: str = '') -> tuple:
+        """Async variant of _consume_stream"""
+        scanner = JsonStreamScanner()
+        scanner.feed(prefix)
+        received = 0
+        async for piece in pieces:
+            received += 1
+            if scanner.feed(piece):
+                await stream.response.aclose()
+                break
+        return scanner.answer_text, self._stream_usage(usage, received)
+    
+    def _stream_usage(self, usage: Optional[Dict], received: int) -> Dict:
+        """Token usage of a streamed call, estimating what the provider did not report"""
+        usage = dict(usage or {})
+        return {
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens') or received,
+            'cached_prompt_tokens': usage.get('cached_prompt_tokens')
+        }
+    
+    def _usage_from_response(self, response) -> Dict:
+        """Read prompt/completion token counts from an SDK response"""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return {}
+        return {
+            'prompt_tokens': getattr(usage, 'prompt_tokens', None) or getattr(usage, 'input_tokens', None),
+            'completion_tokens': getattr(usage, 'completion_tokens', None) or getattr(usage, 'output_tokens', None),
+            'cached_prompt_tokens': _cached_tokens(usage)
+        }
+    
+    def _split_prompt(self, prompt: str) -> tuple:
+        """Split a prompt into its static instructions and the variable input after PROMPT_INPUT_MARKER"""
+        from config.constants import PROMPT_INPUT_MARKER
+        instructions, marker, rest = prompt.partition(PROMPT_INPUT_MARKER)
+        if not marker:
+            return '', prompt
+        return instructions.rstrip(), marker + rest
+    
+    def _chat_messages(self, prompt: str) -> List[Dict]:
+        """System + user messages for chat-completion APIs, static instructions first.
+        
+        Keeping the instructions in an identical leading system message lets
+        providers with automatic prefix caching (OpenAI) reuse them across calls.
+        """
+        instructions, user_input = self._split_prompt(prompt)
+        system = "You are an expert code reviewer. Respond only with valid JSON."
+        if instructions:
+            system = f"{instructions}\n\nRespond only with valid JSON."
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user_input}
+        ]
+    
+    def _chat_options(self) -> Dict:
+        """Extra chat-completion arguments (JSON mode when structured output is on)"""
+        return {"response_format": {"type": "json_object"}} if self.structured_output else {}
+    
+    def _get_async_semaphore(self) -> asyncio.Semaphore:
+        """Per-event-loop in-flight limit for async calls"""
+        loop = asyncio.get_running_loop()
+        if getattr(self, '_async_semaphore_loop', None) is not loop:
+            self._async_semaphore = asyncio.Semaphore(max(1, self.max_in_flight))
+            self._async_semaphore_loop = loop
+        return self._async_semaphore
+    
+    def _get_async_client(self):
+        """Per-event-loop async client (async clients cannot cross loops)"""
+        loop = asyncio.get_running_loop()
+        if getattr(self, '_async_client_loop', None) is not loop:
+            self._async_client = self._create_async_client()
+            self._async_client_loop = loop
+        return self._async_client
+    
+    def _create_async_client(self):
+        """Create the provider's async client"""
+        raise NotImplementedError
+    
+    def _client_available(self) -> bool:
+        """Check whether the provider client was initialized"""
+        return getattr(self, 'client', None) is not None
+    
+    def _build_prompt(self, file_path: str, code_content: str, language: str) -> str:
+        """Fill the analysis prompt template"""
+        from config.constants import AI_CODE_ANALYSIS_PROMPT
+        return AI_CODE_ANALYSIS_PROMPT.format(
+            language=language,
+            code=code_content,
+            file_path=file_path
+        )
+    
+    def _build_diff_prompt(self, file_path: str, code_content: str, language: str,
+                           line_windows: List, changed_lines: List) -> str:
+        """Fill the diff-only prompt with line-numbered excerpts"""
+        from config.constants import AI_DIFF_ANALYSIS_PROMPT
+        from src.diff_context import render_excerpts
+        return AI_DIFF_ANALYSIS_PROMPT.format(
+            language=language,
+            code=render_excerpts(code_content, line_windows, changed_lines),
+            file_path=file_path
+        )
+    
+    def _build_chunk_requests(self, file_path: str, code_content: str, language: str,
+                              chunk_max_tokens: int) -> List[Dict]:
+        """Split a large file and build one line-numbered prompt per chunk"""
+        from config.constants import AI_CHUNK_ANALYSIS_PROMPT
+        from src.chunking import split_into_chunks
+        from src.diff_context import render_excerpts
+        
+        chunks = split_into_chunks(
+            code_content, chunk_max_tokens, self.chunk_overlap_lines, self.token_budget.count
+        )
+        requests = []
+        for index, chunk in enumerate(chunks, start=1):
+            window = [(chunk['start_line'], chunk['end_line'])]
+            prompt = AI_CHUNK_ANALYSIS_PROMPT.format(
+                chunk_index=index,
+                chunk_count=len(chunks),
+                start_line=chunk['start_line'],
+                end_line=chunk['end_line'],
+                language=language,
+                code=render_excerpts(code_content, window, []),
+                file_path=file_path
+            )
+            requests.append({
+                'prompt': prompt,
+                'estimated_tokens': self.token_budget.count(prompt),
+                'line_windows': window
+            })
+        return requests
+    
+    def _map_error_lines(self, analysis: Dict, line_windows: List) -> None:
+        """Drop reported line numbers that fall outside the excerpts sent"""
+        from src.diff_context import map_line_to_windows
+        for error in analysis.get('errors') or []:
+            if isinstance(error, dict) and error.get('line') is not None:
+                error['line'] = map_line_to_windows(error['line'], line_windows)
+    
+    def _cache_key(self, code_content: str, blob_sha: Optional[str] = None,
+                   variant: str = '') -> Optional[str]:
+        """Build the analysis cache key, or None when caching is disabled"""
+        if not self.cache:
+            return None
+        from config.constants import (
+            AI_CODE_ANALYSIS_PROMPT, AI_DIFF_ANALYSIS_PROMPT, AI_CHUNK_ANALYSIS_PROMPT,
+            AI_BATCH_ANALYSIS_PROMPT
+        )
+        from src.analysis_cache import git_blob_sha, prompt_fingerprint
+        if variant == 'batch':
+            template = AI_BATCH_ANALYSIS_PROMPT
+        elif variant.startswith('diff'):
+            template = AI_DIFF_ANALYSIS_PROMPT
+        elif variant.startswith('chunked'):
+            template = AI_CHUNK_ANALYSIS_PROMPT
+        else:
+            template = AI_CODE_ANALYSIS_PROMPT
+        return self.cache.make_key(
+            blob_sha or git_blob_sha(code_content),
+            prompt_fingerprint(template + variant),
+            self.provider_name,
+            self.model
+        )
+    
+    @property
+    def token_budget(self) -> TokenBudget:
+        """Token budget for the configured model and output limit (built on first use).
+        
+        Its max_output_tokens is the configured limit clamped to what the
+        model can produce, and is what requests send.
+        """
+        key = (self.model, self.max_output_tokens)
+        if self._token_budget is None or self._token_budget_key != key:
+            self._token_budget = TokenBudget(self.model, self.max_output_tokens)
+            self._token_budget_key = key
+        return self._token_budget
+    
+    def get_usage_totals(self) -> Dict:
+        """Estimated and actual token usage of all calls made so far"""
+        return self.usage_totals.snapshot()
+    
+    def close(self) -> None:
+        """Release threads or connections held by the analyzer (none by default)"""
+    
+    @property
+    def max_input_size(self) -> int:
+        """Largest file this analyzer will accept (chunked above max_file_size)"""
+        if self.chunking_enabled:
+            return max(self.max_file_size, self.max_chunked_file_size)
+        return self.max_file_size
+    
+    def _read_file_content(self, file_path: str, max_size: int = None) -> Optional[str]:
         """Read file content with size limit"""
+        max_size = max_size or self.max_input_size
         try:
             if not os.path.exists(file_path):
                 logger.warning(f"File not found: {file_path}")
@@ -58,336 +801,487 @@ class AICodeAnalyzer:
         return self.supported_languages.get(ext)
 
 
+def _cached_tokens(usage) -> Optional[int]:
+    """Prompt tokens served from the provider's prompt cache, if reported"""
+    cached = getattr(usage, 'cache_read_input_tokens', None)
+    if cached is not None:
+        return cached
+    details = getattr(usage, 'prompt_tokens_details', None)
+    if isinstance(details, dict):
+        return details.get('cached_tokens')
+    return getattr(details, 'cached_tokens', None)
+
+
+def _anthropic_usage(usage) -> Dict:
+    """Anthropic usage with cache reads/writes folded into prompt_tokens"""
+    cache_read = getattr(usage, 'cache_read_input_tokens', None) or 0
+    cache_write = getattr(usage, 'cache_creation_input_tokens', None) or 0
+    return {
+        'prompt_tokens': (usage.input_tokens or 0) + cache_read + cache_write,
+        'completion_tokens': usage.output_tokens,
+        'cached_prompt_tokens': cache_read
+    }
+
+
+async def _parse_raw_async(raw_response):
+    """Parse an async SDK raw response (parse() is a coroutine in some SDK versions)"""
+    response = raw_response.parse()
+    if inspect.isawaitable(response):
+        response = await response
+    return response
+
+
+def _chat_stream_text(stream):
+    """Yield text deltas from an OpenAI-compatible chat completion stream"""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _chat_stream_text_async(stream):
+    """Async variant of _chat_stream_text"""
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+def _anthropic_stream_text(stream, usage: Dict):
+    """Yield text deltas from an Anthropic message stream, recording token usage"""
+    for event in stream:
+        if event.type == 'message_start':
+            start = _anthropic_usage(event.message.usage)
+            usage.update({key: value for key, value in start.items() if key != 'completion_tokens'})
+        elif event.type == 'content_block_delta':
+            yield getattr(event.delta, 'text', '')
+        elif event.type == 'message_delta':
+            usage['completion_tokens'] = event.usage.output_tokens
+
+
+async def _anthropic_stream_text_async(stream, usage: Dict):
+    """Async variant of _anthropic_stream_text"""
+    async for event in stream:
+        if event.type == 'message_start':
+            start = _anthropic_usage(event.message.usage)
+            usage.update({key: value for key, value in start.items() if key != 'completion_tokens'})
+        elif event.type == 'content_block_delta':
+            yield getattr(event.delta, 'text', '')
+        elif event.type == 'message_delta':
+            usage['completion_tokens'] = event.usage.output_tokens
+
+
 class OpenAIAnalyzer(AICodeAnalyzer):
     """OpenAI GPT-based code analyzer"""
     
-    def __init__(self, api_key: str, model: str = 'gpt-4o-mini'):
-        super().__init__()
+    provider_name = 'openai'
+    display_name = 'OpenAI'
+    client_error = 'OpenAI client not initialized'
+    
+    def __init__(self, api_key: str, model: str = 'gpt-4o-mini', cache=None, max_in_flight: int = 4,
+                 rate_limiter=None):
+        super().__init__(cache=cache, max_in_flight=max_in_flight)
         self.api_key = api_key
         self.model = model
+        self.rate_limiter = rate_limiter
         
         try:
             import openai
-            self.client = openai.OpenAI(api_key=api_key)
+            # No SDK retries: the rate limiter retries, and sees the throttling it adapts to
+            self.client = openai.OpenAI(api_key=api_key, max_retries=0)
         except ImportError:
             logger.error("openai package not installed. Install with: pip install openai")
             self.client = None
     
-    def analyze_file(self, file_path: str) -> Dict:
-        """Analyze code file using OpenAI"""
-        try:
-            if not self.client:
-                return {'file': file_path, 'error': 'OpenAI client not initialized'}
-            
-            code_content = self._read_file_content(file_path)
-            if not code_content:
-                return {'file': file_path, 'error': 'Could not read file'}
-            
-            language = self._get_language(file_path)
-            if not language:
-                return {'file': file_path, 'error': 'Unsupported language'}
-            
-            # Build prompt
-            from config.constants import AI_CODE_ANALYSIS_PROMPT
-            prompt = AI_CODE_ANALYSIS_PROMPT.format(
-                language=language,
-                code=code_content,
-                file_path=file_path
-            )
-            
-            # Call OpenAI
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert code reviewer. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                timeout=60
-            )
-            
-            # Parse response
-            analysis_text = response.choices[0].message.content
-            
-            # Extract JSON from response
-            analysis = self._parse_analysis(analysis_text)
-            analysis['file'] = file_path
-            analysis['language'] = language
-            
-            logger.info(f"Analyzed {file_path} with OpenAI")
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"Error analyzing file {file_path}: {str(e)}")
-            return {'file': file_path, 'error': str(e)}
+    def _call_model(self, prompt: str) -> tuple:
+        """Call OpenAI"""
+        raw_response = self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=self._chat_messages(prompt),
+            temperature=0.3,
+            max_tokens=self.token_budget.max_output_tokens,
+            stream=self.stream_responses,
+            timeout=60,
+            **self._chat_options()
+        )
+        self._observe_headers(raw_response.headers)
+        response = raw_response.parse()
+        if self.stream_responses:
+            return self._consume_stream(response, _chat_stream_text(response))
+        return response.choices[0].message.content, self._usage_from_response(response)
     
-    def _parse_analysis(self, response_text: str) -> Dict:
-        """Extract JSON from AI response"""
-        try:
-            # Try to find JSON in the response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {'has_errors': False, 'summary': response_text}
-        except json.JSONDecodeError:
-            logger.warning("Could not parse JSON response")
-            return {'has_errors': False, 'summary': response_text}
+    def _create_async_client(self):
+        """Create the AsyncOpenAI client"""
+        import openai
+        return openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+    
+    async def _call_model_async(self, prompt: str) -> tuple:
+        """Call OpenAI asynchronously"""
+        raw_response = await self._get_async_client().chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=self._chat_messages(prompt),
+            temperature=0.3,
+            max_tokens=self.token_budget.max_output_tokens,
+            stream=self.stream_responses,
+            timeout=60,
+            **self._chat_options()
+        )
+        self._observe_headers(raw_response.headers)
+        response = await _parse_raw_async(raw_response)
+        if self.stream_responses:
+            return await self._consume_stream_async(response, _chat_stream_text_async(response))
+        return response.choices[0].message.content, self._usage_from_response(response)
 
 
 class AnthropicAnalyzer(AICodeAnalyzer):
     """Anthropic Claude-based code analyzer"""
     
-    def __init__(self, api_key: str, model: str = 'claude-3-5-sonnet-20241022'):
-        super().__init__()
+    provider_name = 'anthropic'
+    display_name = 'Claude'
+    client_error = 'Claude client not initialized'
+    
+    def __init__(self, api_key: str, model: str = 'claude-3-5-sonnet-20241022', cache=None, max_in_flight: int = 4,
+                 rate_limiter=None):
+        super().__init__(cache=cache, max_in_flight=max_in_flight)
         self.api_key = api_key
         self.model = model
+        self.rate_limiter = rate_limiter
         
         try:
             import anthropic
-            self.client = anthropic.Anthropic(api_key=api_key)
+            self.client = anthropic.Anthropic(api_key=api_key, max_retries=0)
         except ImportError:
             logger.error("anthropic package not installed. Install with: pip install anthropic")
             self.client = None
     
-    def analyze_file(self, file_path: str) -> Dict:
-        """Analyze code file using Claude"""
-        try:
-            if not self.client:
-                return {'file': file_path, 'error': 'Claude client not initialized'}
-            
-            code_content = self._read_file_content(file_path)
-            if not code_content:
-                return {'file': file_path, 'error': 'Could not read file'}
-            
-            language = self._get_language(file_path)
-            if not language:
-                return {'file': file_path, 'error': 'Unsupported language'}
-            
-            # Build prompt
-            from config.constants import AI_CODE_ANALYSIS_PROMPT
-            prompt = AI_CODE_ANALYSIS_PROMPT.format(
-                language=language,
-                code=code_content,
-                file_path=file_path
-            )
-            
-            # Call Claude
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                timeout=60
-            )
-            
-            # Parse response
-            analysis_text = response.content[0].text
-            analysis = self._parse_analysis(analysis_text)
-            analysis['file'] = file_path
-            analysis['language'] = language
-            
-            logger.info(f"Analyzed {file_path} with Claude")
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"Error analyzing file {file_path}: {str(e)}")
-            return {'file': file_path, 'error': str(e)}
+    def _call_model(self, prompt: str) -> tuple:
+        """Call Claude"""
+        prefill = '{' if self.structured_output else ''
+        raw_response = self.client.messages.with_raw_response.create(
+            model=self.model,
+            max_tokens=self.token_budget.max_output_tokens,
+            stream=self.stream_responses,
+            timeout=60,
+            **self._message_options(prompt, prefill)
+        )
+        self._observe_headers(raw_response.headers)
+        response = raw_response.parse()
+        if self.stream_responses:
+            usage = {}
+            return self._consume_stream(response, _anthropic_stream_text(response, usage), usage, prefix=prefill)
+        return prefill + response.content[0].text, self._usage_from_response(response)
     
-    def _parse_analysis(self, response_text: str) -> Dict:
-        """Extract JSON from AI response"""
-        try:
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {'has_errors': False, 'summary': response_text}
-        except json.JSONDecodeError:
-            logger.warning("Could not parse JSON response")
-            return {'has_errors': False, 'summary': response_text}
+    def _message_options(self, prompt: str, prefill: str) -> Dict:
+        """System and message arguments: cacheable static instructions, then the input.
+        
+        The instructions go in a system block marked with cache_control so
+        repeated calls read them from Anthropic's prompt cache; a '{' prefill
+        keeps the answer to pure JSON when structured output is on.
+        """
+        instructions, user_input = self._split_prompt(prompt)
+        options = {"messages": [{"role": "user", "content": user_input}]}
+        if instructions:
+            system = {"type": "text", "text": instructions}
+            if self.prompt_caching:
+                system["cache_control"] = {"type": "ephemeral"}
+            options["system"] = [system]
+        if prefill:
+            options["messages"].append({"role": "assistant", "content": prefill})
+        return options
+    
+    def _usage_from_response(self, response) -> Dict:
+        """Read token counts, counting cache reads and writes as prompt tokens"""
+        return _anthropic_usage(response.usage)
+    
+    def _create_async_client(self):
+        """Create the AsyncAnthropic client"""
+        import anthropic
+        return anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+    
+    async def _call_model_async(self, prompt: str) -> tuple:
+        """Call Claude asynchronously"""
+        prefill = '{' if self.structured_output else ''
+        raw_response = await self._get_async_client().messages.with_raw_response.create(
+            model=self.model,
+            max_tokens=self.token_budget.max_output_tokens,
+            stream=self.stream_responses,
+            timeout=60,
+            **self._message_options(prompt, prefill)
+        )
+        self._observe_headers(raw_response.headers)
+        response = await _parse_raw_async(raw_response)
+        if self.stream_responses:
+            usage = {}
+            return await self._consume_stream_async(response, _anthropic_stream_text_async(response, usage), usage, prefix=prefill)
+        return prefill + response.content[0].text, self._usage_from_response(response)
 
 
 class GroqAnalyzer(AICodeAnalyzer):
     """Groq-based code analyzer (fast inference)"""
     
-    def __init__(self, api_key: str, model: str = 'mixtral-8x7b-32768'):
-        super().__init__()
+    provider_name = 'groq'
+    display_name = 'Groq'
+    client_error = 'Groq client not initialized'
+    
+    def __init__(self, api_key: str, model: str = 'mixtral-8x7b-32768', cache=None, max_in_flight: int = 4,
+                 rate_limiter=None):
+        super().__init__(cache=cache, max_in_flight=max_in_flight)
         self.api_key = api_key
         self.model = model
+        self.rate_limiter = rate_limiter
         
         try:
             from groq import Groq
-            self.client = Groq(api_key=api_key)
+            self.client = Groq(api_key=api_key, max_retries=0)
         except ImportError:
             logger.error("groq package not installed. Install with: pip install groq")
             self.client = None
     
-    def analyze_file(self, file_path: str) -> Dict:
-        """Analyze code file using Groq"""
-        try:
-            if not self.client:
-                return {'file': file_path, 'error': 'Groq client not initialized'}
-            
-            code_content = self._read_file_content(file_path)
-            if not code_content:
-                return {'file': file_path, 'error': 'Could not read file'}
-            
-            language = self._get_language(file_path)
-            if not language:
-                return {'file': file_path, 'error': 'Unsupported language'}
-            
-            # Build prompt
-            from config.constants import AI_CODE_ANALYSIS_PROMPT
-            prompt = AI_CODE_ANALYSIS_PROMPT.format(
-                language=language,
-                code=code_content,
-                file_path=file_path
-            )
-            
-            # Call Groq
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert code reviewer. Respond only with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                timeout=60
-            )
-            
-            # Parse response
-            analysis_text = response.choices[0].message.content
-            analysis = self._parse_analysis(analysis_text)
-            analysis['file'] = file_path
-            analysis['language'] = language
-            
-            logger.info(f"Analyzed {file_path} with Groq")
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"Error analyzing file {file_path}: {str(e)}")
-            return {'file': file_path, 'error': str(e)}
+    def _call_model(self, prompt: str) -> tuple:
+        """Call Groq"""
+        raw_response = self.client.chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=self._chat_messages(prompt),
+            temperature=0.3,
+            max_tokens=self.token_budget.max_output_tokens,
+            stream=self.stream_responses,
+            timeout=60,
+            **self._chat_options()
+        )
+        self._observe_headers(raw_response.headers)
+        response = raw_response.parse()
+        if self.stream_responses:
+            return self._consume_stream(response, _chat_stream_text(response))
+        return response.choices[0].message.content, self._usage_from_response(response)
     
-    def _parse_analysis(self, response_text: str) -> Dict:
-        """Extract JSON from AI response"""
-        try:
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {'has_errors': False, 'summary': response_text}
-        except json.JSONDecodeError:
-            logger.warning("Could not parse JSON response")
-            return {'has_errors': False, 'summary': response_text}
+    def _create_async_client(self):
+        """Create the AsyncGroq client"""
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=self.api_key, max_retries=0)
+    
+    async def _call_model_async(self, prompt: str) -> tuple:
+        """Call Groq asynchronously"""
+        raw_response = await self._get_async_client().chat.completions.with_raw_response.create(
+            model=self.model,
+            messages=self._chat_messages(prompt),
+            temperature=0.3,
+            max_tokens=self.token_budget.max_output_tokens,
+            stream=self.stream_responses,
+            timeout=60,
+            **self._chat_options()
+        )
+        self._observe_headers(raw_response.headers)
+        response = await _parse_raw_async(raw_response)
+        if self.stream_responses:
+            return await self._consume_stream_async(response, _chat_stream_text_async(response))
+        return response.choices[0].message.content, self._usage_from_response(response)
+
+
+class OllamaStreamCollector:
+    """Accumulates Ollama NDJSON stream chunks and spots the end of the JSON answer"""
+    
+    def __init__(self):
+        self.scanner = JsonStreamScanner()
+        self.chunks = 0
+        self.final = None
+    
+    def feed_line(self, line) -> bool:
+        """Consume one NDJSON line; returns True when reading can stop"""
+        if not line:
+            return False
+        data = json.loads(line)
+        if data.get('error'):
+            raise RuntimeError(f"Ollama error: {data['error']}")
+        self.chunks += 1
+        if data.get('done'):
+            self.final = data
+            return True
+        return self.scanner.feed(data.get('response', ''))
+    
+    def result(self) -> tuple:
+        """Return (response text, usage); early-stopped streams count chunks as tokens"""
+        text = self.scanner.answer_text
+        if self.final is not None:
+            return text, {
+                'prompt_tokens': self.final.get('prompt_eval_count'),
+                'completion_tokens': self.final.get('eval_count')
+            }
+        return text, {'prompt_tokens': None, 'completion_tokens': self.chunks}
 
 
 class OllamaAnalyzer(AICodeAnalyzer):
     """Ollama-based local code analyzer (free, runs locally)"""
     
-    def __init__(self, base_url: str = 'http://localhost:11434', model: str = 'mistral'):
-        super().__init__()
+    provider_name = 'ollama'
+    display_name = 'Ollama'
+    client_error = 'Requests library not available'
+    
+    def __init__(self, base_url: str = 'http://localhost:11434', model: str = 'mistral', cache=None, max_in_flight: int = 4,
+                 pool_size: int = None, stream: bool = False, keep_alive: str = None):
+        super().__init__(cache=cache, max_in_flight=max_in_flight)
         self.base_url = base_url
         self.model = model
+        self.pool_size = pool_size or max_in_flight
+        self.stream_responses = stream
+        self.keep_alive = keep_alive
+        self.session = None
         
         try:
             import requests
+            from requests.adapters import HTTPAdapter
             self.requests = requests
+            # One pooled keep-alive session instead of a new connection per file
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
         except ImportError:
             logger.error("requests package not installed. Install with: pip install requests")
             self.requests = None
     
-    def analyze_file(self, file_path: str) -> Dict:
-        """Analyze code file using local Ollama"""
-        try:
-            if not self.requests:
-                return {'file': file_path, 'error': 'Requests library not available'}
-            
-            code_content = self._read_file_content(file_path)
-            if not code_content:
-                return {'file': file_path, 'error': 'Could not read file'}
-            
-            language = self._get_language(file_path)
-            if not language:
-                return {'file': file_path, 'error': 'Unsupported language'}
-            
-            # Build prompt
-            from config.constants import AI_CODE_ANALYSIS_PROMPT
-            prompt = AI_CODE_ANALYSIS_PROMPT.format(
-                language=language,
-                code=code_content,
-                file_path=file_path
-            )
-            
-            # Call Ollama
-            response = self.requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": 0.3
-                },
-                timeout=60
-            )
-            
-            if response.status_code != 200:
-                return {'file': file_path, 'error': f'Ollama error: {response.status_code}'}
-            
-            # Parse response
-            response_data = response.json()
-            analysis_text = response_data.get('response', '')
-            analysis = self._parse_analysis(analysis_text)
-            analysis['file'] = file_path
-            analysis['language'] = language
-            
-            logger.info(f"Analyzed {file_path} with Ollama")
-            return analysis
-            
-        except Exception as e:
-            logger.error(f"Error analyzing file {file_path}: {str(e)}")
-            return {'file': file_path, 'error': str(e)}
+    def _client_available(self) -> bool:
+        """Check whether the requests library is available"""
+        return self.requests is not None
     
-    def _parse_analysis(self, response_text: str) -> Dict:
-        """Extract JSON from AI response"""
-        try:
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            else:
-                return {'has_errors': False, 'summary': response_text}
-        except json.JSONDecodeError:
-            logger.warning("Could not parse JSON response")
-            return {'has_errors': False, 'summary': response_text}
+    def _payload(self, prompt: str) -> Dict:
+        """Build the /api/generate request body"""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": self.stream_responses,
+            "options": {"temperature": 0.3, "num_predict": self.token_budget.max_output_tokens}
+        }
+        if self.structured_output:
+            payload["format"] = "json"
+        if self.keep_alive:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+    
+    def _usage_from_data(self, response_data: Dict) -> Dict:
+        """Read token counts from an Ollama response (or final stream chunk)"""
+        return {
+            'prompt_tokens': response_data.get('prompt_eval_count'),
+            'completion_tokens': response_data.get('eval_count')
+        }
+    
+    def _call_model(self, prompt: str) -> tuple:
+        """Call Ollama"""
+        if self.stream_responses:
+            with self.session.post(f"{self.base_url}/api/generate", json=self._payload(prompt),
+                                   timeout=60, stream=True) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f'Ollama error: {response.status_code}')
+                scanner = OllamaStreamCollector()
+                for line in response.iter_lines():
+                    if scanner.feed_line(line):
+                        break
+                return scanner.result()
+        
+        response = self.session.post(f"{self.base_url}/api/generate", json=self._payload(prompt), timeout=60)
+        
+        if response.status_code != 200:
+            raise RuntimeError(f'Ollama error: {response.status_code}')
+        
+        response_data = response.json()
+        return response_data.get('response', ''), self._usage_from_data(response_data)
+    
+    def _create_async_client(self):
+        """Create a pooled httpx AsyncClient for the Ollama API"""
+        import httpx
+        limits = httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+        return httpx.AsyncClient(base_url=self.base_url, timeout=60, limits=limits)
+    
+    async def _call_model_async(self, prompt: str) -> tuple:
+        """Call Ollama asynchronously"""
+        client = self._get_async_client()
+        if self.stream_responses:
+            async with client.stream("POST", "/api/generate", json=self._payload(prompt)) as response:
+                if response.status_code != 200:
+                    raise RuntimeError(f'Ollama error: {response.status_code}')
+                scanner = OllamaStreamCollector()
+                async for line in response.aiter_lines():
+                    if scanner.feed_line(line):
+                        break
+                return scanner.result()
+        
+        response = await client.post("/api/generate", json=self._payload(prompt))
+        
+        if response.status_code != 200:
+            raise RuntimeError(f'Ollama error: {response.status_code}')
+        
+        response_data = response.json()
+        return response_data.get('response', ''), self._usage_from_data(response_data)
 
 
 def get_analyzer(provider: str = 'openai', **kwargs) -> AICodeAnalyzer:
-    """Factory function to get appropriate analyzer"""
+    """Factory function to get appropriate analyzer.
+    
+    A comma-separated provider list (e.g. 'groq,openai,ollama') builds a
+    RoutingAnalyzer that hedges and fails over across them in that order.
+    Providers that cannot be set up (e.g. missing API key) are skipped.
+    """
     provider = provider.lower()
+    cache = kwargs.get('cache')
+    
+    if ',' in provider:
+        from src.provider_router import RoutingAnalyzer
+        names = [name.strip() for name in provider.split(',') if name.strip()]
+        backends = []
+        for name in names:
+            try:
+                backends.append(get_analyzer(name))
+            except Exception as e:
+                logger.warning(f"Skipping AI provider {name}: {str(e)}")
+        if not backends:
+            raise ValueError(f"None of the AI providers could be set up: {', '.join(names)}")
+        return RoutingAnalyzer(
+            backends,
+            cache=cache,
+            max_in_flight=kwargs.get('max_in_flight') or int(os.getenv('AI_ROUTER_MAX_IN_FLIGHT', 8)),
+            strategy=os.getenv('AI_ROUTING_STRATEGY', 'ordered'),
+            hedge_percentile=float(os.getenv('AI_HEDGE_PERCENTILE', 0.95)),
+            hedge_min_samples=int(os.getenv('AI_HEDGE_MIN_SAMPLES', 20)),
+            hedge_delay=float(os.getenv('AI_HEDGE_DELAY_SECONDS', 10)),
+            max_hedges=int(os.getenv('AI_MAX_HEDGES', 1))
+        )
+    max_in_flight = kwargs.get('max_in_flight') or int(os.getenv(f'{provider.upper()}_MAX_IN_FLIGHT', 4))
+    
+    # Hosted providers share a rate limiter (RPM/TPM quotas, AIMD concurrency, retries)
+    rate_limiter = kwargs.get('rate_limiter')
+    if rate_limiter is None and provider in ('openai', 'anthropic', 'groq'):
+        rate_limiter = get_rate_limiter(
+            provider,
+            requests_per_minute=int(os.getenv(f'{provider.upper()}_REQUESTS_PER_MINUTE', 0)),
+            tokens_per_minute=int(os.getenv(f'{provider.upper()}_TOKENS_PER_MINUTE', 0)),
+            max_concurrency=max_in_flight,
+            max_retries=int(os.getenv('AI_MAX_RETRIES', 5)),
+            base_delay=float(os.getenv('AI_RETRY_BASE_DELAY', 1.0))
+        )
     
     if provider == 'openai':
         api_key = kwargs.get('api_key') or os.getenv('OPENAI_API_KEY')
         model = kwargs.get('model') or os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
-        return OpenAIAnalyzer(api_key, model)
+        return OpenAIAnalyzer(api_key, model, cache=cache, max_in_flight=max_in_flight,
+                              rate_limiter=rate_limiter)
     
     elif provider == 'anthropic':
         api_key = kwargs.get('api_key') or os.getenv('ANTHROPIC_API_KEY')
         model = kwargs.get('model') or os.getenv('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20241022')
-        return AnthropicAnalyzer(api_key, model)
+        return AnthropicAnalyzer(api_key, model, cache=cache, max_in_flight=max_in_flight,
+                                 rate_limiter=rate_limiter)
     
     elif provider == 'groq':
         api_key = kwargs.get('api_key') or os.getenv('GROQ_API_KEY')
         model = kwargs.get('model') or os.getenv('GROQ_MODEL', 'mixtral-8x7b-32768')
-        return GroqAnalyzer(api_key, model)
+        return GroqAnalyzer(api_key, model, cache=cache, max_in_flight=max_in_flight,
+                            rate_limiter=rate_limiter)
     
     elif provider == 'ollama':
         base_url = kwargs.get('base_url') or os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
         model = kwargs.get('model') or os.getenv('OLLAMA_MODEL', 'mistral')
-        return OllamaAnalyzer(base_url, model)
+        return OllamaAnalyzer(
+            base_url, model, cache=cache, max_in_flight=max_in_flight,
+            pool_size=int(os.getenv('OLLAMA_POOL_SIZE', 0)) or None,
+            keep_alive=os.getenv('OLLAMA_KEEP_ALIVE') or None
+        )
     
     else:
         raise ValueError(f"Unknown AI provider: {provider}")
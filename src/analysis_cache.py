@@ -0,0 +1,152 @@
+"""
+Analysis Cache Module
+Persistent, content-addressed cache of AI analysis results
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def git_blob_sha(content: str) -> str:
+    """Compute the git blob SHA-1 of text content"""
+    data = content.encode('utf-8')
+    header = f"blob {len(data)}\0".encode('utf-8')
+    return hashlib.sha1(header + data).hexdigest()
+
+
+def prompt_fingerprint(prompt_template: str) -> str:
+    """Short stable hash identifying a prompt template version"""
+    return hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """SQLite-backed LRU cache keyed by (content, prompt, provider, model)"""
+
+    def __init__(self, cache_file: str = './data/analysis_cache.db',
+                 max_entries: int = 5000, max_bytes: int = 50 * 1024 * 1024):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        Path(cache_file).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_cache_access ON analysis_cache (last_access)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(content_hash: str, prompt_hash: str, provider: str, model: str) -> str:
+        """Build a cache key from its components"""
+        raw = '\x1f'.join([content_hash, prompt_hash, provider or '', model or ''])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached analysis, or None on a miss"""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                self._conn.execute(
+                    "UPDATE analysis_cache SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+                self._conn.commit()
+                self.hits += 1
+            return json.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Error reading analysis cache: {str(e)}")
+            self.misses += 1
+            return None
+
+    def set(self, key: str, analysis: Dict) -> bool:
+        """Store an analysis result and evict least recently used entries"""
+        try:
+            value = json.dumps(analysis, default=str)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, value, len(value), time.time())
+                )
+                self.stores += 1
+                self._evict()
+                self._conn.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Error writing analysis cache: {str(e)}")
+            return False
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until within bounds (lock held)"""
+        count, total_size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+        ).fetchone()
+
+        while count > self.max_entries or total_size > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size FROM analysis_cache ORDER BY last_access ASC LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (row[0],))
+            count -= 1
+            total_size -= row[1]
+            self.evictions += 1
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss counters and current cache size"""
+        with self._lock:
+            count, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'entries': count,
+            'bytes': total_size
+        }
+
+    def clear(self) -> bool:
+        """Remove all cached entries"""
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM analysis_cache")
+                self._conn.commit()
+            logger.info("Analysis cache cleared")
+            return True
+        except Exception as e:
+            logger.error(f"Error clearing analysis cache: {str(e)}")
+            return False
+
+    def close(self) -> None:
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,121 @@
+"""
+Checkpoint Journal Module
+Durable per-file record of analysis results for commits that are still in progress
+"""
+import os
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointJournal:
+    """Append-only JSONL journal of finished file analyses.
+
+    Every successful file analysis is appended (and fsynced) as soon as it
+    completes, so a run that crashes or is stopped part-way through a
+    commit can pick up the results it already paid for. Once a commit is
+    recorded in the tracker its entries are marked done and dropped at the
+    next compaction. A torn last line from a crash is ignored on load.
+    """
+
+    def __init__(self, journal_file: str = './data/analysis_journal.jsonl', compact_after: int = 1000):
+        self.journal_file = journal_file
+        self.compact_after = compact_after
+        self.reused = 0
+        self.recorded = 0
+        self._entries = {}  # (target, commit) -> {file_path: {'blob_sha', 'analysis'}}
+        self._done_lines = 0
+        self._lock = threading.Lock()
+
+        Path(journal_file).parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+        with self._lock:
+            self._compact()
+        if self._entries:
+            files = sum(len(files) for files in self._entries.values())
+            logger.info(f"Checkpoint journal has {files} file result(s) from {len(self._entries)} unfinished commit(s)")
+
+    def _load(self) -> None:
+        """Replay the journal into memory"""
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning("Skipping a torn checkpoint journal line")
+                    continue
+                key = (entry.get('target'), entry.get('commit'))
+                if entry.get('done'):
+                    self._entries.pop(key, None)
+                else:
+                    self._entries.setdefault(key, {})[entry['file']] = {
+                        'blob_sha': entry.get('blob_sha'),
+                        'analysis': entry.get('analysis')
+                    }
+
+    def _append(self, entry: Dict) -> None:
+        """Durably append one line (lock held)"""
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only unfinished commits (lock held)"""
+        temp_file = f"{self.journal_file}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            for (target, commit), files in self._entries.items():
+                for file_path, entry in files.items():
+                    f.write(json.dumps({
+                        'target': target, 'commit': commit, 'file': file_path,
+                        'blob_sha': entry['blob_sha'], 'analysis': entry['analysis']
+                    }, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.journal_file)
+        self._done_lines = 0
+
+    def get(self, target: str, commit: str, file_path: str, blob_sha: str = None) -> Optional[Dict]:
+        """Return the journaled analysis of a file in a commit, or None"""
+        with self._lock:
+            entry = self._entries.get((target, commit), {}).get(file_path)
+            if entry is None or entry['blob_sha'] != blob_sha:
+                return None
+            self.reused += 1
+            return dict(entry['analysis'])
+
+    def record(self, target: str, commit: str, file_path: str, blob_sha: str, analysis: Dict) -> None:
+        """Checkpoint a finished file analysis (failed analyses are not kept)"""
+        if analysis.get('error'):
+            return
+        try:
+            with self._lock:
+                self._append({
+                    'target': target, 'commit': commit, 'file': file_path,
+                    'blob_sha': blob_sha, 'analysis': analysis
+                })
+                self._entries.setdefault((target, commit), {})[file_path] = {
+                    'blob_sha': blob_sha, 'analysis': analysis
+                }
+                self.recorded += 1
+        except Exception as e:
+            logger.warning(f"Error writing checkpoint journal: {str(e)}")
+
+    def complete(self, target: str, commit: str) -> None:
+        """Forget a commit once it is recorded as analyzed"""
+        try:
+            with self._lock:
+                if self._entries.pop((target, commit), None) is None:
+                    return
+                self._append({'target': target, 'commit': commit, 'done': True})
+                self._done_lines += 1
+                if self._done_lines >= self.compact_after:
+                    self._compact()
+        except Exception as e:
+            logger.warning(f"Error updating checkpoint journal: {str(e)}")
@@ -0,0 +1,142 @@
+"""
+Chunking Module
+Splits oversized source files into analyzable chunks and merges the results
+"""
+import logging
+from typing import Callable, Dict, List
+
+from src.diff_context import FUNCTION_HEADER_PATTERN
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = ['none', 'low', 'medium', 'high', 'critical']
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def split_into_chunks(content: str, max_tokens: int = 3000, overlap_lines: int = 10,
+                      estimate_tokens: Callable[[str], int] = approximate_tokens) -> List[Dict]:
+    """Split content into chunks of at most max_tokens.
+
+    Chunks break at function/class boundaries where possible; a single
+    definition that is still too large is cut into fixed line windows that
+    overlap by overlap_lines. Returns [{'start_line', 'end_line', 'text'}].
+    """
+    lines = content.splitlines()
+    if not lines:
+        return []
+
+    # Prefix sums of per-line token estimates keep budgeting linear in file size
+    prefix = [0]
+    for line in lines:
+        prefix.append(prefix[-1] + estimate_tokens(line + '\n'))
+
+    def tokens(start: int, end: int) -> int:
+        return prefix[end] - prefix[start]
+
+    # Segments run from one top-level-ish definition header to the next
+    header_indent = min(
+        (len(line) - len(line.lstrip()) for line in lines if FUNCTION_HEADER_PATTERN.match(line)),
+        default=0
+    )
+    boundaries = [0] + [
+        index for index, line in enumerate(lines)
+        if index > 0 and FUNCTION_HEADER_PATTERN.match(line)
+        and len(line) - len(line.lstrip()) <= header_indent
+    ]
+    segments = list(zip(boundaries, boundaries[1:] + [len(lines)]))
+
+    chunks = []
+    current_start, current_end = None, None
+    for start, end in segments:
+        if current_start is not None:
+            if tokens(current_start, end) <= max_tokens:
+                current_end = end
+                continue
+            chunks.append(_make_chunk(lines, current_start, current_end))
+            current_start = None
+
+        if tokens(start, end) <= max_tokens:
+            current_start, current_end = start, end
+        else:
+            chunks.extend(_line_windows(lines, start, end, max_tokens, overlap_lines, tokens))
+
+    if current_start is not None:
+        chunks.append(_make_chunk(lines, current_start, current_end))
+    return chunks
+
+
+def _make_chunk(lines: List[str], start: int, end: int) -> Dict:
+    """Build a chunk from 0-based [start, end) line indexes"""
+    return {'start_line': start + 1, 'end_line': end, 'text': '\n'.join(lines[start:end])}
+
+
+def _line_windows(lines: List[str], start: int, end: int, max_tokens: int, overlap_lines: int,
+                  tokens: Callable[[int, int], int]) -> List[Dict]:
+    """Cut [start, end) into overlapping windows that fit the token budget"""
+    windows = []
+    position = start
+    while position < end:
+        window_end = position + 1
+        while window_end < end and tokens(position, window_end + 1) <= max_tokens:
+            window_end += 1
+        windows.append(_make_chunk(lines, position, window_end))
+        if window_end >= end:
+            break
+        position = max(window_end - overlap_lines, position + 1)
+    return windows
+
+
+def merge_chunk_results(chunk_results: List[Dict]) -> Dict:
+    """Merge per-chunk analyses into one result, de-duplicating errors.
+
+    Each chunk result must already have file-relative line numbers.
+    """
+    errors, seen = [], set()
+    severity = 'none'
+    summaries = []
+    failed = []
+
+    for result in chunk_results:
+        if result.get('error'):
+            failed.append(result['error'])
+            continue
+        for error in result.get('errors') or []:
+            if not isinstance(error, dict):
+                continue
+            key = (error.get('line'), error.get('type'), str(error.get('message', '')).strip().lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            errors.append(error)
+        if result.get('severity') in SEVERITY_ORDER:
+            severity = max(severity, result['severity'], key=SEVERITY_ORDER.index)
+        if result.get('summary'):
+            summaries.append(result['summary'])
+
+    usage = {}
+    for result in chunk_results:
+        for key, value in (result.get('usage') or {}).items():
+            usage[key] = (usage.get(key) or 0) + (value or 0)
+
+    errors.sort(key=lambda e: (e.get('line') is None, e.get('line') or 0))
+    merged = {
+        'has_errors': bool(errors) or any(r.get('has_errors') for r in chunk_results),
+        'severity': severity,
+        'errors': errors,
+        'summary': ' '.join(summaries),
+        'chunks': len(chunk_results),
+        'usage': usage
+    }
+    retryable = any(r.get('error') and r.get('retryable') for r in chunk_results)
+    if failed and (retryable or len(failed) == len(chunk_results)):
+        # A transient chunk failure fails the whole file so it is retried later
+        merged['error'] = failed[0]
+        merged['retryable'] = retryable
+    elif failed:
+        logger.warning(f"{len(failed)} of {len(chunk_results)} chunks failed to analyze")
+    return merged
+
@@ -4,16 +4,27 @@ Tracks analyzed commits to avoid duplicates
 """
 import os
 import json
+import time
+import sqlite3
 import logging
+import threading
 from pathlib import Path
+from typing import List, Optional
+
+from src.metrics import timed
 
 logger = logging.getLogger(__name__)
 
 
 class CommitTracker:
-    def __init__(self, tracking_file: str = './data/analyzed_commits.json'):
+    def __init__(self, tracking_file: str = './data/analyzed_commits.json', branch: str = None,
+                 legacy_file: str = None):
         self.tracking_file = tracking_file
+        self.branch = branch
         self.data = self._load_tracking_data()
+        
+        if legacy_file and not os.path.exists(tracking_file):
+            self._import_legacy(legacy_file)
     
     def _load_tracking_data(self) -> dict:
         """Load tracking data from file"""
@@ -26,6 +37,25 @@ class CommitTracker:
         
         return {'commits': {}}
     
+    def _import_legacy(self, legacy_file: str) -> None:
+        """Seed a new per-target file with this branch's commits from the single-repository file"""
+        try:
+            if not os.path.exists(legacy_file):
+                return
+            with open(legacy_file, 'r') as f:
+                legacy = json.load(f).get('commits', {})
+            
+            self.data['commits'] = {
+                commit_hash: dict(entry, branch=entry.get('branch') or self.branch)
+                for commit_hash, entry in legacy.items()
+                if entry.get('branch') in (None, self.branch)
+            }
+            self._save_tracking_data()
+            logger.info(f"Imported {len(self.data['commits'])} tracked commits from {legacy_file}")
+        except Exception as e:
+            logger.error(f"Error importing tracking data from {legacy_file}: {str(e)}")
+    
+    @timed('tracker_write_seconds', backend='json')
     def _save_tracking_data(self) -> bool:
         """Save tracking data to file"""
         try:
@@ -43,20 +73,39 @@ class CommitTracker:
     
     def mark_commit_analyzed(self, commit_hash: str, analysis_results: dict, commit_info: dict = None) -> bool:
         """Mark a commit as analyzed"""
+        return self.mark_commits_analyzed([(commit_hash, analysis_results, commit_info)])
+    
+    def mark_commits_analyzed(self, entries: List[tuple]) -> bool:
+        """Mark several (commit_hash, analysis_results, commit_info) entries with one save"""
         try:
-            self.data['commits'][commit_hash] = {
-                'analysis_results': analysis_results,
-                'commit_info': commit_info or {}
-            }
+            for commit_hash, analysis_results, commit_info in entries:
+                # Re-marked commits move to the end, as they get a new row in SQLiteCommitTracker
+                self.data['commits'].pop(commit_hash, None)
+                self.data['commits'][commit_hash] = {
+                    'analysis_results': analysis_results,
+                    'commit_info': commit_info or {},
+                    'branch': self.branch
+                }
             return self._save_tracking_data()
         except Exception as e:
-            logger.error(f"Error marking commit as analyzed: {str(e)}")
+            logger.error(f"Error marking commits as analyzed: {str(e)}")
             return False
     
     def get_all_analyzed_commits(self) -> list:
         """Get list of all analyzed commits"""
         return list(self.data['commits'].keys())
     
+    def get_last_analyzed_commit(self, branch: str = None) -> Optional[str]:
+        """Get the most recently analyzed commit, optionally for one branch.
+        
+        Entries recorded before branches were tracked have no branch and
+        match any branch.
+        """
+        for commit_hash, entry in reversed(list(self.data['commits'].items())):
+            if branch is None or entry.get('branch') in (None, branch):
+                return commit_hash
+        return None
+    
     def reset(self) -> bool:
         """Reset all tracking data"""
         try:
@@ -66,3 +115,221 @@ class CommitTracker:
         except Exception as e:
             logger.error(f"Error resetting tracking data: {str(e)}")
             return False
+
+
+class SQLiteCommitTracker:
+    """Commit tracker backed by an indexed SQLite database (WAL mode)"""
+    
+    def __init__(self, db_file: str = './data/analyzed_commits.db', branch: str = None,
+                 legacy_json_file: str = None, legacy_db_file: str = None, legacy_tracking_file: str = None):
+        self.db_file = db_file
+        self.branch = branch
+        self._lock = threading.Lock()
+        
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        
+        if legacy_json_file:
+            self._migrate_from_json(legacy_json_file)
+        if legacy_db_file or legacy_tracking_file:
+            self._import_legacy(legacy_db_file, legacy_tracking_file)
+    
+    def _create_schema(self) -> None:
+        """Create tables and indexes if they do not exist"""
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS analyzed_commits (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    commit_hash TEXT NOT NULL UNIQUE,
+                    branch TEXT,
+                    analyzed_at REAL NOT NULL,
+                    analysis_results TEXT,
+                    commit_info TEXT
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analyzed_commits_branch ON analyzed_commits (branch, id)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tracker_meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+    
+    def _migrate_from_json(self, json_file: str) -> None:
+        """One-time import of commits tracked by the JSON CommitTracker"""
+        try:
+            with self._lock:
+                done = self._conn.execute(
+                    "SELECT value FROM tracker_meta WHERE key = 'json_migrated'"
+                ).fetchone()
+            if done or not os.path.exists(json_file):
+                return
+            
+            with open(json_file, 'r') as f:
+                legacy = json.load(f).get('commits', {})
+            
+            entries = [
+                (commit_hash, entry.get('analysis_results', {}), entry.get('commit_info', {}),
+                 entry.get('branch', self.branch))
+                for commit_hash, entry in legacy.items()
+            ]
+            with self._lock, self._conn:
+                self._insert(entries)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tracker_meta (key, value) VALUES ('json_migrated', ?)",
+                    (json_file,)
+                )
+            logger.info(f"Migrated {len(entries)} tracked commits from {json_file}")
+        except Exception as e:
+            logger.error(f"Error migrating tracking data from {json_file}: {str(e)}")
+    
+    def _import_legacy(self, legacy_db_file: str = None, legacy_tracking_file: str = None) -> None:
+        """Seed a new per-target database with this branch's commits from the single-repository tracker.
+        
+        Only a database that was never seeded and is still empty is seeded,
+        so commits already tracked here stay the most recent ones.
+        """
+        try:
+            with self._lock:
+                done = self._conn.execute(
+                    "SELECT value FROM tracker_meta WHERE key = 'legacy_imported'"
+                ).fetchone()
+                if done or self._conn.execute("SELECT 1 FROM analyzed_commits LIMIT 1").fetchone():
+                    return
+            
+            if legacy_db_file and os.path.exists(legacy_db_file):
+                source = legacy_db_file
+                legacy = sqlite3.connect(legacy_db_file)
+                try:
+                    rows = legacy.execute(
+                        """SELECT commit_hash, analysis_results, commit_info, branch FROM analyzed_commits
+                           WHERE branch = ? OR branch IS NULL ORDER BY id""",
+                        (self.branch,)
+                    ).fetchall()
+                finally:
+                    legacy.close()
+                entries = [
+                    (commit_hash, json.loads(results or '{}'), json.loads(info or '{}'), branch or self.branch)
+                    for commit_hash, results, info, branch in rows
+                ]
+            elif legacy_tracking_file and os.path.exists(legacy_tracking_file):
+                source = legacy_tracking_file
+                with open(legacy_tracking_file, 'r') as f:
+                    legacy = json.load(f).get('commits', {})
+                entries = [
+                    (commit_hash, entry.get('analysis_results', {}), entry.get('commit_info', {}),
+                     entry.get('branch') or self.branch)
+                    for commit_hash, entry in legacy.items()
+                    if entry.get('branch') in (None, self.branch)
+                ]
+            else:
+                return
+            
+            with self._lock, self._conn:
+                self._insert(entries)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tracker_meta (key, value) VALUES ('legacy_imported', ?)",
+                    (source,)
+                )
+            logger.info(f"Imported {len(entries)} tracked commits from {source}")
+        except Exception as e:
+            logger.error(f"Error importing tracking data: {str(e)}")
+    
+    def _insert(self, entries: List[tuple]) -> None:
+        """Insert (hash, results, info, branch) rows (lock and transaction held by caller)"""
+        now = time.time()
+        self._conn.executemany(
+            """INSERT OR REPLACE INTO analyzed_commits
+               (commit_hash, branch, analyzed_at, analysis_results, commit_info)
+               VALUES (?, ?, ?, ?, ?)""",
+            [
+                (commit_hash, branch, now, json.dumps(results, default=str),
+                 json.dumps(info or {}, default=str))
+                for commit_hash, results, info, branch in entries
+            ]
+        )
+    
+    def is_commit_analyzed(self, commit_hash: str) -> bool:
+        """Check if a commit has already been analyzed"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM analyzed_commits WHERE commit_hash = ?", (commit_hash,)
+            ).fetchone()
+        return row is not None
+    
+    def mark_commit_analyzed(self, commit_hash: str, analysis_results: dict, commit_info: dict = None) -> bool:
+        """Mark a commit as analyzed"""
+        return self.mark_commits_analyzed([(commit_hash, analysis_results, commit_info)])
+    
+    @timed('tracker_write_seconds', backend='sqlite')
+    def mark_commits_analyzed(self, entries: List[tuple]) -> bool:
+        """Mark several (commit_hash, analysis_results, commit_info) entries in one transaction"""
+        try:
+            with self._lock, self._conn:
+                self._insert([(h, results, info, self.branch) for h, results, info in entries])
+            return True
+        except Exception as e:
+            logger.error(f"Error marking commits as analyzed: {str(e)}")
+            return False
+    
+    def get_all_analyzed_commits(self) -> list:
+        """Get list of all analyzed commits"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT commit_hash FROM analyzed_commits ORDER BY id"
+            ).fetchall()
+        return [row[0] for row in rows]
+    
+    def get_last_analyzed_commit(self, branch: str = None) -> Optional[str]:
+        """Get the most recently analyzed commit, optionally for one branch.
+        
+        Entries recorded before branches were tracked have no branch and
+        match any branch.
+        """
+        with self._lock:
+            if branch is None:
+                row = self._conn.execute(
+                    "SELECT commit_hash FROM analyzed_commits ORDER BY id DESC LIMIT 1"
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    """SELECT commit_hash FROM analyzed_commits WHERE branch = ? OR branch IS NULL
+                       ORDER BY id DESC LIMIT 1""",
+                    (branch,)
+                ).fetchone()
+        return row[0] if row else None
+    
+    def reset(self) -> bool:
+        """Reset all tracking data"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM analyzed_commits")
+            logger.info("Tracking data reset")
+            return True
+        except Exception as e:
+            logger.error(f"Error resetting tracking data: {str(e)}")
+            return False
+
+
+def get_commit_tracker(backend: str = 'sqlite', **kwargs):
+    """Factory function to get the configured commit tracker"""
+    backend = backend.lower()
+    branch = kwargs.get('branch')
+    json_file = kwargs.get('tracking_file', './data/analyzed_commits.json')
+    # Single-repository tracker to seed a new per-target tracker from (REPO_TARGETS)
+    legacy_json_file = kwargs.get('legacy_tracking_file')
+    
+    if backend == 'sqlite':
+        db_file = kwargs.get('db_file', './data/analyzed_commits.db')
+        return SQLiteCommitTracker(
+            db_file, branch=branch, legacy_json_file=json_file,
+            legacy_db_file=kwargs.get('legacy_db_file'), legacy_tracking_file=legacy_json_file
+        )
+    
+    elif backend == 'json':
+        return CommitTracker(json_file, branch=branch, legacy_file=legacy_json_file)
+    
+    else:
+        raise ValueError(f"Unknown tracking backend: {backend}")
@@ -0,0 +1,158 @@
+"""
+Diff Context Module
+Builds line-numbered code excerpts around the lines a commit changed
+"""
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HUNK_HEADER_PATTERN = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+# Escapes git uses in C-quoted paths, besides three-digit octal bytes
+C_ESCAPES = {'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13, '"': 34, '\\': 92}
+
+# Lines that open a function/class/method in the supported languages
+FUNCTION_HEADER_PATTERN = re.compile(
+    r'^\s*(?:'
+    r'(?:async\s+)?def\s+\w+|class\s+\w+'                                   # python
+    r'|(?:export\s+)?(?:async\s+)?function\b'                               # js/ts
+    r'|(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?fn\s+\w+'                      # rust
+    r'|func\s+'                                                             # go/swift
+    r'|(?!(?:if|for|while|switch|return|else|catch|do)\b)'
+    r'(?:[\w:<>,\[\]*&]+\s+)+[\w:~]+\s*\([^;{]*\)\s*(?:const\s*)?\{?\s*$'      # c/c++/java/php
+    r')'
+)
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of a path, e.g. "b/\\303\\244.py" -> b/ä.py"""
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+    body, raw, index = path[1:-1], bytearray(), 0
+    while index < len(body):
+        char = body[index]
+        if char == '\\' and index + 1 < len(body):
+            octal = body[index + 1:index + 4]
+            if re.fullmatch(r'[0-7]{3}', octal):
+                raw.append(int(octal, 8))
+                index += 4
+            else:
+                escaped = body[index + 1]
+                raw.append(C_ESCAPES.get(escaped, ord(escaped)))
+                index += 2
+            continue
+        raw.extend(char.encode('utf-8'))
+        index += 1
+    return raw.decode('utf-8', errors='replace')
+
+
+def parse_changed_line_ranges(diff_text: str) -> Dict[str, List[Tuple[int, int]]]:
+    """Parse a -U0 unified diff into {path: [(start, end), ...]} new-file line ranges.
+
+    Pure deletions are recorded as a one-line range at the deletion point so
+    the surrounding code is still shown to the model. Paths are returned as
+    in the commit's tree: git's C-quoting is undone, and so is the tab it
+    appends to unquoted paths that contain a space.
+    """
+    ranges = {}
+    current_path = None
+    for line in diff_text.splitlines():
+        if line.startswith('+++ '):
+            target = line[4:]
+            if target.startswith('"'):
+                target = unquote_path(target)
+            elif target.endswith('\t'):
+                target = target[:-1]
+            current_path = target[2:] if target.startswith('b/') else None
+            if current_path is not None:
+                ranges.setdefault(current_path, [])
+            continue
+
+        match = HUNK_HEADER_PATTERN.match(line)
+        if match and current_path is not None:
+            start = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count == 0:
+                ranges[current_path].append((max(start, 1), max(start, 1)))
+            else:
+                ranges[current_path].append((start, start + count - 1))
+    return ranges
+
+
+def build_excerpt_windows(content: str, changed_ranges: List[Tuple[int, int]],
+                          context_lines: int = 5, enclosing_function: bool = False) -> List[Tuple[int, int]]:
+    """Expand changed line ranges by context (or to the enclosing function) and merge overlaps"""
+    lines = content.splitlines()
+    total = len(lines)
+    if total == 0:
+        return []
+
+    windows = []
+    for start, end in sorted(changed_ranges):
+        start = min(max(start, 1), total)
+        end = min(max(end, start), total)
+        if enclosing_function:
+            start, end = _enclosing_function_bounds(lines, start, end)
+        windows.append((max(1, start - context_lines), min(total, end + context_lines)))
+
+    merged = []
+    for start, end in windows:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _enclosing_function_bounds(lines: List[str], start: int, end: int) -> Tuple[int, int]:
+    """Widen [start, end] to the nearest function header above and the next one below"""
+    header = None
+    for number in range(start, 0, -1):
+        if FUNCTION_HEADER_PATTERN.match(lines[number - 1]):
+            header = number
+            break
+    if header is None:
+        return start, end
+
+    indent = _indentation(lines[header - 1])
+    for number in range(end + 1, len(lines) + 1):
+        text = lines[number - 1]
+        if text.strip() and _indentation(text) <= indent and FUNCTION_HEADER_PATTERN.match(text):
+            return header, number - 1
+    return header, len(lines)
+
+
+def _indentation(line: str) -> int:
+    """Width of a line's leading whitespace"""
+    return len(line) - len(line.lstrip())
+
+
+def render_excerpts(content: str, windows: List[Tuple[int, int]],
+                    changed_ranges: List[Tuple[int, int]]) -> str:
+    """Render windows as '<line> | code' blocks, marking changed lines with '+'"""
+    lines = content.splitlines()
+    width = len(str(windows[-1][1])) if windows else 1
+    changed = set()
+    for start, end in changed_ranges:
+        changed.update(range(start, end + 1))
+
+    blocks = []
+    for start, end in windows:
+        block = [
+            f"{'+' if number in changed else ' '}{number:>{width}} | {lines[number - 1]}"
+            for number in range(start, end + 1)
+        ]
+        blocks.append('\n'.join(block))
+    return '\n...\n'.join(blocks)
+
+
+def map_line_to_windows(line: Optional[int], windows: List[Tuple[int, int]]) -> Optional[int]:
+    """Keep a reported line number only if it falls inside an excerpt shown to the model"""
+    if not isinstance(line, int):
+        return None
+    for start, end in windows:
+        if start <= line <= end:
+            return line
+    return None
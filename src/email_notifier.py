@@ -2,162 +2,227 @@
 Email Notifier Module
 Sends email notifications to committers
 """
+import time
+import queue
+import random
 import smtplib
 import logging
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Dict, List
+
+from src.email_templates import render_html, render_text
+from src.metrics import get_metrics, timed
 
 logger = logging.getLogger(__name__)
 
+# SMTP exceptions after which the connection is dropped and the send retried
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPHeloError, OSError)
+
 
 class EmailNotifier:
-    def __init__(self, sender: str, password: str, smtp_server: str = 'smtp.gmail.com', smtp_port: int = 587):
+    """Sends notifications over one reused, authenticated SMTP connection.
+    
+    With background=True messages are queued and a worker thread sends
+    them, so callers never wait on SMTP handshakes. Dropped connections are
+    re-opened and transient failures (disconnects, 4xx replies) retried with
+    jittered exponential backoff. The connection is closed after
+    idle_timeout seconds without messages.
+    """
+    
+    def __init__(self, sender: str, password: str, smtp_server: str = 'smtp.gmail.com', smtp_port: int = 587,
+                 use_tls: bool = True, timeout: float = 30.0, background: bool = False, queue_size: int = 100,
+                 max_retries: int = 3, retry_base_delay: float = 1.0, idle_timeout: float = 60.0):
         self.sender = sender
         self.password = password
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.background = background
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.idle_timeout = idle_timeout
+        self.stats = {'sent': 0, 'failed': 0, 'retries': 0, 'connections': 0}
+        self._server = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._worker = None
+        self._worker_lock = threading.Lock()
     
     def send_error_notification(self, recipient_email: str, author_name: str, branch: str,
                                folder_name: str, analysis_results: dict) -> bool:
-        """Send email notification about code errors"""
+        """Send (or, in background mode, queue) an email notification about code errors"""
         try:
             subject = f"[Code Analyzer] Issues found in {branch} branch - {folder_name}"
-            body = self._build_email_body(author_name, branch, folder_name, analysis_results)
-            
-            message = MIMEMultipart()
-            message['From'] = self.sender
-            message['To'] = recipient_email
-            message['Subject'] = subject
-            message.attach(MIMEText(body, 'html'))
-            
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender, self.password)
-                server.send_message(message)
-            
-            logger.info(f"Email sent to {recipient_email}")
-            return True
-        except smtplib.SMTPAuthenticationError:
-            logger.error("SMTP authentication failed. Check EMAIL_SENDER and EMAIL_PASSWORD.")
-            return False
+            html_body = self._build_email_body(author_name, branch, folder_name, analysis_results)
+            text_body = self._build_text_body(author_name, branch, folder_name, analysis_results)
+            return self._send(recipient_email, subject, html_body, text_body)
         except Exception as e:
             logger.error(f"Error sending email: {str(e)}")
             return False
     
-    def _build_email_body(self, author_name: str, branch: str, folder_name: str, analysis_results: dict) -> str:
-        """Build HTML email body"""
-        html = f"""
-        <html>
-            <head>
-                <style>
-                    body {{ font-family: Arial, sans-serif; color: #333; }}
-                    .container {{ max-width: 800px; margin: 0 auto; }}
-                    .header {{ background-color: #f44336; color: white; padding: 20px; text-align: center; }}
-                    .content {{ padding: 20px; background-color: #f9f9f9; }}
-                    .section {{ margin: 20px 0; padding: 15px; background-color: white; border-radius: 5px; }}
-                    .error-critical {{ border-left: 5px solid #d32f2f; }}
-                    .error-high {{ border-left: 5px solid #f57c00; }}
-                    .error-medium {{ border-left: 5px solid #fbc02d; }}
-                    .error-low {{ border-left: 5px solid #388e3c; }}
-                    .file-name {{ font-weight: bold; color: #1976d2; margin-top: 10px; }}
-                    .error-list {{ margin: 10px 0; padding-left: 20px; }}
-                    .error-item {{ margin: 10px 0; padding: 10px; background-color: #f5f5f5; border-radius: 3px; }}
-                    .severity {{ font-weight: bold; padding: 2px 8px; border-radius: 3px; display: inline-block; }}
-                    .severity-critical {{ background-color: #d32f2f; color: white; }}
-                    .severity-high {{ background-color: #f57c00; color: white; }}
-                    .severity-medium {{ background-color: #fbc02d; color: black; }}
-                    .severity-low {{ background-color: #388e3c; color: white; }}
-                    .footer {{ color: #999; font-size: 12px; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>⚠️ Code Analysis Issues Detected</h1>
-                    </div>
-                    <div class="content">
-                        <p>Hello <strong>{author_name}</strong>,</p>
-                        <p>AI code analysis has detected issues in your recent commit:</p>
-                        
-                        <div class="section">
-                            <p><strong>🌳 Branch:</strong> {branch}</p>
-                            <p><strong>📁 Folder:</strong> {folder_name}</p>
-                            <p><strong>🔍 Analysis Tool:</strong> AI Code Analyzer (Powered by GPT/Claude)</p>
-                        </div>
-        """
-        
-        # Add file-specific errors
-        if 'files' in analysis_results:
-            for file_result in analysis_results['files']:
-                if file_result.get('errors') or file_result.get('has_errors'):
-                    html += f"""
-                        <div class="section error-{file_result.get('severity', 'low')}">
-                            <div class="file-name">📄 {file_result.get('file', 'Unknown')}</div>
-                            <p><strong>Language:</strong> {file_result.get('language', 'Unknown')}</p>
-                    """
-                    
-                    if file_result.get('errors'):
-                        html += '<div class="error-list">'
-                        for error in file_result['errors']:
-                            if isinstance(error, dict):
-                                line = error.get('line', 'N/A')
-                                msg = error.get('message', '')
-                                severity = error.get('severity', 'medium').lower()
-                                error_type = error.get('type', 'unknown')
-                                suggestion = error.get('suggestion', '')
-                                
-                                html += f"""
-                                    <div class="error-item">
-                                        <span class="severity severity-{severity}">{severity.upper()}</span>
-                                        <strong>{error_type.replace('_', ' ').title()}</strong>
-                                        {f'(Line {line})' if line != 'N/A' else ''}<br>
-                                        <p>{msg}</p>
-                                        {f'<p><em>💡 Suggestion: {suggestion}</em></p>' if suggestion else ''}
-                                    </div>
-                                """
-                        html += '</div>'
-                    
-                    if file_result.get('summary'):
-                        html += f'<p><strong>Summary:</strong> {file_result["summary"]}</p>'
-                    
-                    html += '</div>'
-        
-        html += """
-                        <div class="section">
-                            <p>👉 <strong>Next Steps:</strong></p>
-                            <ul>
-                                <li>Review the issues listed above</li>
-                                <li>Make the necessary fixes in your code</li>
-                                <li>Commit and push the corrected code</li>
-                                <li>The analyzer will re-check on your next commit</li>
-                            </ul>
-                        </div>
-                        
-                        <div class="footer">
-                            <p>This is an automated message from AI Code Analyzer. Please do not reply to this email.</p>
-                            <p>For questions or to disable notifications, contact your project administrator.</p>
-                        </div>
-                    </div>
-                </div>
-            </body>
-        </html>
-        """
+    def send_digest_notification(self, recipient_email: str, author_name: str, branches: List[str],
+                                 commits: List[str], file_results: List[Dict]) -> bool:
+        """Send one consolidated email covering several commits and folders"""
+        try:
+            issues = sum(len(result.get('errors') or []) for result in file_results)
+            folders = list(dict.fromkeys(result.get('folder', '') for result in file_results))
+            subject = (f"[Code Analyzer] {issues} issue(s) in {len(commits)} commit(s) "
+                       f"on {', '.join(branches)}")
+            args = (author_name, ', '.join(branches), ', '.join(folders), {'files': file_results})
+            html_body = self._build_email_body(*args, commit_count=len(commits))
+            text_body = self._build_text_body(*args, commit_count=len(commits))
+            return self._send(recipient_email, subject, html_body, text_body)
+        except Exception as e:
+            logger.error(f"Error sending digest email: {str(e)}")
+            return False
+    
+    def _send(self, recipient_email: str, subject: str, html_body: str, text_body: str) -> bool:
+        """Build the message and send it now or hand it to the background sender"""
+        message = MIMEMultipart('alternative')
+        message['From'] = self.sender
+        message['To'] = recipient_email
+        message['Subject'] = subject
+        # Clients show the last alternative they support, so HTML goes after plain text
+        message.attach(MIMEText(text_body, 'plain', 'utf-8'))
+        message.attach(MIMEText(html_body, 'html', 'utf-8'))
         
-        return html
+        if self.background:
+            self._start_worker()
+            self._queue.put(message)  # blocks when the queue is full
+            return True
+        return self._deliver(message)
+    
+    def _connect(self) -> smtplib.SMTP:
+        """Open an SMTP session (STARTTLS and login when configured)"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.password:
+                server.login(self.sender, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.stats['connections'] += 1
+        get_metrics().inc('smtp_connections_total')
+        logger.info(f"Connected to SMTP server {self.smtp_server}:{self.smtp_port}")
+        return server
+    
+    def _disconnect(self) -> None:
+        """Close the pooled session (lock held)"""
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+    
+    @timed('smtp_send_seconds')
+    def _deliver(self, message) -> bool:
+        """Send one message over the pooled connection, reconnecting and retrying transient failures"""
+        with self._lock:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if self._server is None:
+                        self._server = self._connect()
+                    self._server.send_message(message)
+                    self.stats['sent'] += 1
+                    get_metrics().inc('smtp_messages_total', outcome='sent')
+                    logger.info(f"Email sent to {message['To']}")
+                    return True
+                except smtplib.SMTPAuthenticationError:
+                    logger.error("SMTP authentication failed. Check EMAIL_SENDER and EMAIL_PASSWORD.")
+                    self._disconnect()
+                    break
+                except (smtplib.SMTPResponseException, *_CONNECTION_ERRORS) as e:
+                    code = getattr(e, 'smtp_code', None)
+                    if isinstance(e, smtplib.SMTPResponseException) and not 400 <= code < 500:
+                        logger.error(f"Email to {message['To']} rejected: {str(e)}")
+                        break
+                    self._disconnect()
+                    if attempt >= self.max_retries:
+                        logger.error(f"Error sending email to {message['To']}: {str(e)}")
+                        break
+                    self.stats['retries'] += 1
+                    get_metrics().inc('smtp_retries_total')
+                    delay = random.uniform(0, self.retry_base_delay * (2 ** attempt))
+                    logger.warning(f"SMTP send failed ({str(e)}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                    time.sleep(delay)
+                except Exception as e:
+                    logger.error(f"Error sending email to {message['To']}: {str(e)}")
+                    break
+            self.stats['failed'] += 1
+            get_metrics().inc('smtp_messages_total', outcome='failed')
+            return False
+    
+    def _start_worker(self) -> None:
+        """Start the background sender on first use"""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._drain, name='email-sender', daemon=True)
+                self._worker.start()
+    
+    def _drain(self) -> None:
+        """Worker loop: send queued messages, closing the connection when idle"""
+        while True:
+            try:
+                message = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._disconnect()
+                continue
+            try:
+                if message is None:
+                    return
+                self._deliver(message)
+            finally:
+                self._queue.task_done()
+    
+    def flush(self) -> None:
+        """Wait until every queued message has been sent (or given up on)"""
+        if self._worker is not None:
+            self._queue.join()
+    
+    def close(self) -> None:
+        """Send what is queued, stop the worker and close the SMTP connection"""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        self._worker = None
+        with self._lock:
+            self._disconnect()
+        logger.info(f"Email notifier closed: {self.stats}")
+    
+    def get_stats(self) -> Dict:
+        """Return sent/failed/retry counters and the queue length"""
+        return dict(self.stats, queued=self._queue.qsize())
+    
+    def _build_email_body(self, author_name: str, branch: str, folder_name: str, analysis_results: dict,
+                          commit_count: int = 1) -> str:
+        """Build HTML email body from the precompiled templates"""
+        return render_html(author_name, branch, folder_name, analysis_results, commit_count)
+    
+    def _build_text_body(self, author_name: str, branch: str, folder_name: str, analysis_results: dict,
+                         commit_count: int = 1) -> str:
+        """Build the plain-text alternative of the email body"""
+        return render_text(author_name, branch, folder_name, analysis_results, commit_count)
     
     def test_email_configuration(self) -> bool:
         """Test if email configuration is correct"""
         try:
-            message = MIMEMultipart()
+            message = MIMEMultipart('alternative')
             message['From'] = self.sender
             message['To'] = self.sender
             message['Subject'] = '[Code Analyzer] Test Email'
+            message.attach(MIMEText('Test email from Code Analyzer. Configuration is working!', 'plain'))
             message.attach(MIMEText('<p>Test email from Code Analyzer. Configuration is working!</p>', 'html'))
             
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.sender, self.password)
-                server.send_message(message)
+            if not self._deliver(message):
+                return False
             
             logger.info("Test email sent successfully")
             return True
@@ -0,0 +1,203 @@
+"""
+Email Templates Module
+Precompiled notification templates rendered into HTML and plain text with escaping
+"""
+from html import escape
+from string import Template
+from typing import Dict, List
+
+SEVERITIES = ('critical', 'high', 'medium', 'low')
+
+# Compiled once at import; every render only substitutes escaped values
+PAGE_START = Template("""<html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; color: #333; }
+            .container { max-width: 800px; margin: 0 auto; }
+            .header { background-color: #f44336; color: white; padding: 20px; text-align: center; }
+            .content { padding: 20px; background-color: #f9f9f9; }
+            .section { margin: 20px 0; padding: 15px; background-color: white; border-radius: 5px; }
+            .error-critical { border-left: 5px solid #d32f2f; }
+            .error-high { border-left: 5px solid #f57c00; }
+            .error-medium { border-left: 5px solid #fbc02d; }
+            .error-low { border-left: 5px solid #388e3c; }
+            .file-name { font-weight: bold; color: #1976d2; margin-top: 10px; }
+            .error-list { margin: 10px 0; padding-left: 20px; }
+            .error-item { margin: 10px 0; padding: 10px; background-color: #f5f5f5; border-radius: 3px; }
+            .severity { font-weight: bold; padding: 2px 8px; border-radius: 3px; display: inline-block; }
+            .severity-critical { background-color: #d32f2f; color: white; }
+            .severity-high { background-color: #f57c00; color: white; }
+            .severity-medium { background-color: #fbc02d; color: black; }
+            .severity-low { background-color: #388e3c; color: white; }
+            .footer { color: #999; font-size: 12px; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <h1>⚠️ Code Analysis Issues Detected</h1>
+            </div>
+            <div class="content">
+                <p>Hello <strong>$author_name</strong>,</p>
+                <p>AI code analysis has detected issues in $commits_text:</p>
+                <div class="section">
+                    <p><strong>🌳 Branch:</strong> $branch</p>
+                    <p><strong>📁 Folder:</strong> $folder_name</p>
+                    <p><strong>🔍 Analysis Tool:</strong> AI Code Analyzer (Powered by GPT/Claude)</p>
+                </div>
+""")
+
+FILE_START = Template("""                <div class="section error-$severity">
+                    <div class="file-name">📄 $file</div>
+                    <p><strong>Language:</strong> $language</p>
+""")
+
+ERROR_ITEM = Template("""                        <div class="error-item">
+                            <span class="severity severity-$severity">$severity_label</span>
+                            <strong>$error_type</strong> $line<br>
+                            <p>$message</p>$suggestion
+                        </div>
+""")
+
+SUGGESTION = Template("""
+                            <p><em>💡 Suggestion: $suggestion</em></p>""")
+
+FILE_SUMMARY = Template("""                    <p><strong>Summary:</strong> $summary</p>
+""")
+
+PAGE_END = """                <div class="section">
+                    <p>👉 <strong>Next Steps:</strong></p>
+                    <ul>
+                        <li>Review the issues listed above</li>
+                        <li>Make the necessary fixes in your code</li>
+                        <li>Commit and push the corrected code</li>
+                        <li>The analyzer will re-check on your next commit</li>
+                    </ul>
+                </div>
+                <div class="footer">
+                    <p>This is an automated message from AI Code Analyzer. Please do not reply to this email.</p>
+                    <p>For questions or to disable notifications, contact your project administrator.</p>
+                </div>
+            </div>
+        </div>
+    </body>
+</html>
+"""
+
+TEXT_START = Template("""Hello $author_name,
+
+AI code analysis has detected issues in $commits_text.
+
+Branch: $branch
+Folder: $folder_name
+""")
+
+TEXT_END = """
+Next steps: review the issues listed above, fix them, and commit and push the corrected code.
+The analyzer will re-check on your next commit.
+
+This is an automated message from AI Code Analyzer. Please do not reply to this email.
+"""
+
+
+def _text(value, default: str = '') -> str:
+    """Model output as a string (it may be missing or not a string at all)"""
+    return default if value is None or value == '' else str(value)
+
+
+def _severity(value, default: str) -> str:
+    """Severity usable as a CSS class suffix"""
+    severity = _text(value, default).lower()
+    return severity if severity in SEVERITIES else default
+
+
+def _commits_text(commit_count: int) -> str:
+    return 'your recent commit' if commit_count == 1 else f'your last {commit_count} commits'
+
+
+def _reported_files(analysis_results: Dict) -> List[Dict]:
+    return [
+        result for result in analysis_results.get('files') or []
+        if result.get('errors') or result.get('has_errors')
+    ]
+
+
+def _error_fields(error: Dict) -> Dict:
+    """Display values of one error, before escaping"""
+    line = error.get('line')
+    return {
+        'severity': _severity(error.get('severity'), 'medium'),
+        'error_type': _text(error.get('type'), 'unknown').replace('_', ' ').title(),
+        'line': f'(Line {line})' if line not in (None, '', 'N/A') else '',
+        'message': _text(error.get('message')),
+        'suggestion': _text(error.get('suggestion'))
+    }
+
+
+def render_html(author_name: str, branch: str, folder_name: str, analysis_results: Dict,
+                commit_count: int = 1) -> str:
+    """Render the HTML notification; every model- or commit-supplied value is escaped"""
+    parts = [PAGE_START.substitute(
+        author_name=escape(_text(author_name)),
+        commits_text=_commits_text(commit_count),
+        branch=escape(_text(branch)),
+        folder_name=escape(_text(folder_name))
+    )]
+
+    for file_result in _reported_files(analysis_results):
+        parts.append(FILE_START.substitute(
+            severity=_severity(file_result.get('severity'), 'low'),
+            file=escape(_text(file_result.get('file'), 'Unknown')),
+            language=escape(_text(file_result.get('language'), 'Unknown'))
+        ))
+
+        errors = [error for error in file_result.get('errors') or [] if isinstance(error, dict)]
+        if errors:
+            parts.append('                    <div class="error-list">\n')
+            for error in errors:
+                fields = _error_fields(error)
+                parts.append(ERROR_ITEM.substitute(
+                    severity=fields['severity'],
+                    severity_label=fields['severity'].upper(),
+                    error_type=escape(fields['error_type']),
+                    line=escape(fields['line']),
+                    message=escape(fields['message']),
+                    suggestion=SUGGESTION.substitute(suggestion=escape(fields['suggestion']))
+                    if fields['suggestion'] else ''
+                ))
+            parts.append('                    </div>\n')
+
+        if file_result.get('summary'):
+            parts.append(FILE_SUMMARY.substitute(summary=escape(_text(file_result['summary']))))
+        parts.append('                </div>\n')
+
+    parts.append(PAGE_END)
+    return ''.join(parts)
+
+
+def render_text(author_name: str, branch: str, folder_name: str, analysis_results: Dict,
+                commit_count: int = 1) -> str:
+    """Render the plain-text alternative of the notification"""
+    parts = [TEXT_START.substitute(
+        author_name=_text(author_name),
+        commits_text=_commits_text(commit_count),
+        branch=_text(branch),
+        folder_name=_text(folder_name)
+    )]
+
+    for file_result in _reported_files(analysis_results):
+        parts.append(f"\n{_text(file_result.get('file'), 'Unknown')} "
+                     f"({_text(file_result.get('language'), 'Unknown')})\n")
+        for error in file_result.get('errors') or []:
+            if not isinstance(error, dict):
+                continue
+            fields = _error_fields(error)
+            parts.append(f"  - [{fields['severity'].upper()}] {fields['error_type']} {fields['line']}".rstrip())
+            parts.append(f"\n    {fields['message']}\n")
+            if fields['suggestion']:
+                parts.append(f"    Suggestion: {fields['suggestion']}\n")
+        if file_result.get('summary'):
+            parts.append(f"  Summary: {_text(file_result['summary'])}\n")
+
+    parts.append(TEXT_END)
+    return ''.join(parts)
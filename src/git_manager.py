@@ -5,11 +5,17 @@ Handles cloning, pulling, and fetching commit information
 import os
 import shutil
 import logging
+import binascii
 from datetime import datetime
 from pathlib import Path
 
+from src.metrics import timed
+
 logger = logging.getLogger(__name__)
 
+# Separates commit records in bulk `git log` output
+RECORD_SEPARATOR = '\x1e'
+
 
 class GitManager:
     def __init__(self, repo_url: str, repo_path: str = './repo_clone', branch: str = 'dev'):
@@ -18,6 +24,7 @@ class GitManager:
         self.branch = branch
         self.repo = None
     
+    @timed('git_operation_seconds', operation='update')
     def clone_or_update_repo(self) -> bool:
         """Clone the repository if it doesn't exist, otherwise update it."""
         try:
@@ -29,8 +36,11 @@ class GitManager:
             
             if os.path.exists(self.repo_path):
                 logger.info(f"Repository exists at {self.repo_path}. Updating...")
-                self.repo = Repo(self.repo_path)
-                self.repo.remotes.origin.pull(self.branch)
+                if self.repo is None:
+                    self.repo = Repo(self.repo_path)
+                # Fetch and reset rather than pull, so a force-pushed branch is followed too
+                self.repo.remotes.origin.fetch(f'+refs/heads/{self.branch}:refs/remotes/origin/{self.branch}')
+                self.repo.git.checkout('-f', '-B', self.branch, f'origin/{self.branch}')
                 logger.info("Repository updated successfully")
             else:
                 logger.info(f"Cloning repository from {self.repo_url}")
@@ -42,47 +52,181 @@ class GitManager:
             logger.error(f"Error cloning/updating repository: {str(e)}")
             return False
     
-    def get_new_commits(self, since_commit: str = None) -> list:
-        """Get all new commits since a specific commit."""
+    @timed('git_operation_seconds', operation='ls_remote')
+    def get_remote_head(self):
+        """Get the remote branch tip with `git ls-remote` (no objects are fetched).
+        
+        Returns the commit SHA, or None if the branch is missing or the
+        remote cannot be reached.
+        """
+        try:
+            from git import Git
+            
+            output = Git().ls_remote(self.repo_url, f'refs/heads/{self.branch}')
+            return output.split()[0] if output.strip() else None
+        except Exception as e:
+            logger.error(f"Error reading remote head of {self.branch}: {str(e)}")
+            return None
+    
+    @timed('git_operation_seconds', operation='is_ancestor')
+    def is_ancestor(self, commit: str, descendant: str = None) -> bool:
+        """Check whether commit is reachable from descendant (default: the branch).
+        
+        False when it is not, including when the commit no longer exists
+        locally (e.g. it was rewritten by a force-push and garbage collected).
+        """
         try:
             from git import Repo
             
             if self.repo is None:
                 self.repo = Repo(self.repo_path)
+            self.repo.git.merge_base('--is-ancestor', commit, descendant or self.branch)
+            return True
+        except Exception:
+            return False
+    
+    @timed('git_operation_seconds', operation='merge_base')
+    def get_merge_base(self, commit: str, other: str = None):
+        """Get the newest common ancestor of commit and other (default: the branch), or None"""
+        try:
+            from git import Repo
+            
+            if self.repo is None:
+                self.repo = Repo(self.repo_path)
+            return self.repo.git.merge_base(commit, other or self.branch).strip() or None
+        except Exception as e:
+            logger.warning(f"No merge base for {commit[:8]}: {str(e)}")
+            return None
+    
+    @timed('git_operation_seconds', operation='log')
+    def get_commit_records(self, since_commit: str = None, max_count: int = 100, until_commit: str = None) -> list:
+        """Get new commits as compact records from a single streamed `git log --raw` pass.
+        
+        Each record has 'hash', 'author_name', 'author_email', 'message',
+        'timestamp' and 'modified_files' plus 'files', a list of
+        {'path', 'status', 'blob_sha'} entries (blob_sha is the post-commit
+        blob, None for deletions). Records are newest first, at most
+        max_count without since_commit. until_commit (default: the branch tip) bounds
+        the range, e.g. to the 'after' SHA of a pushed range.
+        """
+        try:
+            from git import Repo
             
+            if self.repo is None:
+                self.repo = Repo(self.repo_path)
+            
+            args = [
+                '--raw', '--no-abbrev', '--no-renames', '-z',
+                '--diff-merges=first-parent',
+                f'--format={RECORD_SEPARATOR}%H%x00%an%x00%ae%x00%ct%x00%B%x00'
+            ]
+            until = until_commit or self.branch
             if since_commit:
-                commits = list(self.repo.iter_commits(f'{since_commit}..{self.branch}'))
+                args.append(f'{since_commit}..{until}')
             else:
-                commits = list(self.repo.iter_commits(self.branch, max_count=100))
+                args.extend([f'--max-count={max_count}', until])
+            
+            process = self.repo.git.log(*args, as_process=True)
+            records = [self._parse_commit_record(raw) for raw in self._iter_raw_records(process.proc.stdout)]
+            process.wait()
             
-            logger.info(f"Found {len(commits)} commits")
-            return commits
+            logger.info(f"Found {len(records)} commits")
+            return records
         except Exception as e:
-            logger.error(f"Error getting commits: {str(e)}")
+            logger.error(f"Error getting commit records: {str(e)}")
             return []
     
-    def get_commit_details(self, commit) -> dict:
-        """Extract commit details"""
+    @staticmethod
+    def _iter_raw_records(stream, chunk_size: int = 65536):
+        """Yield raw commit records from git log output as it is streamed"""
+        separator = RECORD_SEPARATOR.encode()
+        buffer = b''
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+            *complete, buffer = buffer.split(separator)
+            for raw in complete:
+                if raw:
+                    yield raw
+        if buffer:
+            yield buffer
+    
+    @staticmethod
+    def _parse_commit_record(raw: bytes) -> dict:
+        """Parse one `--format=...%x00 --raw -z` commit record"""
+        fields = raw.decode('utf-8', errors='replace').split('\0')
+        commit_hash, author_name, author_email, committed_date, message = fields[:5]
+        
+        files = []
+        tokens = iter(token.lstrip('\n') for token in fields[5:])
+        for token in tokens:
+            if not token.startswith(':'):
+                continue
+            # ":<old mode> <new mode> <old sha> <new sha> <status>" then the path
+            _, _, _, new_sha, status = token[1:].split(' ')
+            path = next(tokens, '')
+            files.append({
+                'path': path,
+                'status': status[0],
+                'blob_sha': None if set(new_sha) == {'0'} else new_sha
+            })
+        
+        return {
+            'hash': commit_hash,
+            'author_name': author_name,
+            'author_email': author_email,
+            'message': message,
+            'timestamp': datetime.fromtimestamp(int(committed_date)),
+            'modified_files': [f['path'] for f in files],
+            'files': files
+        }
+    
+    @timed('git_operation_seconds', operation='changed_lines')
+    def get_changed_line_ranges(self, commit_hash: str) -> dict:
+        """Get {path: [(start, end), ...]} new-file line ranges changed by a commit.
+        
+        Uses one zero-context `git show` per commit (first parent for merges).
+        """
         try:
-            return {
-                'hash': commit.hexsha,
-                'author_name': commit.author.name,
-                'author_email': commit.author.email,
-                'message': commit.message,
-                'timestamp': datetime.fromtimestamp(commit.committed_date),
-                'modified_files': list(commit.stats.files.keys())
-            }
+            from git import Repo
+            from src.diff_context import parse_changed_line_ranges
+            
+            if self.repo is None:
+                self.repo = Repo(self.repo_path)
+            
+            diff_text = self.repo.git.show(
+                commit_hash, '-U0', '--format=', '--no-renames', '--no-color',
+                '--diff-merges=first-parent'
+            )
+            return parse_changed_line_ranges(diff_text)
         except Exception as e:
-            logger.error(f"Error getting commit details: {str(e)}")
+            logger.error(f"Error getting changed lines for {commit_hash[:8]}: {str(e)}")
             return {}
     
-    def get_modified_files_in_commit(self, commit) -> list:
-        """Get list of modified files in a commit"""
+    @timed('git_operation_seconds', operation='read_blob')
+    def read_blob(self, blob_sha: str, max_size: int = None) -> dict:
+        """Read a blob by SHA directly from the object database"""
         try:
-            return list(commit.stats.files.keys())
+            from git import Repo
+            
+            if self.repo is None:
+                self.repo = Repo(self.repo_path)
+            
+            stream = self.repo.odb.stream(binascii.a2b_hex(blob_sha))
+            if max_size is not None and stream.size > max_size:
+                logger.warning(f"Blob too large ({stream.size} bytes): {blob_sha[:8]}")
+                return None
+            
+            return {
+                'content': stream.read().decode('utf-8', errors='ignore'),
+                'blob_sha': blob_sha,
+                'size': stream.size
+            }
         except Exception as e:
-            logger.error(f"Error getting modified files: {str(e)}")
-            return []
+            logger.error(f"Error reading blob {blob_sha[:8]}: {str(e)}")
+            return None
     
     def cleanup(self) -> bool:
         """Remove the cloned repository"""
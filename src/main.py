@@ -3,12 +3,20 @@ Main Orchestrator
 Coordinates AI analysis, Git management, and email notifications
 """
 import os
+import asyncio
 import logging
+import signal
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 
+from src.metrics import get_metrics
+from src.tracing import current_span, get_tracer, propagate
+
 # Setup logging
 def setup_logging(log_file: str = './logs/code_analyzer.log'):
     """Setup logging configuration"""
@@ -28,150 +36,896 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
+class CommitDeferred(Exception):
+    """Raised when a commit's files failed transiently and it should be retried next run"""
+
+
+class CommitWork:
+    """One commit moving through the analysis pipeline"""
+    
+    def __init__(self, target, index: int, record: Dict):
+        self.target = target
+        self.index = index  # position in the target's backlog, for in-order stages
+        self.record = record
+        self.candidates = []
+        self.blobs = []
+        self.analyses = []
+        self.error_reports = []
+        self.deferred = None
+        self.span = None
+
+
 class AICodeAnalyzerOrchestrator:
     def __init__(self):
         try:
             from src.git_manager import GitManager
             from src.email_notifier import EmailNotifier
-            from src.commit_tracker import CommitTracker
+            from src.commit_tracker import get_commit_tracker
             from src.ai_analyzer import get_analyzer
+            from src.repo_targets import (
+                RepoTarget, parse_repo_targets, target_name, target_slug, namespaced_path
+            )
+            from src.analysis_cache import AnalysisCache
+            from src.checkpoint_journal import CheckpointJournal
+            from src.notification_digest import DigestCollector
             from config.config import (
-                REPO_URL, REPO_BRANCH, REPO_LOCAL_PATH,
+                REPO_URL, REPO_BRANCH, REPO_LOCAL_PATH, REPO_TARGETS,
                 AI_PROVIDER, EMAIL_SENDER, EMAIL_PASSWORD,
-                EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT, TRACKED_COMMITS_FILE
+                EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT, EMAIL_USE_TLS, EMAIL_BACKGROUND_SEND,
+                EMAIL_QUEUE_SIZE, EMAIL_MAX_RETRIES, EMAIL_IDLE_TIMEOUT_SECONDS,
+                NOTIFICATION_MODE, DIGEST_MAX_ISSUES, DIGEST_MAX_COMMITS, DIGEST_WINDOW_SECONDS, DIGEST_STATE_FILE,
+                TRACKED_COMMITS_FILE,
+                TRACKING_BACKEND, TRACKED_COMMITS_DB, TRACKER_BATCH_SIZE,
+                ANALYSIS_CACHE_ENABLED, ANALYSIS_CACHE_FILE,
+                ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_MAX_BYTES,
+                CHECKPOINT_ENABLED, CHECKPOINT_JOURNAL_FILE,
+                ANALYSIS_EXECUTION_MODE, ANALYSIS_MAX_WORKERS,
+                PIPELINE_QUEUE_SIZE, PIPELINE_EXTRACT_WORKERS, PIPELINE_ANALYSIS_WORKERS,
+                PIPELINE_NOTIFY_WORKERS,
+                ANALYSIS_MODE, DIFF_CONTEXT_LINES, DIFF_CONTEXT_MODE,
+                MAX_FILE_SIZE_BYTES, CHUNKING_ENABLED, CHUNK_MAX_TOKENS,
+                CHUNK_OVERLAP_LINES, MAX_CHUNKED_FILE_SIZE_BYTES, AI_MAX_OUTPUT_TOKENS, AI_STREAM_RESPONSES,
+                AI_STRUCTURED_OUTPUT, AI_PROMPT_CACHING,
+                BATCH_ANALYSIS_ENABLED, BATCH_MAX_TOKENS, BATCH_MAX_FILES, BATCH_SMALL_FILE_TOKENS,
+                METRICS_ENABLED, METRICS_REPORT_FILE, METRICS_PROMETHEUS_FILE, METRICS_HOST, METRICS_PORT,
+                TRACING_ENABLED, TRACE_EXPORTER, TRACE_FILE, OTLP_ENDPOINT, TRACE_SERVICE_NAME
             )
             
-            self.git_manager = GitManager(REPO_URL, REPO_LOCAL_PATH, REPO_BRANCH)
-            self.ai_analyzer = get_analyzer(AI_PROVIDER)
-            self.email_notifier = EmailNotifier(EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT)
-            self.commit_tracker = CommitTracker(TRACKED_COMMITS_FILE)
+            # Spans per run, commit, file and provider call, written as JSONL or sent to an OTLP collector
+            if TRACING_ENABLED:
+                from src.tracing import configure_tracing
+                configure_tracing(TRACE_EXPORTER, TRACE_FILE, OTLP_ENDPOINT, TRACE_SERVICE_NAME)
+            
+            # Stage latencies and token counts, reported after each run and served in daemon mode
+            get_metrics().enabled = METRICS_ENABLED
+            self.metrics_report_file = METRICS_REPORT_FILE if METRICS_ENABLED else ''
+            self.metrics_prometheus_file = METRICS_PROMETHEUS_FILE if METRICS_ENABLED else ''
+            self.metrics_address = (METRICS_HOST, METRICS_PORT if METRICS_ENABLED else 0)
             
-            self.repo_url = REPO_URL
-            self.repo_branch = REPO_BRANCH
-            self.repo_path = REPO_LOCAL_PATH
+            self.analysis_cache = None
+            if ANALYSIS_CACHE_ENABLED:
+                self.analysis_cache = AnalysisCache(
+                    ANALYSIS_CACHE_FILE, ANALYSIS_CACHE_MAX_ENTRIES, ANALYSIS_CACHE_MAX_BYTES
+                )
             
-            logger.info("AI Code Analyzer Orchestrator initialized")
+            # Per-file results of unfinished commits survive crashes and restarts
+            self.checkpoint_journal = CheckpointJournal(CHECKPOINT_JOURNAL_FILE) if CHECKPOINT_ENABLED else None
+            
+            self.ai_analyzer = get_analyzer(AI_PROVIDER, cache=self.analysis_cache)
+            self.ai_analyzer.analysis_mode = ANALYSIS_MODE
+            self.ai_analyzer.diff_context_lines = DIFF_CONTEXT_LINES
+            self.ai_analyzer.diff_enclosing_function = DIFF_CONTEXT_MODE == 'function'
+            self.ai_analyzer.max_file_size = MAX_FILE_SIZE_BYTES
+            self.ai_analyzer.chunking_enabled = CHUNKING_ENABLED
+            self.ai_analyzer.chunk_max_tokens = CHUNK_MAX_TOKENS
+            self.ai_analyzer.chunk_overlap_lines = CHUNK_OVERLAP_LINES
+            self.ai_analyzer.max_chunked_file_size = MAX_CHUNKED_FILE_SIZE_BYTES
+            self.ai_analyzer.max_output_tokens = AI_MAX_OUTPUT_TOKENS
+            self.ai_analyzer.stream_responses = AI_STREAM_RESPONSES
+            self.ai_analyzer.structured_output = AI_STRUCTURED_OUTPUT
+            self.ai_analyzer.prompt_caching = AI_PROMPT_CACHING
+            self.ai_analyzer.batch_enabled = BATCH_ANALYSIS_ENABLED
+            self.ai_analyzer.batch_max_tokens = BATCH_MAX_TOKENS
+            self.ai_analyzer.batch_max_files = BATCH_MAX_FILES
+            self.ai_analyzer.batch_small_file_tokens = BATCH_SMALL_FILE_TOKENS
+            self.email_notifier = EmailNotifier(
+                EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT,
+                use_tls=EMAIL_USE_TLS,
+                background=EMAIL_BACKGROUND_SEND,
+                queue_size=EMAIL_QUEUE_SIZE,
+                max_retries=EMAIL_MAX_RETRIES,
+                idle_timeout=EMAIL_IDLE_TIMEOUT_SECONDS
+            )
+            
+            # Digest mode batches each author's notifications across commits and folders
+            self.digest_collector = None
+            if NOTIFICATION_MODE == 'digest':
+                self.digest_collector = DigestCollector(
+                    DIGEST_MAX_ISSUES, DIGEST_MAX_COMMITS, DIGEST_WINDOW_SECONDS, DIGEST_STATE_FILE
+                )
+            
+            # Monitored branches share the analyzer, its rate limiters and the notifier;
+            # each has its own clone and tracker namespace
+            self.targets = []
+            repo_targets = parse_repo_targets(REPO_TARGETS, REPO_BRANCH)
+            for repo_url, branch in repo_targets or [(REPO_URL, REPO_BRANCH)]:
+                name = target_name(repo_url, branch)
+                if any(target.name == name for target in self.targets):
+                    raise ValueError(f"Duplicate repository target: {name}")
+                legacy = {}
+                if repo_targets:
+                    slug = target_slug(name)
+                    repo_path = os.path.join(REPO_LOCAL_PATH, slug)
+                    tracking_file = namespaced_path(TRACKED_COMMITS_FILE, slug)
+                    db_file = namespaced_path(TRACKED_COMMITS_DB, slug)
+                    # The REPO_URL/REPO_BRANCH target picks up where the single-repository tracker left off
+                    if name == target_name(REPO_URL, REPO_BRANCH):
+                        legacy = {'legacy_tracking_file': TRACKED_COMMITS_FILE, 'legacy_db_file': TRACKED_COMMITS_DB}
+                else:
+                    repo_path, tracking_file, db_file = REPO_LOCAL_PATH, TRACKED_COMMITS_FILE, TRACKED_COMMITS_DB
+                self.targets.append(RepoTarget(
+                    name, repo_url, branch,
+                    GitManager(repo_url, repo_path, branch),
+                    get_commit_tracker(
+                        TRACKING_BACKEND,
+                        tracking_file=tracking_file,
+                        db_file=db_file,
+                        branch=branch,
+                        **legacy
+                    )
+                ))
+            
+            # Worker pool for concurrent per-commit file analysis
+            self.executor = None
+            if ANALYSIS_EXECUTION_MODE == 'threaded' and ANALYSIS_MAX_WORKERS > 1:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=ANALYSIS_MAX_WORKERS, thread_name_prefix='analyzer'
+                )
+            
+            self.execution_mode = ANALYSIS_EXECUTION_MODE
+            
+            # Per-stage workers of the commit pipeline (aggregation and tracker writes are ordered)
+            self.pipeline_queue_size = PIPELINE_QUEUE_SIZE
+            self.tracker_batch_size = TRACKER_BATCH_SIZE
+            self.pipeline_workers = {
+                'extract': PIPELINE_EXTRACT_WORKERS,
+                'analyze': PIPELINE_ANALYSIS_WORKERS,
+                'notify': PIPELINE_NOTIFY_WORKERS
+            }
+            self.analysis_mode = ANALYSIS_MODE
+            
+            logger.info(f"AI Code Analyzer Orchestrator initialized for {', '.join(t.name for t in self.targets)}")
         except Exception as e:
             logger.error(f"Initialization error: {str(e)}")
             raise
     
-    def run(self) -> Dict:
-        """Main execution flow"""
-        summary = {
-            'timestamp': datetime.now().isoformat(),
-            'commits_analyzed': 0,
-            'issues_found': 0,
-            'emails_sent': 0,
-            'status': 'success'
-        }
+    def run(self, until_commit: str = None, since_commit: str = None, targets: List = None) -> Dict:
+        """Main execution flow.
         
-        try:
-            # Step 1: Clone/update repository
-            logger.info("Step 1: Cloning/updating repository...")
-            if not self.git_manager.clone_or_update_repo():
-                logger.error("Failed to clone/update repository")
-                summary['status'] = 'failed'
-                return summary
-            
-            # Step 2: Get new commits
-            logger.info("Step 2: Fetching new commits...")
-            analyzed_commits = self.commit_tracker.get_all_analyzed_commits()
-            last_commit = analyzed_commits[-1] if analyzed_commits else None
-            new_commits = self.git_manager.get_new_commits(last_commit)
+        targets limits the run to some of the monitored branches (all by
+        default). until_commit bounds the analysis (e.g. a pushed range's
+        head) and since_commit is where to start when nothing was analyzed
+        yet; both only make sense for a single target.
+        """
+        summary = self._new_summary()
+        started = time.perf_counter()
+        targets = targets or self.targets
+        
+        with get_tracer().span('run', mode='sync', targets=','.join(t.name for t in targets)) as span:
+            try:
+                scheduler = self._schedule_commits(summary, targets, until_commit, since_commit)
+                if not len(scheduler):
+                    return summary
+                
+                # Step 3: Analyze commits in overlapping stages
+                logger.info("Step 3: Analyzing commits...")
+                self._run_pipeline(summary, scheduler, self._analyze_blobs)
+                
+                return self._finish_summary(summary)
             
-            if not new_commits:
-                logger.info("No new commits to analyze")
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+                summary['status'] = 'failed'
+                summary['error'] = str(e)
                 return summary
-            
-            logger.info(f"Found {len(new_commits)} new commits to analyze")
-            
-            # Step 3: Analyze each commit
-            logger.info("Step 3: Analyzing commits...")
-            for commit in reversed(new_commits):  # Oldest first
-                commit_details = self.git_manager.get_commit_details(commit)
-                commit_hash = commit_details.get('hash')
-                
-                logger.info(f"Analyzing commit {commit_hash[:8]}...")
+            finally:
+                span.set_attributes(
+                    status=summary['status'], commits_analyzed=summary['commits_analyzed'],
+                    issues_found=summary['issues_found']
+                )
+                self._report_metrics(summary, time.perf_counter() - started)
+    
+    async def run_async(self, until_commit: str = None, since_commit: str = None, targets: List = None) -> Dict:
+        """Main execution flow using the async analyzer backends.
+        
+        The pipeline's stages run in threads; its analysis stage hands each
+        commit's files to this event loop.
+        """
+        summary = self._new_summary()
+        started = time.perf_counter()
+        targets = targets or self.targets
+        
+        with get_tracer().span('run', mode='async', targets=','.join(t.name for t in targets)) as span:
+            try:
+                scheduler = await asyncio.to_thread(
+                    self._schedule_commits, summary, targets, until_commit, since_commit
+                )
+                if not len(scheduler):
+                    return summary
                 
-                # Get modified files
-                modified_files = self.git_manager.get_modified_files_in_commit(commit)
+                # Step 3: Analyze commits in overlapping stages
+                logger.info("Step 3: Analyzing commits (async)...")
+                loop = asyncio.get_running_loop()
                 
-                # Analyze files
-                error_reports = self._analyze_commit_files(modified_files)
+                def analyze(work):
+                    return asyncio.run_coroutine_threadsafe(self._analyze_blobs_async(work), loop).result()
                 
-                if error_reports:
-                    summary['issues_found'] += len(error_reports)
-                    
-                    # Send notifications
-                    logger.info(f"Sending notifications for {len(error_reports)} file(s) with issues...")
-                    self._send_notifications(commit_details, error_reports)
-                    summary['emails_sent'] += 1
+                await asyncio.to_thread(self._run_pipeline, summary, scheduler, analyze)
                 
-                # Mark as analyzed
-                self.commit_tracker.mark_commit_analyzed(
-                    commit_hash,
-                    {'files_analyzed': len(modified_files), 'issues': len(error_reports)},
-                    commit_details
-                )
-                summary['commits_analyzed'] += 1
+                return self._finish_summary(summary)
             
-            logger.info(f"Analysis complete. Summary: {summary}")
-            return summary
-        
-        except Exception as e:
-            logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-            summary['status'] = 'failed'
-            summary['error'] = str(e)
-            return summary
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+                summary['status'] = 'failed'
+                summary['error'] = str(e)
+                return summary
+            finally:
+                span.set_attributes(
+                    status=summary['status'], commits_analyzed=summary['commits_analyzed'],
+                    issues_found=summary['issues_found']
+                )
+                self._report_metrics(summary, time.perf_counter() - started)
     
-    def _analyze_commit_files(self, modified_files: List[str]) -> List[Dict]:
-        """Analyze files in a commit"""
-        error_reports = []
+    
+    def run_daemon(self, poll_interval: float = 60) -> None:
+        """Keep running, analyzing whenever a monitored branch tip moves.
+        
+        Clients, the repo handles, trackers and notifier stay warm between
+        cycles. Each poll is a cheap `git ls-remote` per target; the full
+        fetch and analysis only run for targets whose tip differs from the
+        last fully analyzed one (a failed or partial target is retried on
+        the next poll).
+        """
+        stop = self._stop_on_signals()
+        # One event loop for the daemon's lifetime keeps async clients reusable
+        loop = asyncio.new_event_loop() if self.execution_mode == 'async' else None
+        analyzed_tips = {}
+        metrics_server = self._start_metrics_server()
+        logger.info(f"Daemon started; polling {', '.join(t.name for t in self.targets)} every {poll_interval}s")
         
         try:
-            for file_path in modified_files:
-                # Skip certain files
-                if file_path.endswith('qn.txt') or file_path.startswith('.'):
-                    continue
+            while not stop.is_set():
+                tips = {}
+                for target in self.targets:
+                    tip = target.git_manager.get_remote_head()
+                    if tip is None:
+                        logger.warning(f"Could not read the remote tip of {target.name}; will retry")
+                    elif tip != analyzed_tips.get(target.name):
+                        logger.info(f"{target.name} is at {tip[:8]}; running analysis")
+                        tips[target.name] = tip
                 
-                # Get folder name
-                path_parts = file_path.split('/')
-                if len(path_parts) < 2:
+                changed = [target for target in self.targets if target.name in tips]
+                if changed:
+                    summary = self._run_cycle(loop, targets=changed)
+                    for target in changed:
+                        if 'error' not in summary and summary['targets'].get(target.name, {}).get('status') == 'success':
+                            analyzed_tips[target.name] = tips[target.name]
+                self._flush_digests()
+                stop.wait(poll_interval)
+        finally:
+            if loop:
+                loop.close()
+            self._close_digests()
+            self.email_notifier.close()
+            self.ai_analyzer.close()
+            get_tracer().shutdown()
+            if metrics_server:
+                metrics_server.stop()
+            logger.info("Daemon stopped")
+    
+    def run_webhook(self, host: str = '127.0.0.1', port: int = 8085, secret: str = None,
+                    path: str = '/webhook') -> None:
+        """Serve a push webhook endpoint and analyze each pushed range as it arrives.
+        
+        Pushes to branches or repositories that are not monitored are
+        ignored; pushes that arrive while one is pending for the same target
+        are merged into it.
+        """
+        from src.webhook_server import PushQueue, WebhookServer
+        
+        def target_for(push):
+            return next((target for target in self.targets if target.matches_push(push)), None)
+        
+        stop = self._stop_on_signals()
+        loop = asyncio.new_event_loop() if self.execution_mode == 'async' else None
+        def is_ancestor(commit, descendant, push):
+            target = target_for(push)
+            with target.lock:
+                return target.git_manager.is_ancestor(commit, descendant)
+        
+        pushes = PushQueue(key=lambda push: target_for(push).name, is_ancestor=is_ancestor)
+        server = WebhookServer(pushes, host, port, secret, path, accept=lambda push: target_for(push) is not None)
+        server.start()
+        metrics_server = self._start_metrics_server()
+        
+        try:
+            while not stop.is_set():
+                push = pushes.get(timeout=1.0)
+                if push is None:
                     continue
-                
-                folder_name = path_parts[0]
-                file_name = path_parts[-1]
-                
-                # Check if code file
-                from pathlib import Path
-                ext = Path(file_path).suffix
-                if ext not in ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.rb', '.php', '.swift']:
+                target = target_for(push)
+                logger.info(f"Analyzing push to {target.name} up to {push['after'][:8]}")
+                summary = self._run_cycle(
+                    loop, until_commit=push['after'], since_commit=push['before'], targets=[target]
+                )
+                if summary['status'] != 'success':
+                    # Requeue so the range is retried with the next delivery or poll
+                    pushes.retry(push)
+                    stop.wait(5)
+        finally:
+            server.stop()
+            if loop:
+                loop.close()
+            self._close_digests()
+            self.email_notifier.close()
+            self.ai_analyzer.close()
+            get_tracer().shutdown()
+            if metrics_server:
+                metrics_server.stop()
+            logger.info("Webhook receiver stopped")
+    
+    def _start_metrics_server(self):
+        """Serve /metrics for the long-running modes when METRICS_PORT is set"""
+        host, port = self.metrics_address
+        if not port:
+            return None
+        from src.metrics import MetricsServer
+        
+        server = MetricsServer(get_metrics(), host, port)
+        server.start()
+        return server
+    
+    def _report_metrics(self, summary: Dict, seconds: float) -> None:
+        """Record the run's outcome and write the JSON report and Prometheus text file"""
+        metrics = get_metrics()
+        metrics.observe('run_seconds', seconds)
+        metrics.inc('runs_total', status=summary['status'])
+        if self.metrics_report_file:
+            metrics.write_json(self.metrics_report_file, {'summary': summary})
+        if self.metrics_prometheus_file:
+            metrics.write_prometheus(self.metrics_prometheus_file)
+    
+    def _stop_on_signals(self) -> threading.Event:
+        """Event set by SIGINT/SIGTERM, for the long-running modes"""
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        return stop
+    
+    def _run_cycle(self, loop, **kwargs) -> Dict:
+        """Run one analysis pass, on the long-lived event loop in async mode"""
+        if loop is not None:
+            return loop.run_until_complete(self.run_async(**kwargs))
+        return self.run(**kwargs)
+    
+    def _new_summary(self) -> Dict:
+        """Create an empty run summary"""
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'commits_analyzed': 0,
+            'issues_found': 0,
+            'emails_sent': 0,
+            'status': 'success',
+            'targets': {}
+        }
+    
+    def _target_summary(self, summary: Dict, target) -> Dict:
+        """Per-target counters inside a run summary"""
+        return summary['targets'].setdefault(
+            target.name, {'commits_analyzed': 0, 'issues_found': 0, 'status': 'success'}
+        )
+    
+    def _schedule_commits(self, summary: Dict, targets: List, until_commit: str = None,
+                          since_commit: str = None):
+        """Fetch every target's new commits into a fair round-robin scheduler"""
+        from src.repo_targets import FairScheduler
+        
+        scheduler = FairScheduler()
+        for target in targets:
+            with get_tracer().span('fetch', target=target.name) as span:
+                records = self._fetch_new_commits(summary, target, until_commit, since_commit)
+                span.set_attribute('commits', len(records))
+            scheduler.add(target, records)
+        return scheduler
+    
+    def _fetch_new_commits(self, summary: Dict, target, until_commit: str = None, since_commit: str = None) -> List:
+        """Update a target's repository and return commits that still need analysis"""
+        target_summary = self._target_summary(summary, target)
+        
+        # Step 1: Clone/update repository
+        logger.info(f"Step 1: Cloning/updating {target.name}...")
+        if not target.git_manager.clone_or_update_repo():
+            logger.error(f"Failed to clone/update {target.name}")
+            summary['status'] = target_summary['status'] = 'failed'
+            return []
+        
+        # Step 2: Get new commits
+        logger.info("Step 2: Fetching new commits...")
+        last_commit = target.commit_tracker.get_last_analyzed_commit(target.branch)
+        rewritten = last_commit is not None and not target.git_manager.is_ancestor(last_commit, until_commit)
+        if rewritten:
+            last_commit = self._find_resume_point(target, last_commit, until_commit)
+        new_commits = target.git_manager.get_commit_records(last_commit or since_commit, until_commit=until_commit)
+        if until_commit or rewritten:
+            # A pushed range or rewritten history may overlap commits an earlier run already covered
+            new_commits = [c for c in new_commits if not target.commit_tracker.is_commit_analyzed(c['hash'])]
+        
+        if not new_commits:
+            logger.info(f"No new commits to analyze in {target.name}")
+            return []
+        
+        logger.info(f"Found {len(new_commits)} new commits to analyze in {target.name}")
+        return new_commits
+    
+    def _run_pipeline(self, summary: Dict, scheduler, analyze) -> None:
+        """Push scheduled commits through extract -> analyze -> aggregate -> notify -> record.
+        
+        Each stage has its own workers and a bounded input queue, so git
+        reads, LLM calls and SMTP sends for different commits overlap while
+        a slow stage holds back the ones feeding it. Aggregation and tracker
+        writes see each target's commits in order: a deferred commit makes
+        the rest of its target's commits skip the remaining work and stay
+        unrecorded for the next run. Tracker writes are batched per target
+        (tracker_batch_size commits) and the rest are written when the
+        pipeline finishes.
+        """
+        from src.pipeline import Stage, StagedPipeline
+        
+        deferred_targets = set()
+        unwritten = {}
+        
+        def extract(work):
+            if work.target.name not in deferred_targets:
+                with get_tracer().span('extract', parent=work.span) as span:
+                    work.candidates, work.blobs = self._load_commit_blobs(work.target, work.record)
+                    span.set_attribute('files', len(work.candidates))
+            return work
+        
+        def analyze_work(work):
+            if work.target.name not in deferred_targets and work.candidates:
+                with get_tracer().span('analyze', parent=work.span, files=len(work.candidates)) as span:
+                    try:
+                        work.analyses = analyze(work)
+                    except Exception as e:
+                        # Leave the commit unrecorded so the next run analyzes it again
+                        logger.error(f"Error analyzing commit files: {str(e)}")
+                        span.record_error(e)
+                        work.deferred = CommitDeferred(f"analysis failed: {str(e)}")
+            return work
+        
+        def aggregate(work):
+            if work.deferred is not None:
+                deferred_targets.add(work.target.name)
+            elif work.target.name not in deferred_targets:
+                try:
+                    work.error_reports = self._collect_error_reports(work.candidates, work.analyses)
+                except CommitDeferred as e:
+                    deferred_targets.add(work.target.name)
+                    work.deferred = e
+            if work.target.name in deferred_targets:
+                work.deferred = work.deferred or CommitDeferred("an earlier commit was deferred")
+                self._defer_commit(summary, work, work.deferred)
+            return work
+        
+        def notify(work):
+            # Digests also hear about clean commits, which clear issues they still list
+            if work.deferred is None and (work.error_reports or (self.digest_collector and work.candidates)):
+                with get_tracer().span('notify', parent=work.span, files=len(work.error_reports)):
+                    self._notify_commit(work)
+            return work
+        
+        def record(work):
+            if work.deferred is None:
+                entries = unwritten.setdefault(work.target, [])
+                entries.append(self._record_commit(work, summary))
+                if len(entries) >= self.tracker_batch_size:
+                    self._write_records(work.target, unwritten.pop(work.target))
+            work.span.set_attributes(issues=len(work.error_reports), deferred=str(work.deferred or '') or None)
+            work.span.end()
+            return work
+        
+        pipeline = StagedPipeline(
+            [
+                Stage('extract', extract, self.pipeline_workers['extract']),
+                Stage('analyze', analyze_work, self.pipeline_workers['analyze']),
+                Stage('aggregate', aggregate, ordered=True),
+                Stage('notify', notify, self.pipeline_workers['notify']),
+                Stage('record', record, ordered=True)
+            ],
+            queue_size=self.pipeline_queue_size,
+            order_key=lambda work: (work.target.name, work.index)
+        )
+        try:
+            pipeline.run(self._enumerate_commits(scheduler))
+        finally:
+            for target, entries in unwritten.items():
+                self._write_records(target, entries)
+        self._flush_digests()
+    
+    def _enumerate_commits(self, scheduler):
+        """Yield CommitWork items in the scheduler's fair round-robin order"""
+        counts = {}
+        while len(scheduler):
+            for target, record in scheduler.next_round():
+                index = counts.get(target.name, 0)
+                counts[target.name] = index + 1
+                logger.info(f"Queued {target.name} commit {record['hash'][:8]}")
+                work = CommitWork(target, index, record)
+                work.span = get_tracer().start_span(
+                    'commit', target=target.name, commit=record['hash'], author=record.get('author_email'),
+                    files=len(record['files'])
+                )
+                yield work
+    
+    
+    def _find_resume_point(self, target, last_commit: str, until_commit: str = None):
+        """Where to resume when the last analyzed commit is no longer on the branch.
+        
+        That happens after a force-push. The fork point of the old and new
+        history is used when the old commit is still known locally.
+        Otherwise the newest tracked commit that is still on the branch is
+        used. Returns None (recent history) if neither is found.
+        """
+        logger.warning(f"{last_commit[:8]} is no longer on {target.name} (force-push?); finding where to resume")
+        base = target.git_manager.get_merge_base(last_commit, until_commit)
+        if base:
+            logger.info(f"Resuming {target.name} from fork point {base[:8]}")
+            return base
+        
+        for commit in reversed(target.commit_tracker.get_all_analyzed_commits()[-100:]):
+            if target.git_manager.is_ancestor(commit, until_commit):
+                logger.info(f"Resuming {target.name} from {commit[:8]}, the newest analyzed commit still on the branch")
+                return commit
+        return None
+    
+    def _split_commit_record(self, record: Dict) -> tuple:
+        """Split a bulk commit record into tracker-friendly details and its file list"""
+        commit_details = {key: value for key, value in record.items() if key != 'files'}
+        return commit_details, record['modified_files']
+    
+    def _notify_commit(self, work) -> None:
+        """Email the author of a commit about the files with issues (or add them to the author's digest)"""
+        commit_details, _ = self._split_commit_record(work.record)
+        if self.digest_collector:
+            reported = {report['file_path'] for report in work.error_reports}
+            clean_files = [
+                file_path for (_, _, file_path), analysis in zip(work.candidates, work.analyses)
+                if file_path not in reported and analysis and not analysis.get('error')
+            ]
+            digest = self.digest_collector.add(commit_details, work.target.branch, work.error_reports, clean_files)
+            if digest:
+                self._send_digest(digest)
+            return
+        logger.info(f"Sending notifications for {len(work.error_reports)} file(s) with issues...")
+        self._send_notifications(work.target, commit_details, work.error_reports)
+    
+    def _flush_digests(self, force: bool = False) -> None:
+        """Send digests whose window has passed; with force (or no window), send all of them"""
+        if not self.digest_collector:
+            return
+        for digest in self.digest_collector.take_due(force or not self.digest_collector.window_seconds):
+            self._send_digest(digest)
+        self.digest_collector.save()
+    
+    def _close_digests(self) -> None:
+        """Before exiting, send digests still collecting unless they are kept for the next process"""
+        if self.digest_collector:
+            self._flush_digests(force=not self.digest_collector.state_file)
+    
+    def _send_digest(self, digest) -> None:
+        """Send one author's consolidated notification"""
+        logger.info(f"Sending digest of {digest.issue_count} issue(s) from {len(digest.commits)} commit(s) "
+                    f"to {digest.recipient_email}")
+        self.email_notifier.send_digest_notification(
+            recipient_email=digest.recipient_email,
+            author_name=digest.author_name,
+            branches=digest.branches,
+            commits=digest.commits,
+            file_results=digest.file_results()
+        )
+    
+    def _record_commit(self, work, summary: Dict) -> tuple:
+        """Count a finished commit; returns its tracker entry for _write_records"""
+        commit_details, modified_files = self._split_commit_record(work.record)
+        target_summary = self._target_summary(summary, work.target)
+        if work.error_reports:
+            summary['issues_found'] += len(work.error_reports)
+            target_summary['issues_found'] += len(work.error_reports)
+            if not self.digest_collector:
+                summary['emails_sent'] += 1
+        
+        summary['commits_analyzed'] += 1
+        target_summary['commits_analyzed'] += 1
+        get_metrics().inc('commits_analyzed_total', target=work.target.name)
+        get_metrics().inc('issues_found_total', len(work.error_reports), target=work.target.name)
+        return (
+            commit_details.get('hash'),
+            {'files_analyzed': len(modified_files), 'issues': len(work.error_reports)},
+            commit_details
+        )
+    
+    def _write_records(self, target, entries: List[tuple]) -> None:
+        """Mark recorded commits as analyzed with one tracker write, then drop their checkpoints"""
+        if not entries:
+            return
+        # Digests covering these commits must survive a restart once the commits count as analyzed
+        if self.digest_collector:
+            self.digest_collector.save()
+        # Checkpoints are kept if the write fails, so the next run redoes these commits cheaply
+        if target.commit_tracker.mark_commits_analyzed(entries) and self.checkpoint_journal:
+            for commit_hash, _, _ in entries:
+                self.checkpoint_journal.complete(target.name, commit_hash)
+    
+    def _defer_commit(self, summary: Dict, work, reason: Exception) -> None:
+        """Leave a commit for the next run.
+        
+        Called for the commit that failed transiently and for every later
+        commit of the same target; other targets keep going.
+        """
+        target_summary = self._target_summary(summary, work.target)
+        if target_summary['status'] != 'partial':
+            logger.warning(f"Deferring {work.target.name} from {work.record['hash'][:8]}: {str(reason)}")
+            target_summary['status'] = 'partial'
+            if summary['status'] == 'success':
+                summary['status'] = 'partial'
+        target_summary['commits_deferred'] = target_summary.get('commits_deferred', 0) + 1
+        summary['commits_deferred'] = summary.get('commits_deferred', 0) + 1
+    
+    
+    def _finish_summary(self, summary: Dict) -> Dict:
+        """Add cache, token and email delivery statistics and log the final summary"""
+        if self.analysis_cache:
+            cache_stats = self.analysis_cache.get_stats()
+            summary['cache_hits'] = cache_stats['hits']
+            summary['cache_misses'] = cache_stats['misses']
+        if self.checkpoint_journal:
+            summary['checkpoint_files_reused'] = self.checkpoint_journal.reused
+        if self.digest_collector:
+            summary['digests_sent'] = self.digest_collector.stats['digests']
+            summary['digest_duplicates_skipped'] = self.digest_collector.stats['duplicates']
+            summary['digests_pending'] = self.digest_collector.pending_authors()
+        
+        usage = self.ai_analyzer.get_usage_totals()
+        summary['estimated_prompt_tokens'] = usage['estimated_prompt_tokens']
+        summary['prompt_tokens'] = usage['prompt_tokens']
+        summary['completion_tokens'] = usage['completion_tokens']
+        summary['cached_prompt_tokens'] = usage['cached_prompt_tokens']
+        
+        # In routing mode each backend calls through its own provider's limiter
+        analyzers = getattr(self.ai_analyzer, 'backends', [self.ai_analyzer])
+        limiters = {id(a.rate_limiter): a.rate_limiter for a in analyzers if a.rate_limiter}
+        if limiters:
+            limiter_stats = [limiter.get_stats() for limiter in limiters.values()]
+            summary['api_retries'] = sum(stats['retries'] for stats in limiter_stats)
+            summary['api_throttled'] = sum(stats['throttled'] for stats in limiter_stats)
+        if hasattr(self.ai_analyzer, 'get_routing_stats'):
+            summary['providers'] = self.ai_analyzer.get_routing_stats()
+        
+        # Wait for this run's queued notifications so the delivery counts are final
+        self.email_notifier.flush()
+        summary['email_delivery'] = self.email_notifier.get_stats()
+        
+        logger.info(f"Analysis complete. Summary: {summary}")
+        return summary
+    
+    def _analyze_blobs(self, work) -> List[Dict]:
+        """Analyze a commit's files (results keep the order of the candidates).
+        
+        Files already in the checkpoint journal are not sent again, and each
+        new result is journaled as soon as it is ready.
+        """
+        analyses, pending = self._resume_files(work)
+        
+        def analyze(entry):
+            _, ((_, _, file_path), blob) = entry
+            with self._file_span(file_path, blob) as span:
+                analysis = self.ai_analyzer.analyze_file(
+                    file_path, blob['content'], blob['blob_sha'], blob.get('changed_lines')
+                )
+                self._annotate_file_span(span, analysis)
+            self._checkpoint_file(work, file_path, blob, analysis)
+            return analysis
+        
+        def checkpoint(position, analysis):
+            _, ((_, _, file_path), blob) = pending[position]
+            self._checkpoint_file(work, file_path, blob, analysis)
+        
+        if self.ai_analyzer.batch_enabled and len(pending) > 1:
+            # Each batch is journaled as it finishes, not when the whole commit is done
+            with get_tracer().span('batch', files=len(pending)):
+                results = self.ai_analyzer.analyze_files_batch(
+                    self._batch_items(item for _, item in pending), on_result=checkpoint
+                )
+        elif self.executor and len(pending) > 1:
+            results = list(self.executor.map(propagate(analyze), pending))
+        else:
+            results = [analyze(entry) for entry in pending]
+        
+        for (index, _), analysis in zip(pending, results):
+            analyses[index] = analysis
+        return analyses
+    
+    async def _analyze_blobs_async(self, work) -> List[Dict]:
+        """Analyze a commit's files concurrently on the event loop"""
+        analyses, pending = self._resume_files(work)
+        
+        async def analyze(entry):
+            _, ((_, _, file_path), blob) = entry
+            with self._file_span(file_path, blob) as span:
+                analysis = await self.ai_analyzer.analyze_file_async(
+                    file_path, blob['content'], blob['blob_sha'], blob.get('changed_lines')
+                )
+                self._annotate_file_span(span, analysis)
+            await asyncio.to_thread(self._checkpoint_file, work, file_path, blob, analysis)
+            return analysis
+        
+        async def checkpoint(position, analysis):
+            _, ((_, _, file_path), blob) = pending[position]
+            await asyncio.to_thread(self._checkpoint_file, work, file_path, blob, analysis)
+        
+        if self.ai_analyzer.batch_enabled and len(pending) > 1:
+            with get_tracer().span('batch', files=len(pending)):
+                results = await self.ai_analyzer.analyze_files_batch_async(
+                    self._batch_items(item for _, item in pending), on_result=checkpoint
+                )
+        else:
+            # gather() returns results in submission order
+            results = await asyncio.gather(*(analyze(entry) for entry in pending))
+        
+        for (index, _), analysis in zip(pending, results):
+            analyses[index] = analysis
+        return analyses
+    
+    def _file_span(self, file_path: str, blob: Dict):
+        """Span around one file's analysis (the analyzer's provider calls nest under it)"""
+        return get_tracer().span(
+            'file', file=file_path, size=blob.get('size', len(blob['content'])),
+            diff=blob.get('changed_lines') is not None, cache_hit=False
+        )
+    
+    def _annotate_file_span(self, span, analysis: Dict) -> None:
+        """Record a file's outcome on its span"""
+        span.set_attributes(
+            issues=len(analysis.get('errors') or []),
+            analysis_mode=analysis.get('analysis_mode')
+        )
+        if analysis.get('error'):
+            span.set_attributes(error=analysis['error'], retryable=analysis.get('retryable'))
+    
+    def _resume_files(self, work) -> tuple:
+        """Split a commit's files into journaled analyses and (index, item) pairs still to analyze"""
+        analyses, pending = [None] * len(work.candidates), []
+        for index, item in enumerate(zip(work.candidates, work.blobs)):
+            (_, _, file_path), blob = item
+            if self.checkpoint_journal:
+                journaled = self.checkpoint_journal.get(
+                    work.target.name, work.record['hash'], file_path, blob['blob_sha']
+                )
+                if journaled is not None:
+                    analyses[index] = journaled
                     continue
-                
-                # Get full path
-                full_file_path = os.path.join(self.repo_path, file_path)
-                
-                # Analyze with AI
-                analysis = self.ai_analyzer.analyze_file(full_file_path)
-                
-                # Check if errors found
-                if analysis.get('has_errors') or analysis.get('errors'):
-                    error_reports.append({
-                        'folder_name': folder_name,
-                        'file_name': file_name,
-                        'file_path': file_path,
-                        'analysis': analysis
-                    })
-                    
-                    error_count = len(analysis.get('errors', []))
-                    logger.info(f"Issues found in {folder_name}/{file_name}: {error_count} issue(s)")
+            pending.append((index, item))
+        current_span().set_attribute('files_resumed', len(analyses) - len(pending))
+        if len(pending) < len(analyses):
+            logger.info(f"Resuming commit {work.record['hash'][:8]}: "
+                        f"{len(analyses) - len(pending)} file(s) restored from the checkpoint journal")
+        return analyses, pending
+    
+    def _checkpoint_file(self, work, file_path: str, blob: Dict, analysis: Dict) -> None:
+        """Journal one finished file analysis of a commit in progress"""
+        if self.checkpoint_journal:
+            self.checkpoint_journal.record(
+                work.target.name, work.record['hash'], file_path, blob['blob_sha'], analysis
+            )
+    
+    
+    def _batch_items(self, items) -> List[Dict]:
+        """Convert (candidate, blob) pairs into analyze_files_batch inputs"""
+        return [
+            {
+                'file_path': file_path,
+                'content': blob['content'],
+                'blob_sha': blob['blob_sha'],
+                'changed_lines': blob.get('changed_lines')
+            }
+            for (_, _, file_path), blob in items
+        ]
+    
+    def _load_commit_blobs(self, target, record: Dict) -> tuple:
+        """Read each code file as it was in the commit, straight from git objects.
         
+        Deleted files (no post-commit blob) and files that are too large are
+        dropped. Reads hold the target's lock because GitPython's object
+        database is not safe to share between worker threads. Errors are
+        logged and leave the commit with no files to analyze.
+        """
+        try:
+            with target.lock:
+                return self._read_commit_blobs(target, record)
         except Exception as e:
-            logger.error(f"Error analyzing commit files: {str(e)}")
+            logger.error(f"Error reading files of commit {record['hash'][:8]}: {str(e)}")
+            return [], []
+    
+    def _read_commit_blobs(self, target, record: Dict) -> tuple:
+        """Read the blobs of _load_commit_blobs (caller holds the target's lock)"""
+        blob_shas = {f['path']: f['blob_sha'] for f in record['files'] if f['blob_sha']}
+        added = {f['path'] for f in record['files'] if f['status'] == 'A'}
+        
+        # Diff mode needs the changed line ranges (one git call per commit)
+        changed_ranges = {}
+        if self.analysis_mode in ('diff', 'auto') and blob_shas.keys() - added:
+            changed_ranges = target.git_manager.get_changed_line_ranges(record['hash'])
+        
+        candidates, blobs = [], []
+        for candidate in self._select_code_files(list(blob_shas)):
+            blob = target.git_manager.read_blob(
+                blob_shas[candidate[2]], max_size=self.ai_analyzer.max_input_size
+            )
+            if blob is None:
+                continue
+            if candidate[2] not in added:
+                blob['changed_lines'] = changed_ranges.get(candidate[2])
+            candidates.append(candidate)
+            blobs.append(blob)
+        return candidates, blobs
+    
+    def _collect_error_reports(self, candidates: List[tuple], analyses: List[Dict]) -> List[Dict]:
+        """Build error reports for analyzed files that have issues.
+        
+        Raises CommitDeferred if any file failed with a transient provider error
+        (rate limit, overload, timeout), so the commit is not marked analyzed.
+        """
+        retryable = [a.get('file') for a in analyses if a.get('error') and a.get('retryable')]
+        if retryable:
+            raise CommitDeferred(f"{len(retryable)} file(s) failed transiently: {', '.join(map(str, retryable))}")
         
+        error_reports = []
+        for (folder_name, file_name, file_path), analysis in zip(candidates, analyses):
+            # Check if errors found
+            if analysis.get('has_errors') or analysis.get('errors'):
+                error_reports.append({
+                    'folder_name': folder_name,
+                    'file_name': file_name,
+                    'file_path': file_path,
+                    'analysis': analysis
+                })
+                
+                error_count = len(analysis.get('errors', []))
+                logger.info(f"Issues found in {folder_name}/{file_name}: {error_count} issue(s)")
         return error_reports
     
-    def _send_notifications(self, commit_details: Dict, error_reports: List[Dict]) -> None:
+    def _select_code_files(self, modified_files: List[str]) -> List[tuple]:
+        """Filter modified files down to (folder_name, file_name, file_path) code files"""
+        candidates = []
+        for file_path in modified_files:
+            # Skip certain files
+            if file_path.endswith('qn.txt') or file_path.startswith('.'):
+                continue
+            
+            # Get folder name
+            path_parts = file_path.split('/')
+            if len(path_parts) < 2:
+                continue
+            
+            # Check if code file
+            ext = Path(file_path).suffix
+            if ext not in ['.py', '.js', '.ts', '.java', '.cpp', '.c', '.go', '.rs', '.rb', '.php', '.swift']:
+                continue
+            
+            candidates.append((path_parts[0], path_parts[-1], file_path))
+        return candidates
+    
+    def _send_notifications(self, target, commit_details: Dict, error_reports: List[Dict]) -> None:
         """Send email notifications"""
         try:
             author_email = commit_details.get('author_email')
@@ -194,7 +948,7 @@ class AICodeAnalyzerOrchestrator:
                 self.email_notifier.send_error_notification(
                     recipient_email=author_email,
                     author_name=author_name,
-                    branch=self.repo_branch,
+                    branch=target.branch,
                     folder_name=folder_name,
                     analysis_results=analysis_results
                 )
@@ -232,9 +986,11 @@ class AICodeAnalyzerOrchestrator:
             
             # Test git
             logger.info("Testing repository access...")
-            if self.git_manager.clone_or_update_repo():
-                results['repo_accessible'] = True
-                results['details']['repo'] = f'Repository accessible: {self.repo_url}'
+            accessible = [target for target in self.targets if target.git_manager.clone_or_update_repo()]
+            results['repo_accessible'] = len(accessible) == len(self.targets)
+            for target in self.targets:
+                status = 'accessible' if target in accessible else 'NOT accessible'
+                results['details'][f'repo {target.name}'] = f'Repository {status}: {target.repo_url}'
             
             logger.info(f"Setup test results: {results}")
             return results
@@ -252,6 +1008,13 @@ def main():
     parser.add_argument('--test', action='store_true', help='Run setup tests')
     parser.add_argument('--run', action='store_true', help='Run analysis')
     parser.add_argument('--reset-tracking', action='store_true', help='Reset commit tracking')
+    parser.add_argument('--clear-cache', action='store_true', help='Clear cached AI analysis results')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Keep running and analyze whenever the branch tip changes')
+    parser.add_argument('--poll-interval', type=float, default=None,
+                        help='Seconds between remote checks in daemon mode')
+    parser.add_argument('--webhook', action='store_true',
+                        help='Serve a push webhook endpoint and analyze pushed commits')
     
     args = parser.parse_args()
     
@@ -261,6 +1024,7 @@ def main():
         if args.test:
             logger.info("Running setup tests...")
             results = orchestrator.test_setup()
+            orchestrator.email_notifier.close()
             print("\n=== Setup Test Results ===")
             for key, value in results.items():
                 if isinstance(value, dict):
@@ -272,18 +1036,45 @@ def main():
         
         elif args.reset_tracking:
             logger.info("Resetting commit tracking...")
-            orchestrator.commit_tracker.reset()
+            for target in orchestrator.targets:
+                target.commit_tracker.reset()
             print("✅ Commit tracking reset successfully")
         
-        elif args.run or not any([args.test, args.reset_tracking]):
+        elif args.clear_cache:
+            logger.info("Clearing analysis cache...")
+            if orchestrator.analysis_cache:
+                orchestrator.analysis_cache.clear()
+            print("✅ Analysis cache cleared")
+        
+        elif args.daemon:
+            from config.config import DAEMON_POLL_INTERVAL_SECONDS
+            logger.info("Starting AI code analysis daemon...")
+            orchestrator.run_daemon(args.poll_interval or DAEMON_POLL_INTERVAL_SECONDS)
+        
+        elif args.webhook:
+            from config.config import WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_PATH
+            logger.info("Starting webhook receiver...")
+            orchestrator.run_webhook(WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_SECRET, WEBHOOK_PATH)
+        
+        elif args.run or not any([args.test, args.reset_tracking, args.clear_cache]):
             logger.info("Starting AI code analysis...")
-            summary = orchestrator.run()
+            if orchestrator.execution_mode == 'async':
+                summary = asyncio.run(orchestrator.run_async())
+            else:
+                summary = orchestrator.run()
+            # Digests still in their window wait in DIGEST_STATE_FILE for the next run
+            orchestrator._close_digests()
+            orchestrator.email_notifier.close()
+            orchestrator.ai_analyzer.close()
+            get_tracer().shutdown()
             print("\n=== Analysis Summary ===")
             for key, value in summary.items():
                 print(f"{key}: {value}")
             
             if summary['status'] == 'success':
                 print("\n✅ Analysis completed successfully")
+            elif summary['status'] == 'partial':
+                print("\n⚠️  Analysis stopped early; deferred commits will be retried on the next run")
             else:
                 print("\n❌ Analysis failed")
                 sys.exit(1)
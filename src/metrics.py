@@ -0,0 +1,288 @@
+"""
+Metrics Module
+Process-wide counters and latency histograms with Prometheus text and JSON export
+"""
+import os
+import json
+import asyncio
+import functools
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'code_analyzer'
+
+# Upper bounds (seconds) of the latency histogram buckets, from a blob read to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# HELP lines for the Prometheus output
+DESCRIPTIONS = {
+    'git_operation_seconds': 'Duration of git operations',
+    'llm_call_seconds': 'Duration of model calls, including rate-limit waits and retries',
+    'llm_calls_total': 'Model calls by outcome',
+    'llm_tokens_total': 'Tokens used by model calls',
+    'llm_parse_seconds': 'Duration of parsing model responses',
+    'smtp_send_seconds': 'Duration of SMTP deliveries, including reconnects and retries',
+    'smtp_messages_total': 'Email messages by outcome',
+    'smtp_retries_total': 'SMTP send retries',
+    'smtp_connections_total': 'SMTP sessions opened',
+    'tracker_write_seconds': 'Duration of commit tracker writes',
+    'pipeline_stage_seconds': 'Time a pipeline stage spent on one commit',
+    'commits_analyzed_total': 'Commits analyzed and recorded',
+    'issues_found_total': 'Files with issues reported',
+    'runs_total': 'Analysis runs by final status',
+    'run_seconds': 'Duration of analysis runs',
+    'errors_total': 'Timed operations that raised'
+}
+
+
+def _label_key(labels: Dict) -> tuple:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+def _format_labels(label_key: tuple, extra: tuple = ()) -> str:
+    pairs = label_key + extra
+    if not pairs:
+        return ''
+    escaped = (
+        (key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observed values"""
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def cumulative(self) -> list:
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else None,
+            'max': round(self.max, 6)
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and labels.
+
+    Timers and counters are cheap (a lock and a dict update), so the
+    instrumented modules record unconditionally; enabled=False turns every
+    call into a no-op.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.time()
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add value to a counter"""
+        if not self.enabled or not value:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record one value (seconds, for timers) in a histogram"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Time a block into histogram `name`; a block that raises also counts in errors_total"""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc('errors_total', metric=name, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def record_tokens(self, provider: str, model: str, usage: Optional[Dict]) -> None:
+        """Count the token usage reported for one model call"""
+        for kind in ('prompt', 'completion', 'cached_prompt'):
+            count = (usage or {}).get(f'{kind}_tokens')
+            if count:
+                self.inc('llm_tokens_total', count, provider=provider, model=model, kind=kind)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict:
+        """JSON-friendly view: counters and histogram summaries per label set"""
+        def labels_text(key):
+            return ','.join(f'{k}={v}' for k, v in key) or 'all'
+
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started, 3),
+                'counters': {
+                    name: {labels_text(key): value for key, value in sorted(series.items())}
+                    for name, series in sorted(self._counters.items())
+                },
+                'timers': {
+                    name: {labels_text(key): histogram.snapshot() for key, histogram in sorted(series.items())}
+                    for name, series in sorted(self._histograms.items())
+                }
+            }
+
+    def render_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                full_name = f'{NAMESPACE}_{name}'
+                lines.append(f'# HELP {full_name} {DESCRIPTIONS.get(name, name)}')
+                lines.append(f'# TYPE {full_name} counter')
+                for key, value in sorted(series.items()):
+                    lines.append(f'{full_name}{_format_labels(key)} {_format_value(value)}')
+
+            for name, series in sorted(self._histograms.items()):
+                full_name = f'{NAMESPACE}_{name}'
+                lines.append(f'# HELP {full_name} {DESCRIPTIONS.get(name, name)}')
+                lines.append(f'# TYPE {full_name} histogram')
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.cumulative()):
+                        lines.append(f'{full_name}_bucket{_format_labels(key, (("le", f"{bound:g}"),))} {count}')
+                    lines.append(f'{full_name}_bucket{_format_labels(key, (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{full_name}_sum{_format_labels(key)} {histogram.sum:.6f}')
+                    lines.append(f'{full_name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Atomically write the Prometheus text (e.g. for node_exporter's textfile collector)"""
+        self._write(path, self.render_prometheus())
+
+    def write_json(self, path: str, extra: Dict = None) -> None:
+        """Atomically write the JSON report"""
+        self._write(path, json.dumps(dict(extra or {}, metrics=self.snapshot()), indent=2, default=str))
+
+    def _write(self, path: str, text: str) -> None:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            temp_file = f"{path}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(temp_file, path)
+        except Exception as e:
+            logger.warning(f"Error writing metrics to {path}: {str(e)}")
+
+
+class MetricsServer:
+    """Serves GET /metrics in the Prometheus text format from a daemon thread"""
+
+    def __init__(self, registry: MetricsRegistry, host: str = '127.0.0.1', port: int = 9108):
+        self.registry = registry
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self) -> tuple:
+        return self._httpd.server_address[:2]
+
+    def _handler_class(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(f"Metrics endpoint: {format % args}")
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        logger.info(f"Metrics endpoint listening on {self.address[0]}:{self.address[1]}/metrics")
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """The process-wide metrics registry"""
+    return _metrics
+
+
+def timed(name: str, **labels):
+    """Decorator timing every call of a function (or coroutine function) into histogram `name`"""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with _metrics.timer(name, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _metrics.timer(name, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,206 @@
+"""
+Notification Digest Module
+Collects error reports per author across commits and folders into one consolidated email
+"""
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def issue_key(file_path: str, error: Dict) -> tuple:
+    """Identity of an issue across commits (line numbers shift, so they are not part of it)"""
+    return (
+        file_path,
+        str(error.get('type', '')).strip().lower(),
+        ' '.join(str(error.get('message', '')).lower().split())
+    )
+
+
+class AuthorDigest:
+    """Pending issues for one recipient, de-duplicated per file"""
+
+    def __init__(self, recipient_email: str, author_name: str):
+        self.recipient_email = recipient_email
+        self.author_name = author_name
+        self.created = time.time()  # wall clock, so the window survives a restart
+        self.commits = []
+        self.branches = []
+        self.files = {}  # file_path -> file result of the latest commit that reported it
+        self.duplicates = 0
+
+    def add(self, branch: str, commit_hash: str, error_reports: List[Dict], clean_files: List[str] = ()) -> None:
+        """Merge one commit's reports; each file keeps only its latest analysis.
+
+        Issues an earlier commit reported that the latest one no longer has
+        (i.e. fixed) are dropped, and so are files the commit analyzed
+        without finding any issues; issues reported again count as
+        duplicates and are listed once, at their newest line.
+        """
+        if commit_hash not in self.commits:
+            self.commits.append(commit_hash)
+        if branch not in self.branches:
+            self.branches.append(branch)
+
+        for file_path in clean_files:
+            self.files.pop(file_path, None)
+
+        for report in error_reports:
+            analysis = report['analysis']
+            file_path = report['file_path']
+            previous = self.files.get(file_path)
+            previous_keys = {issue_key(file_path, error) for error in previous['errors']} if previous else set()
+            errors = {}
+            for error in analysis.get('errors') or []:
+                if isinstance(error, dict):
+                    errors[issue_key(file_path, error)] = error
+            self.duplicates += len(previous_keys & errors.keys())
+            self.files[file_path] = dict(
+                analysis, file=file_path, folder=report['folder_name'], errors=list(errors.values())
+            )
+
+    @property
+    def issue_count(self) -> int:
+        return sum(len(result['errors']) for result in self.files.values())
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.created
+
+    def file_results(self) -> List[Dict]:
+        """File results for the email, grouped by folder"""
+        return [
+            dict(result)
+            for _, result in sorted(self.files.items(), key=lambda item: (item[1]['folder'], item[0]))
+        ]
+
+    def to_dict(self) -> Dict:
+        return {
+            'recipient_email': self.recipient_email,
+            'author_name': self.author_name,
+            'created': self.created,
+            'commits': self.commits,
+            'branches': self.branches,
+            'files': self.files,
+            'duplicates': self.duplicates
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AuthorDigest':
+        digest = cls(data['recipient_email'], data.get('author_name'))
+        digest.created = data.get('created', digest.created)
+        digest.commits = data.get('commits', [])
+        digest.branches = data.get('branches', [])
+        digest.files = data.get('files', {})
+        digest.duplicates = data.get('duplicates', 0)
+        return digest
+
+
+class DigestCollector:
+    """Batches notifications per recipient until a flush threshold is reached.
+
+    A digest is due once it holds max_issues issues or max_commits commits,
+    or has been open for window_seconds (0 means it is only sent when the
+    caller flushes, e.g. at the end of a run).
+
+    Commits are recorded as analyzed while their digest is still collecting,
+    so with a state_file the pending digests are restored on startup. The
+    caller saves them before recording the commits they cover.
+    """
+
+    def __init__(self, max_issues: int = 50, max_commits: int = 20, window_seconds: float = 0,
+                 state_file: Optional[str] = None):
+        self.max_issues = max_issues
+        self.max_commits = max_commits
+        self.window_seconds = window_seconds
+        self.state_file = state_file
+        self.stats = {'digests': 0, 'reports': 0, 'duplicates': 0}
+        self._digests: Dict[str, AuthorDigest] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Restore digests that were still collecting when the last process stopped"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                for data in json.load(f):
+                    digest = AuthorDigest.from_dict(data)
+                    self._digests[digest.recipient_email] = digest
+            if self._digests:
+                logger.info(f"Restored {len(self._digests)} pending digest(s) from {self.state_file}")
+        except Exception as e:
+            logger.warning(f"Error loading pending digests: {str(e)}")
+
+    def save(self) -> None:
+        """Atomically rewrite the pending digests if they changed since the last save"""
+        if not self.state_file:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                Path(self.state_file).parent.mkdir(parents=True, exist_ok=True)
+                temp_file = f"{self.state_file}.tmp"
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump([digest.to_dict() for digest in self._digests.values()], f, default=str)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_file, self.state_file)
+                self._dirty = False
+            except Exception as e:
+                logger.error(f"Error saving pending digests: {str(e)}")
+
+    def add(self, commit_details: Dict, branch: str, error_reports: List[Dict],
+            clean_files: List[str] = ()) -> Optional[AuthorDigest]:
+        """Add a commit's reports; returns the author's digest if it is now due.
+
+        clean_files are files the commit analyzed without issues; they only
+        clear what a pending digest still lists for them.
+        """
+        recipient = commit_details.get('author_email')
+        with self._lock:
+            digest = self._digests.get(recipient)
+            if digest is None:
+                if not error_reports:
+                    return None
+                digest = self._digests[recipient] = AuthorDigest(recipient, commit_details.get('author_name'))
+            duplicates = digest.duplicates
+            digest.add(branch, commit_details.get('hash'), error_reports, clean_files)
+            self.stats['reports'] += len(error_reports)
+            self.stats['duplicates'] += digest.duplicates - duplicates
+            self._dirty = True
+            due = None
+            if not digest.files:
+                # Everything it listed has been fixed
+                del self._digests[recipient]
+            elif digest.issue_count >= self.max_issues or len(digest.commits) >= self.max_commits:
+                due = self._take(recipient)
+        return due
+
+    def take_due(self, force: bool = False) -> List[AuthorDigest]:
+        """Remove and return digests past their window (all of them with force)"""
+        with self._lock:
+            due = [
+                recipient for recipient, digest in self._digests.items()
+                if force or (self.window_seconds and digest.age >= self.window_seconds)
+            ]
+            return [self._take(recipient) for recipient in due]
+
+    def _take(self, recipient: str) -> AuthorDigest:
+        """Remove a digest for sending (lock held)"""
+        self.stats['digests'] += 1
+        self._dirty = True
+        return self._digests.pop(recipient)
+
+    def pending_authors(self) -> int:
+        """Number of recipients with a digest still being collected"""
+        with self._lock:
+            return len(self._digests)
@@ -0,0 +1,126 @@
+"""
+Pipeline Module
+Runs work items through stages connected by bounded queues
+"""
+import queue
+import logging
+import threading
+from typing import Callable, Hashable, Iterable, List, Optional, Tuple
+
+from src.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class Stage:
+    """One pipeline step: fn(item) -> item, run by `workers` threads.
+
+    An ordered stage has a single worker and receives the items of each
+    group in index order (see StagedPipeline's order_key), whatever order
+    earlier stages finished them in.
+    """
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1, ordered: bool = False):
+        self.name = name
+        self.fn = fn
+        self.workers = 1 if ordered else max(1, workers)
+        self.ordered = ordered
+
+
+class StagedPipeline:
+    """Producer/consumer pipeline with backpressure between stages.
+
+    Every stage reads from a queue of at most queue_size items, so a slow
+    stage (e.g. LLM calls) stalls the stages feeding it instead of letting
+    work pile up in memory. Items are never dropped between stages, so
+    stage functions mark items they want later stages to skip. If a stage
+    raises, remaining items are drained without processing and run()
+    re-raises the first error.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4,
+                 order_key: Callable[[object], Tuple[Hashable, int]] = None):
+        if any(stage.ordered for stage in stages) and order_key is None:
+            raise ValueError("Ordered stages need an order_key")
+        self.stages = stages
+        self.order_key = order_key
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self._remaining = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def run(self, items: Iterable) -> None:
+        """Feed items (from the calling thread) through all stages and wait for them"""
+        threads = [
+            threading.Thread(target=self._work, args=(index,), name=f'{stage.name}-{worker}', daemon=True)
+            for index, stage in enumerate(self.stages)
+            for worker in range(stage.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for item in items:
+                if self._error is not None:
+                    break
+                self._queues[0].put(item)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _fail(self, error: BaseException) -> None:
+        with self._lock:
+            if self._error is None:
+                self._error = error
+
+    def _work(self, index: int) -> None:
+        """Worker loop for stage `index`"""
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self.stages) else None
+        # Ordered stages: items waiting for an earlier index of their group
+        held, next_index = {}, {}
+
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if self._error is not None:
+                continue  # drain so upstream stages never block
+
+            ready = [item]
+            if stage.ordered:
+                group, position = self.order_key(item)
+                held[(group, position)] = item
+                ready = []
+                while (group, next_index.get(group, 0)) in held:
+                    ready.append(held.pop((group, next_index.get(group, 0))))
+                    next_index[group] = next_index.get(group, 0) + 1
+
+            for ready_item in ready:
+                try:
+                    with get_metrics().timer('pipeline_stage_seconds', stage=stage.name):
+                        result = stage.fn(ready_item)
+                except BaseException as e:
+                    logger.error(f"Pipeline stage {stage.name} failed: {str(e)}")
+                    self._fail(e)
+                    break
+                if outbox is not None:
+                    outbox.put(result)
+
+        with self._lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last and outbox is not None:
+            for _ in range(self.stages[index + 1].workers):
+                outbox.put(_DONE)
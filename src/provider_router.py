@@ -0,0 +1,301 @@
+"""
+Provider Router Module
+Routes analysis calls across several AI providers with hedging and failover
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional
+
+from src.ai_analyzer import AICodeAnalyzer, get_provider_semaphore
+from src.rate_limiter import CallCancelled, cancellable
+from src.tracing import current_span, propagate
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Rolling latency window and failure counters for one provider"""
+
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.hedged = 0
+        self.cooldown_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float) -> None:
+        with self._lock:
+            self.samples.append(seconds)
+            self.successes += 1
+            self.consecutive_failures = 0
+
+    def record_failure(self, cooldown_after: int, cooldown_seconds: float) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= cooldown_after:
+                self.cooldown_until = time.monotonic() + cooldown_seconds
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Latency at the given fraction (0-1) of the window, or None without samples"""
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @property
+    def sample_count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def snapshot(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            'successes': self.successes,
+            'failures': self.failures,
+            'hedged': self.hedged,
+            'p50_seconds': round(p50, 3) if p50 is not None else None,
+            'p95_seconds': round(p95, 3) if p95 is not None else None
+        }
+
+
+def _backend_setting(name: str) -> property:
+    """Property read from the first backend and written to all of them"""
+
+    def getter(self):
+        return getattr(self.backends[0], name)
+
+    def setter(self, value):
+        for backend in self.backends:
+            setattr(backend, name, value)
+
+    return property(getter, setter)
+
+
+class RoutingAnalyzer(AICodeAnalyzer):
+    """Composite analyzer that spreads calls over an ordered list of backends.
+
+    The first healthy backend gets each call. If it has not answered after
+    its own latency percentile (hedge_percentile of recent calls, or
+    hedge_delay until enough samples exist), a duplicate request is sent to
+    the next backend and the first answer wins. Errors fail over down the
+    list; a backend that keeps failing is skipped for a cooldown period.
+    """
+
+    provider_name = 'router'
+    client_error = 'No AI provider client initialized'
+
+    def __init__(self, backends: List[AICodeAnalyzer], cache=None, max_in_flight: int = 4,
+                 strategy: str = 'ordered', hedge_percentile: float = 0.95,
+                 hedge_min_samples: int = 20, hedge_delay: float = 10.0, max_hedges: int = 1,
+                 cooldown_after: int = 3, cooldown_seconds: float = 60.0):
+        if not backends:
+            raise ValueError("RoutingAnalyzer needs at least one backend")
+        self.backends = backends
+        super().__init__(cache=cache, max_in_flight=max_in_flight)
+        self.model = '+'.join(f"{b.provider_name}:{b.model}" for b in backends)
+        self.display_name = ' / '.join(b.display_name for b in backends)
+        self.strategy = strategy
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_delay = hedge_delay
+        self.max_hedges = max_hedges
+        self.cooldown_after = cooldown_after
+        self.cooldown_seconds = cooldown_seconds
+        self.latency = {b.provider_name: LatencyStats() for b in backends}
+        # Hedged calls need spare threads beyond the callers' own
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, max_in_flight * len(backends)), thread_name_prefix='router'
+        )
+
+    # Request settings live on the backends that actually make the calls
+    max_output_tokens = _backend_setting('max_output_tokens')
+    stream_responses = _backend_setting('stream_responses')
+    structured_output = _backend_setting('structured_output')
+    prompt_caching = _backend_setting('prompt_caching')
+
+    @property
+    def token_budget(self):
+        """Budget of the backend with the smallest prompt limit, so any of them can take a prompt"""
+        return min((b.token_budget for b in self.backends), key=lambda budget: budget.prompt_limit)
+
+    def _client_available(self) -> bool:
+        return any(b._client_available() for b in self.backends)
+
+    def _route(self) -> List[AICodeAnalyzer]:
+        """Backends in the order to try them for the next call"""
+        available = [b for b in self.backends if b._client_available()]
+        if self.strategy == 'fastest':
+            # Unmeasured backends sort first so they get sampled
+            available.sort(key=lambda b: self.latency[b.provider_name].percentile(0.5) or 0.0)
+        healthy = [b for b in available if not self.latency[b.provider_name].cooling_down]
+        return healthy + [b for b in available if b not in healthy]
+
+    def _hedge_after(self, backend: AICodeAnalyzer) -> float:
+        """How long to wait on a backend before sending a hedged duplicate"""
+        stats = self.latency[backend.provider_name]
+        if stats.sample_count >= self.hedge_min_samples:
+            return stats.percentile(self.hedge_percentile)
+        return self.hedge_delay
+
+    def _call_backend(self, backend: AICodeAnalyzer, prompt: str, estimated_tokens: Optional[int],
+                      cancelled: threading.Event) -> tuple:
+        """Call one backend under its own in-flight limit, recording latency.
+
+        Once `cancelled` is set (another backend answered first) the call
+        gives up before its next quota wait or retry; a request already on
+        the wire still runs to completion.
+        """
+        stats = self.latency[backend.provider_name]
+        with get_provider_semaphore(backend.provider_name, backend.max_in_flight):
+            if cancelled.is_set():
+                raise CallCancelled("call cancelled")
+            started = time.monotonic()
+            try:
+                with cancellable(cancelled):
+                    result = backend._invoke_model(prompt, estimated_tokens)
+            except CallCancelled:
+                raise
+            except Exception:
+                stats.record_failure(self.cooldown_after, self.cooldown_seconds)
+                raise
+        stats.record_success(time.monotonic() - started)
+        return result
+
+    async def _call_backend_async(self, backend: AICodeAnalyzer, prompt: str,
+                                  estimated_tokens: Optional[int]) -> tuple:
+        """Async variant of _call_backend"""
+        stats = self.latency[backend.provider_name]
+        async with backend._get_async_semaphore():
+            started = time.monotonic()
+            try:
+                result = await backend._invoke_model_async(prompt, estimated_tokens)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                stats.record_failure(self.cooldown_after, self.cooldown_seconds)
+                raise
+        stats.record_success(time.monotonic() - started)
+        return result
+
+    def _invoke_model(self, prompt: str, estimated_tokens: Optional[int] = None) -> tuple:
+        """Call the routed backends, hedging slow calls and failing over on errors.
+
+        Threads cannot be interrupted, so a losing hedged call is only told to
+        stop: it is dropped if it has not started and otherwise gives up
+        before its next retry instead of spending more quota.
+        """
+        candidates = iter(self._route())
+        pending, hedges, last_error = {}, 0, None
+        cancelled = threading.Event()
+
+        def launch() -> bool:
+            backend = next(candidates, None)
+            if backend is None:
+                return False
+            future = self._executor.submit(propagate(self._call_backend), backend, prompt, estimated_tokens, cancelled)
+            pending[future] = backend
+            return True
+
+        if not launch():
+            raise RuntimeError(self.client_error)
+
+        try:
+            while pending:
+                newest = list(pending.values())[-1]
+                timeout = self._hedge_after(newest) if hedges < self.max_hedges else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    # Still waiting past the latency threshold: race the next backend
+                    if launch():
+                        hedges += 1
+                        self.latency[newest.provider_name].hedged += 1
+                        current_span().add_event('hedge', slow=newest.provider_name)
+                        logger.info(f"{newest.display_name} slow; hedging with {list(pending.values())[-1].display_name}")
+                    else:
+                        hedges = self.max_hedges
+                    continue
+
+                for future in done:
+                    backend = pending.pop(future)
+                    try:
+                        return future.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"{backend.display_name} failed: {str(e)}")
+                if not pending:
+                    launch()
+        finally:
+            cancelled.set()
+            for future in pending:
+                future.cancel()
+
+        raise last_error
+
+    async def _invoke_model_async(self, prompt: str, estimated_tokens: Optional[int] = None) -> tuple:
+        """Async variant of _invoke_model; losing requests are cancelled"""
+        candidates = iter(self._route())
+        pending, hedges, last_error = {}, 0, None
+
+        def launch() -> bool:
+            backend = next(candidates, None)
+            if backend is None:
+                return False
+            task = asyncio.ensure_future(self._call_backend_async(backend, prompt, estimated_tokens))
+            pending[task] = backend
+            return True
+
+        if not launch():
+            raise RuntimeError(self.client_error)
+
+        try:
+            while pending:
+                newest = list(pending.values())[-1]
+                timeout = self._hedge_after(newest) if hedges < self.max_hedges else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if launch():
+                        hedges += 1
+                        self.latency[newest.provider_name].hedged += 1
+                        current_span().add_event('hedge', slow=newest.provider_name)
+                        logger.info(f"{newest.display_name} slow; hedging with {list(pending.values())[-1].display_name}")
+                    else:
+                        hedges = self.max_hedges
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        last_error = e
+                        logger.warning(f"{backend.display_name} failed: {str(e)}")
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def close(self) -> None:
+        """Stop the hedging threads; calls still running finish in the background"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for backend in self.backends:
+            backend.close()
+
+    def get_routing_stats(self) -> Dict:
+        """Per-provider latency percentiles, hedges and failures"""
+        return {name: stats.snapshot() for name, stats in self.latency.items()}
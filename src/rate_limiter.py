@@ -0,0 +1,375 @@
+"""
+Rate Limiter Module
+Token-bucket quotas, adaptive (AIMD) concurrency and retry with backoff for AI providers
+"""
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from src.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RetryableError(Exception):
+    """Raised for provider failures that are worth retrying"""
+
+    def __init__(self, message: str, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CallCancelled(Exception):
+    """Raised instead of retrying once the caller no longer wants the result"""
+
+
+# Cancellation event of the call running in the current thread, if any
+_cancellation = threading.local()
+
+
+@contextmanager
+def cancellable(event: threading.Event):
+    """Stop call() in this thread from waiting or retrying once event is set"""
+    previous = getattr(_cancellation, 'event', None)
+    _cancellation.event = event
+    try:
+        yield
+    finally:
+        _cancellation.event = previous
+
+
+def _pause(seconds: float) -> None:
+    """Sleep, waking early and raising CallCancelled if the current call is cancelled"""
+    event = getattr(_cancellation, 'event', None)
+    if event is None:
+        time.sleep(seconds)
+    elif event.wait(seconds) or event.is_set():
+        raise CallCancelled("call cancelled")
+
+
+def get_status_code(error: Exception) -> Optional[int]:
+    """Extract an HTTP status code from an SDK exception, if any"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def get_error_headers(error: Exception) -> Dict:
+    """Extract response headers from an SDK exception, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    return dict(headers) if headers else {}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Decide whether an error is transient (rate limit, overload, timeout, 5xx)"""
+    if isinstance(error, RetryableError):
+        return True
+    status = get_status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES
+    name = type(error).__name__.lower()
+    return any(word in name for word in ('timeout', 'connection', 'ratelimit', 'overloaded'))
+
+
+def parse_duration(value) -> Optional[float]:
+    """Parse '1.5', '20ms', '6m0s', '1h2m3s' or an RFC 3339 timestamp into seconds"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+
+    if text[:4].isdigit() and 'T' in text:
+        try:
+            reset_at = datetime.fromisoformat(text.replace('Z', '+00:00'))
+            return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+        except ValueError:
+            return None
+
+    total, number = 0.0, ''
+    units = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char.isdigit() or char == '.':
+            number += char
+            index += 1
+            continue
+        unit = 'ms' if text[index:index + 2] == 'ms' else char
+        if unit not in units or not number:
+            return None
+        total += float(number) * units[unit]
+        number = ''
+        index += len(unit)
+    return total if not number else None
+
+
+class TokenBucket:
+    """Refilling bucket of capacity `per_minute`; acquire() waits for enough tokens"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens, returning how long the caller must wait first"""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            wait = max(0.0, -self.tokens / self.rate) if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def block_for(self, seconds: float) -> None:
+        """Stop handing out tokens for a while (e.g. when the provider reports 0 remaining)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def sync_remaining(self, remaining: float) -> None:
+        """Align the bucket with the provider's own remaining-quota header"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, float(remaining))
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1 after a window of successes, halved on throttling"""
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+        # (loop, future) of coroutines waiting for a slot, served in arrival order
+        self._async_waiters = deque()
+
+    def acquire(self) -> None:
+        """Wait for a free slot under the current limit"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """Wait for a free slot without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self.in_flight < int(self.limit) and not self._async_waiters:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._async_waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._condition:
+                # A slot handed over in the meantime is given back by _grant
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+            raise
+
+    def release(self, throttled: bool = False) -> None:
+        """Free a slot and adjust the limit"""
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= int(self.limit):
+                    self.limit = min(self.max_limit, self.limit + 1)
+                    self._successes = 0
+            self._wake()
+
+    def _wake(self) -> None:
+        """Wake waiting threads and hand free slots to waiting coroutines (lock held)"""
+        self._condition.notify_all()
+        while self._async_waiters and self.in_flight < int(self.limit):
+            loop, future = self._async_waiters.popleft()
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:
+                self.in_flight -= 1  # its event loop is closed
+
+    def _grant(self, future) -> None:
+        """Complete a coroutine's wait for a slot (runs on its event loop)"""
+        if future.cancelled():
+            with self._condition:
+                self.in_flight -= 1
+                self._wake()
+        else:
+            future.set_result(None)
+
+
+class ProviderRateLimiter:
+    """Shared per-provider limiter: RPM/TPM buckets, AIMD concurrency and retries"""
+
+    def __init__(self, provider: str, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrency: int = 4, max_retries: int = 5, base_delay: float = 1.0,
+                 max_delay: float = 60.0):
+        self.provider = provider
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {'calls': 0, 'retries': 0, 'throttled': 0, 'failures': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _quota_wait(self, estimated_tokens: int) -> float:
+        """Reserve request and token quota; returns the required wait in seconds"""
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.reserve(1))
+        if self.token_bucket and estimated_tokens:
+            wait = max(wait, self.token_bucket.reserve(estimated_tokens))
+        return wait
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, never shorter than a server-provided retry-after"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is None:
+            headers = {k.lower(): v for k, v in get_error_headers(error).items()}
+            retry_after = parse_duration(headers.get('retry-after'))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def observe_headers(self, headers) -> None:
+        """Update quotas from OpenAI/Groq (x-ratelimit-*) or Anthropic (anthropic-ratelimit-*) headers"""
+        if not headers:
+            return
+        headers = {str(k).lower(): v for k, v in dict(headers).items()}
+        for kind, bucket in (('requests', self.request_bucket), ('tokens', self.token_bucket)):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}',
+                                    headers.get(f'anthropic-ratelimit-{kind}-remaining'))
+            reset = parse_duration(headers.get(f'x-ratelimit-reset-{kind}',
+                                               headers.get(f'anthropic-ratelimit-{kind}-reset')))
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            if bucket:
+                bucket.sync_remaining(remaining)
+            if remaining <= 0 and reset:
+                logger.info(f"{self.provider} {kind} quota exhausted; pausing {reset:.1f}s")
+                (bucket or self._pause_bucket()).block_for(reset)
+
+    def _pause_bucket(self) -> TokenBucket:
+        """Bucket used only to pause calls when no RPM limit is configured"""
+        if self.request_bucket is None:
+            self.request_bucket = TokenBucket(10 ** 9)
+        return self.request_bucket
+
+    def call(self, fn: Callable, estimated_tokens: int = 0):
+        """Run fn() under the quotas, retrying transient failures with backoff"""
+        for attempt in range(self.max_retries + 1):
+            _pause(max(0.0, self._quota_wait(estimated_tokens)))
+
+            self.concurrency.acquire()
+            throttled = False
+            try:
+                self._count('calls')
+                return fn()
+            except Exception as e:
+                throttled = get_status_code(e) == 429 or 'ratelimit' in type(e).__name__.lower()
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                if throttled:
+                    self._count('throttled')
+                delay = self._backoff(attempt, e)
+                span = current_span()
+                span.set_attribute('retries', attempt + 1)
+                span.add_event('retry', error=str(e)[:200], delay=round(delay, 3))
+                logger.warning(f"{self.provider} call failed ({str(e)[:120]}); "
+                               f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            finally:
+                self.concurrency.release(throttled)
+            _pause(delay)
+
+    async def call_async(self, fn: Callable, estimated_tokens: int = 0):
+        """Async variant of call(); fn() must return an awaitable"""
+        for attempt in range(self.max_retries + 1):
+            wait = self._quota_wait(estimated_tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            await self.concurrency.acquire_async()
+            throttled = False
+            try:
+                self._count('calls')
+                return await fn()
+            except Exception as e:
+                throttled = get_status_code(e) == 429 or 'ratelimit' in type(e).__name__.lower()
+                if not is_retryable_error(e) or attempt >= self.max_retries:
+                    self._count('failures')
+                    raise
+                self._count('retries')
+                if throttled:
+                    self._count('throttled')
+                delay = self._backoff(attempt, e)
+                span = current_span()
+                span.set_attribute('retries', attempt + 1)
+                span.add_event('retry', error=str(e)[:200], delay=round(delay, 3))
+                logger.warning(f"{self.provider} call failed ({str(e)[:120]}); "
+                               f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+            finally:
+                self.concurrency.release(throttled)
+            await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict:
+        """Return call/retry counters and the current concurrency limit"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['concurrency_limit'] = int(self.concurrency.limit)
+        return stats
+
+
+# Limiters are shared by every analyzer instance of the same provider
+_rate_limiters: Dict[str, ProviderRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, **kwargs) -> ProviderRateLimiter:
+    """Get (or create) the shared rate limiter for a provider"""
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            _rate_limiters[provider] = ProviderRateLimiter(provider, **kwargs)
+        return _rate_limiters[provider]
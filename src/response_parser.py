@@ -0,0 +1,115 @@
+"""
+Response Parser Module
+Extracts the JSON answer from model output, incrementally for streamed responses
+"""
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DECODER = json.JSONDecoder()
+
+
+def extract_json(text: str, types: Tuple[type, ...] = (dict,)) -> Optional[Any]:
+    """Return the first JSON value of the given types embedded in text, or None.
+
+    Each '{' / '[' is tried as the start of a value with raw_decode, so prose
+    or trailing text containing braces around the answer does not matter.
+    """
+    openers = ''.join(opener for opener, kind in (('{', dict), ('[', list)) if kind in types)
+    index = 0
+    while True:
+        starts = [found for found in (text.find(opener, index) for opener in openers) if found != -1]
+        if not starts:
+            return None
+        start = min(starts)
+        try:
+            value, _ = _DECODER.raw_decode(text, start)
+            if isinstance(value, types):
+                return value
+        except json.JSONDecodeError:
+            pass
+        index = start + 1
+
+
+def parse_analysis(response_text: str) -> Dict:
+    """Parse a single-file analysis response, falling back to a plain summary"""
+    analysis = extract_json(response_text or '')
+    if analysis is None:
+        logger.warning("Could not parse JSON response")
+        return {'has_errors': False, 'summary': response_text}
+    return analysis
+
+
+class JsonStreamScanner:
+    """Tracks streamed text until the first complete top-level JSON value.
+
+    Braces and brackets inside JSON strings (and escaped quotes) are ignored,
+    and a closed value that does not parse (e.g. "[see below]" in prose) is
+    skipped, so the scanner can be fed token by token and tells the caller
+    when the rest of the generation is no longer needed.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.depth = 0
+        self.start = None
+        self.end = None
+        self._length = 0
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def complete(self) -> bool:
+        """True once the first top-level value has closed"""
+        return self.end is not None
+
+    def feed(self, text: str) -> bool:
+        """Consume the next piece of output; returns True when the answer is complete"""
+        if self.complete or not text:
+            return self.complete
+
+        offset = self._length
+        self.parts.append(text)
+        self._length += len(text)
+
+        for index, char in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"' and self.depth > 0:
+                self._in_string = True
+            elif char in '{[':
+                if self.depth == 0:
+                    self.start = offset + index
+                self.depth += 1
+            elif char in '}]' and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0 and self._closes_value(offset + index + 1):
+                    return True
+        return False
+
+    def _closes_value(self, end: int) -> bool:
+        """Accept the value ending at end if it is valid JSON"""
+        try:
+            json.loads(self.text[self.start:end])
+        except json.JSONDecodeError:
+            self.start = None
+            return False
+        self.end = end
+        return True
+
+    @property
+    def text(self) -> str:
+        """Everything received so far"""
+        return ''.join(self.parts)
+
+    @property
+    def answer_text(self) -> str:
+        """Received text, cut after the answer once it is complete"""
+        return self.text[:self.end] if self.complete else self.text
@@ -0,0 +1,98 @@
+"""
+Token Budget Module
+Estimates prompt sizes and enforces per-model context limits
+"""
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def get_model_limits(model: Optional[str]) -> Dict:
+    """Look up {'context', 'max_output'} for a model by longest matching name prefix"""
+    from config.constants import MODEL_CONTEXT_LIMITS, DEFAULT_MODEL_CONTEXT_LIMITS
+
+    name = (model or '').lower()
+    best = None
+    for prefix in MODEL_CONTEXT_LIMITS:
+        if name.startswith(prefix) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return dict(MODEL_CONTEXT_LIMITS[best]) if best else dict(DEFAULT_MODEL_CONTEXT_LIMITS)
+
+
+class TokenEstimator:
+    """Counts tokens with tiktoken when available, otherwise ~4 characters per token"""
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model or '')
+            except KeyError:
+                self.encoding = tiktoken.get_encoding('cl100k_base')
+        except ImportError:
+            logger.debug("tiktoken not installed; using heuristic token estimates")
+        except Exception as e:
+            logger.warning(f"Could not load tokenizer, using heuristic estimates: {str(e)}")
+
+    @property
+    def exact(self) -> bool:
+        """True when a real tokenizer backs the estimates"""
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        """Estimate the number of tokens in text"""
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+
+class TokenBudget:
+    """Decides how many prompt tokens a request to a model may use"""
+
+    def __init__(self, model: Optional[str] = None, max_output_tokens: int = 1024,
+                 safety_margin: float = 0.1):
+        self.model = model
+        self.estimator = TokenEstimator(model)
+        self.limits = get_model_limits(model)
+        self.max_output_tokens = min(max_output_tokens, self.limits['max_output'])
+        # Heuristic counts can undershoot real tokenizers, so keep more headroom
+        margin = safety_margin if self.estimator.exact else safety_margin * 2
+        self.prompt_limit = int((self.limits['context'] - self.max_output_tokens) * (1 - margin))
+
+    def count(self, text: str) -> int:
+        """Estimate the number of tokens in text"""
+        return self.estimator.count(text)
+
+    def fits(self, prompt_tokens: int) -> bool:
+        """Check whether a prompt of prompt_tokens plus the reserved output fits the context window"""
+        return prompt_tokens <= self.prompt_limit
+
+
+class UsageTotals:
+    """Thread-safe accumulator of estimated and actual token usage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = {
+            'requests': 0,
+            'estimated_prompt_tokens': 0,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'cached_prompt_tokens': 0
+        }
+
+    def add(self, usage: Dict) -> None:
+        """Add one request's usage"""
+        with self._lock:
+            self.totals['requests'] += 1
+            for key in ('estimated_prompt_tokens', 'prompt_tokens', 'completion_tokens', 'cached_prompt_tokens'):
+                self.totals[key] += usage.get(key) or 0
+
+    def snapshot(self) -> Dict:
+        """Return a copy of the totals"""
+        with self._lock:
+            return dict(self.totals)
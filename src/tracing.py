@@ -0,0 +1,397 @@
+"""
+Tracing Module
+Nested timing spans (run -> commit -> file -> provider call -> parse) exported as JSONL or OTLP
+"""
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Span whose block is currently running in this thread or task
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed operation with attributes, events and a parent"""
+
+    def __init__(self, tracer, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes = {key: value for key, value in attributes.items() if value is not None}
+        self.events = []
+        self.status = 'ok'
+        self.start_time = time.time()
+        self.end_time = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def set_attribute(self, key: str, value) -> None:
+        if value is not None:
+            with self._lock:
+                self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add_event(self, name: str, **attributes) -> None:
+        with self._lock:
+            self.events.append({'name': name, 'time': time.time(), 'attributes': attributes})
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = 'error'
+        self.set_attributes(**{'error.type': type(error).__name__, 'error.message': str(error)[:500]})
+
+    def end(self) -> None:
+        """Finish the span and hand it to the exporter (later calls are ignored)"""
+        with self._lock:
+            if self.end_time is not None:
+                return
+            self.end_time = self.start_time + (time.perf_counter() - self._started)
+        self.tracer._export(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start_time,
+            'end': self.end_time,
+            'duration_ms': round((self.end_time - self.start_time) * 1000, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+            'events': self.events
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned while tracing is disabled"""
+
+    trace_id = span_id = None
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def set_attributes(self, **attributes) -> None:
+        pass
+
+    def add_event(self, name: str, **attributes) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class JsonlSpanExporter:
+    """Appends one JSON line per finished span"""
+
+    def __init__(self, trace_file: str = './logs/traces.jsonl'):
+        self.trace_file = trace_file
+        self._lock = threading.Lock()
+        Path(trace_file).parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + '\n'
+        try:
+            with self._lock, open(self.trace_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except Exception as e:
+            logger.warning(f"Error writing trace span: {str(e)}")
+
+    def shutdown(self) -> None:
+        pass
+
+
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpHttpExporter:
+    """Sends spans in batches to an OTLP/HTTP collector (JSON encoding, e.g. :4318/v1/traces).
+
+    Spans are queued and posted from a background thread, so a slow or
+    missing collector never holds up the analysis; batches that cannot be
+    delivered are dropped with a warning.
+    """
+
+    def __init__(self, endpoint: str = 'http://localhost:4318/v1/traces', service_name: str = 'code-analyzer',
+                 batch_size: int = 256, flush_interval: float = 5.0, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=batch_size * 20)
+        self._worker = threading.Thread(target=self._drain, name='otlp-exporter', daemon=True)
+        self._worker.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self) -> None:
+        """Worker loop: post a batch when it is full, after flush_interval, or at shutdown"""
+        batch, deadline = [], time.monotonic() + self.flush_interval
+        while True:
+            try:
+                span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                span = False
+            if span:
+                batch.append(span)
+            if batch and (span is None or span is False or len(batch) >= self.batch_size):
+                self._post(batch)
+                batch = []
+            if span is None:
+                return
+            if span is False or not batch:
+                deadline = time.monotonic() + self.flush_interval
+
+    def _payload(self, spans: List[Span]) -> Dict:
+        return {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+            'scopeSpans': [{
+                'scope': {'name': 'code_analyzer'},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(int(span.start_time * 1e9)),
+                    'endTimeUnixNano': str(int(span.end_time * 1e9)),
+                    'attributes': _otlp_attributes(span.attributes),
+                    'events': [
+                        {
+                            'name': event['name'],
+                            'timeUnixNano': str(int(event['time'] * 1e9)),
+                            'attributes': _otlp_attributes(event['attributes'])
+                        }
+                        for event in span.events
+                    ],
+                    'status': {'code': 2 if span.status == 'error' else 1}
+                } for span in spans]
+            }]
+        }]}
+
+    def _post(self, spans: List[Span]) -> None:
+        body = json.dumps(self._payload(spans), default=str).encode('utf-8')
+        request = urllib.request.Request(
+            self.endpoint, data=body, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except Exception as e:
+            self.dropped += len(spans)
+            logger.warning(f"Could not export {len(spans)} span(s) to {self.endpoint}: {str(e)}")
+
+    def shutdown(self) -> None:
+        """Send what is queued and stop the worker"""
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(self.timeout + 1)
+
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter (no exporter: tracing is off).
+
+    The current span follows contextvars, so nesting works within a thread
+    or asyncio task. Work handed to another thread takes its parent along
+    explicitly (parent=..., or propagate()).
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_span(self, name: str, parent=None, **attributes):
+        """Start a span under parent (default: the current span) without making it current"""
+        if self.exporter is None:
+            return NOOP_SPAN
+        parent = parent or _current_span.get()
+        if parent is None or parent is NOOP_SPAN:
+            return Span(self, name, os.urandom(16).hex(), None, attributes)
+        return Span(self, name, parent.trace_id, parent.span_id, attributes)
+
+    @contextmanager
+    def span(self, name: str, parent=None, **attributes):
+        """Run a block inside a new current span; an exception marks the span as failed"""
+        if self.exporter is None:
+            yield NOOP_SPAN
+            return
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def _export(self, span: Span) -> None:
+        try:
+            self.exporter.export(span)
+        except Exception as e:
+            logger.warning(f"Error exporting span {span.name}: {str(e)}")
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """The process-wide tracer"""
+    return _tracer
+
+
+def configure_tracing(exporter: str = 'jsonl', trace_file: str = './logs/traces.jsonl',
+                      otlp_endpoint: str = 'http://localhost:4318/v1/traces',
+                      service_name: str = 'code-analyzer') -> Tracer:
+    """Turn tracing on with the 'jsonl' or 'otlp' exporter"""
+    if exporter == 'otlp':
+        _tracer.exporter = OtlpHttpExporter(otlp_endpoint, service_name)
+    elif exporter == 'jsonl':
+        _tracer.exporter = JsonlSpanExporter(trace_file)
+    else:
+        raise ValueError(f"Unknown trace exporter: {exporter}. Use 'jsonl' or 'otlp'")
+    logger.info(f"Tracing enabled ({exporter} exporter)")
+    return _tracer
+
+
+def current_span():
+    """The span of the running block, or a no-op span"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def propagate(fn: Callable) -> Callable:
+    """Bind fn to the caller's current span, for running it in worker threads"""
+    parent = _current_span.get()
+
+    def run(*args, **kwargs):
+        token = _current_span.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_span.reset(token)
+    return run
+
+
+def load_traces(trace_file: str) -> Dict[str, List[Dict]]:
+    """Read a JSONL trace file into {trace_id: [span, ...]}"""
+    traces = {}
+    with open(trace_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            traces.setdefault(span['trace_id'], []).append(span)
+    return traces
+
+
+def critical_path(spans: List[Dict]) -> List[Dict]:
+    """Follow the root span down through the child that finished last at each level"""
+    children = {}
+    for span in spans:
+        children.setdefault(span['parent_id'], []).append(span)
+    ids = {span['span_id'] for span in spans}
+    roots = [span for span in spans if span['parent_id'] not in ids]
+    path, level = [], roots
+    while level:
+        span = max(level, key=lambda s: s['end'])
+        path.append(span)
+        level = children.get(span['span_id'], [])
+    return path
+
+
+def format_trace(spans: List[Dict]) -> str:
+    """Render a trace as an indented tree; '*' marks spans on the critical path"""
+    on_path = {span['span_id'] for span in critical_path(spans)}
+    children = {}
+    for span in sorted(spans, key=lambda s: s['start']):
+        children.setdefault(span['parent_id'], []).append(span)
+    ids = {span['span_id'] for span in spans}
+    origin = min(span['start'] for span in spans)
+    lines = []
+
+    def walk(span, depth):
+        attributes = ' '.join(f'{key}={value}' for key, value in span['attributes'].items())
+        lines.append(f"{'*' if span['span_id'] in on_path else ' '} "
+                     f"{(span['start'] - origin) * 1000:9.1f}ms {span['duration_ms']:9.1f}ms "
+                     f"{'  ' * depth}{span['name']}{' [error]' if span['status'] == 'error' else ''} {attributes}")
+        for child in children.get(span['span_id'], []):
+            walk(child, depth + 1)
+
+    for root in (span for span in sorted(spans, key=lambda s: s['start']) if span['parent_id'] not in ids):
+        walk(root, 0)
+    return '\n'.join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    """Print the slowest trace (or the one given) of a JSONL trace file with its critical path"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Show a trace recorded by the code analyzer')
+    parser.add_argument('trace_file', help='JSONL file written with TRACE_EXPORTER=jsonl')
+    parser.add_argument('--trace', help='Trace id (default: the longest trace)')
+    args = parser.parse_args(argv)
+
+    traces = load_traces(args.trace_file)
+    if not traces:
+        print("No spans found")
+        return 1
+    trace_id = args.trace or max(
+        traces, key=lambda t: max(s['end'] for s in traces[t]) - min(s['start'] for s in traces[t])
+    )
+    if trace_id not in traces:
+        print(f"Trace {trace_id} not found")
+        return 1
+    print(f"Trace {trace_id} ({len(traces[trace_id])} spans, * = critical path)")
+    print(format_trace(traces[trace_id]))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+Webhook Server Module
+Receives GitHub/GitLab push webhooks and queues the pushed commit ranges
+"""
+import hmac
+import json
+import queue
+import hashlib
+import logging
+import ipaddress
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+NULL_SHA = '0' * 40
+
+# Push payloads are a few KB; anything much larger is not a genuine delivery
+MAX_BODY_SIZE = 1024 * 1024
+
+
+def compute_signature(body: bytes, secret: str) -> str:
+    """GitHub-style X-Hub-Signature-256 value for a payload"""
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return f'sha256={digest}'
+
+
+def is_loopback(host: str) -> bool:
+    """Whether a bind address is only reachable from this machine"""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def verify_signature(headers, body: bytes, secret: Optional[str]) -> bool:
+    """Check a GitHub HMAC signature or a GitLab token against the shared secret (none: accept all)"""
+    if not secret:
+        return True
+    signature = headers.get('X-Hub-Signature-256')
+    if signature:
+        return hmac.compare_digest(signature, compute_signature(body, secret))
+    token = headers.get('X-Gitlab-Token')
+    if token:
+        return hmac.compare_digest(token, secret)
+    return False
+
+
+def parse_push_event(headers, payload: Dict) -> Optional[Dict]:
+    """Extract {'branch', 'before', 'after', 'repo_urls'} from a push payload.
+
+    Returns None for other events and for branch deletions. 'before' is
+    None when the push created the branch.
+    """
+    event = headers.get('X-GitHub-Event') or headers.get('X-Gitlab-Event')
+    if event not in ('push', 'Push Hook'):
+        return None
+
+    ref = payload.get('ref') or ''
+    after = payload.get('after') or ''
+    if not ref.startswith('refs/heads/') or not after or after == NULL_SHA:
+        return None
+
+    repository = payload.get('repository') or {}
+    repo_urls = {
+        repository.get(key) for key in ('clone_url', 'ssh_url', 'git_http_url', 'git_ssh_url', 'html_url', 'url')
+        if isinstance(repository.get(key), str)
+    }
+    before = payload.get('before')
+    return {
+        'branch': ref[len('refs/heads/'):],
+        'before': before if before and before != NULL_SHA else None,
+        'after': after,
+        'repo_urls': repo_urls
+    }
+
+
+class PushQueue:
+    """Queue of pushed ranges that coalesces pushes to the same branch.
+
+    Pushes are grouped by key(push), the branch name by default. While a
+    key has a pending range, merged pushes keep its earliest 'before' and
+    newest 'after', so overlapping or repeated deliveries become a single
+    analysis run. A new delivery is taken to be newer than the pending
+    range and a retried one older, unless is_ancestor(commit, descendant,
+    push) shows otherwise (it should return False when it cannot tell).
+    Ranges already handed out are remembered by their 'after' SHA so
+    redelivered webhooks are dropped.
+    """
+
+    def __init__(self, remember: int = 1000, key=None, is_ancestor=None):
+        self._key = key or (lambda push: push['branch'])
+        self._is_ancestor = is_ancestor
+        self._pending = {}
+        self._order = queue.Queue()
+        self._seen = []
+        self._remember = remember
+        self._lock = threading.Lock()
+
+    def add(self, push: Dict, retried: bool = False) -> bool:
+        """Queue a push; returns False if it was a duplicate or merged into a pending range"""
+        key = self._key(push)
+        with self._lock:
+            if push['after'] in self._seen:
+                return False
+            pending = self._pending.get(key)
+            if pending is not None:
+                older, newer = (push, pending) if retried else (pending, push)
+                if pending['before'] is None or push['before'] is None:
+                    pending['before'] = None
+                else:
+                    pending['before'] = self._earlier(push, older['before'], newer['before'])
+                pending['after'] = self._later(push, newer['after'], older['after'])
+                return False
+            self._pending[key] = dict(push)
+        self._order.put(key)
+        return True
+
+    def _earlier(self, push: Dict, first: str, second: str) -> str:
+        """first, unless second is known to be its ancestor"""
+        if first != second and self._is_ancestor and self._is_ancestor(second, first, push):
+            return second
+        return first
+
+    def _later(self, push: Dict, first: str, second: str) -> str:
+        """first, unless second is known to descend from it"""
+        if first != second and self._is_ancestor and self._is_ancestor(first, second, push):
+            return second
+        return first
+
+    def get(self, timeout: float = None) -> Optional[Dict]:
+        """Take the oldest pending range, waiting up to timeout seconds"""
+        try:
+            key = self._order.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        with self._lock:
+            push = self._pending.pop(key)
+            self._seen.append(push['after'])
+            del self._seen[:-self._remember]
+        return push
+
+    def retry(self, push: Dict) -> None:
+        """Put back a range whose analysis did not complete"""
+        with self._lock:
+            if push['after'] in self._seen:
+                self._seen.remove(push['after'])
+        self.add(push, retried=True)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+class WebhookServer:
+    """Small threaded HTTP endpoint that feeds push events into a PushQueue.
+
+    Without a secret every POST is accepted, and each one can trigger a
+    fetch and paid model calls, so that is only allowed on a loopback
+    address (e.g. behind a local reverse proxy that authenticates).
+    """
+
+    def __init__(self, push_queue: PushQueue, host: str = '127.0.0.1', port: int = 8085,
+                 secret: str = None, path: str = '/webhook', accept=None, max_body_size: int = MAX_BODY_SIZE):
+        if not secret:
+            if not is_loopback(host):
+                raise ValueError(f"WEBHOOK_SECRET is required to serve webhooks on {host}; "
+                                 f"set it or bind WEBHOOK_HOST to 127.0.0.1")
+            logger.warning("WEBHOOK_SECRET is not set: accepting unauthenticated deliveries on loopback only")
+        self.push_queue = push_queue
+        self.secret = secret
+        self.path = path
+        self.max_body_size = max_body_size
+        # accept(push) -> bool filters pushes (e.g. to the monitored repo/branch)
+        self.accept = accept or (lambda push: True)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def address(self) -> tuple:
+        """(host, port) actually bound (port 0 picks a free one)"""
+        return self._server.server_address
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_POST(self):
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self.close_connection = True
+                    self._reply(400, 'invalid Content-Length')
+                elif length > server.max_body_size:
+                    # The body is not read, so the connection cannot be reused
+                    self.close_connection = True
+                    self._reply(413, 'payload too large')
+                else:
+                    body = self.rfile.read(length) if length else b''
+                    self._reply(*server.handle_delivery(self.path, self.headers, body))
+
+            def _reply(self, status: int, message: str) -> None:
+                body = json.dumps({'message': message}).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def handle_delivery(self, path: str, headers, body: bytes) -> tuple:
+        """Validate one delivery and queue it; returns (HTTP status, message)"""
+        if path.split('?')[0] != self.path:
+            return 404, 'not found'
+        if not verify_signature(headers, body, self.secret):
+            logger.warning("Rejected webhook with an invalid signature")
+            return 401, 'invalid signature'
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            return 400, 'invalid JSON'
+
+        push = parse_push_event(headers, payload)
+        if push is None:
+            return 200, 'ignored'
+        if not self.accept(push):
+            return 200, f"ignored push to {push['branch']}"
+        if self.push_queue.add(push):
+            logger.info(f"Queued push to {push['branch']} at {push['after'][:8]}")
+            return 202, 'queued'
+        return 202, 'merged'
+
+    def start(self) -> None:
+        """Serve in a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='webhook', daemon=True)
+        self._thread.start()
+        logger.info(f"Webhook server listening on {self.address[0]}:{self.address[1]}{self.path}")
+
+    def stop(self) -> None:
+        """Stop serving and close the socket"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+
+def post_payload(url: str, payload: Dict, secret: str = None, event: str = 'push',
+                 provider: str = 'github') -> tuple:
+    """POST a (recorded) payload the way GitHub or GitLab would; returns (status, body)"""
+    import urllib.request
+    import urllib.error
+
+    body = json.dumps(payload).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if provider == 'gitlab':
+        headers['X-Gitlab-Event'] = 'Push Hook' if event == 'push' else event
+        if secret:
+            headers['X-Gitlab-Token'] = secret
+    else:
+        headers['X-GitHub-Event'] = event
+        if secret:
+            headers['X-Hub-Signature-256'] = compute_signature(body, secret)
+
+    request = urllib.request.Request(url, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode('utf-8')
+
+
+if __name__ == '__main__':
+    # Stand-in sender: replay recorded payloads against a running receiver
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay recorded push webhook payloads')
+    parser.add_argument('payloads', nargs='+', help='JSON payload files')
+    parser.add_argument('--url', default='http://127.0.0.1:8085/webhook')
+    parser.add_argument('--secret', default=None)
+    parser.add_argument('--provider', choices=['github', 'gitlab'], default='github')
+    args = parser.parse_args()
+
+    for payload_file in args.payloads:
+        with open(payload_file, 'r', encoding='utf-8') as f:
+            status, response = post_payload(args.url, json.load(f), args.secret, provider=args.provider)
+        print(f"{payload_file}: {status} {response}")
@@ -0,0 +1,62 @@
+"""
+Analyzer tests: batched files are looked up once, requests respect the model's output limit
+"""
+import json
+import re
+from types import SimpleNamespace
+
+from src.ai_analyzer import AICodeAnalyzer, OpenAIAnalyzer
+from src.analysis_cache import AnalysisCache
+
+
+class FakeAnalyzer(AICodeAnalyzer):
+    """Answers every batched prompt with a clean result per file"""
+
+    provider_name = 'fake'
+
+    def __init__(self, cache):
+        super().__init__(cache=cache)
+        self.client = object()
+        self.model = 'fake-model'
+        self.batch_enabled = True
+        self.calls = 0
+
+    def _call_model(self, prompt):
+        self.calls += 1
+        files = re.findall(r'^File: (.+)$', prompt, re.MULTILINE)
+        results = [{'file': path, 'has_errors': False, 'severity': 'none', 'errors': [], 'summary': 'ok'}
+                   for path in files]
+        return json.dumps({'files': results}), {}
+
+
+def test_batched_files_count_one_lookup_each(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'cache.db'))
+    analyzer = FakeAnalyzer(cache)
+    files = [{'file_path': f'p1/f{index}.py', 'content': f'x = {index}\n'} for index in range(3)]
+
+    first = analyzer.analyze_files_batch(files)
+    assert analyzer.calls == 1
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    second = analyzer.analyze_files_batch(files)
+    assert analyzer.calls == 1
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert [result['file'] for result in second] == [result['file'] for result in first]
+
+
+def test_requests_send_the_clamped_output_limit():
+    sent = {}
+
+    def create(**kwargs):
+        sent.update(kwargs)
+        message = SimpleNamespace(content='{"has_errors": false}')
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+        return SimpleNamespace(headers={}, parse=lambda: response)
+
+    analyzer = OpenAIAnalyzer('sk-test', model='gpt-4-turbo')
+    analyzer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        with_raw_response=SimpleNamespace(create=create))))
+    analyzer.max_output_tokens = 10000
+
+    analyzer._call_model('Review this.\n\n### Input\nx = 1')
+    assert sent['max_tokens'] == analyzer.token_budget.max_output_tokens == 4096
@@ -0,0 +1,45 @@
+"""
+Changed-line parsing tests: paths from git diffs match the paths of the commit records
+"""
+import subprocess
+
+from src.diff_context import parse_changed_line_ranges, unquote_path
+from src.git_manager import GitManager
+
+
+def git(repo, *args):
+    subprocess.run(['git', '-c', 'user.name=Dev', '-c', 'user.email=dev@example.com', *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+def test_unquote_path():
+    assert unquote_path('"b/\\303\\244.py"') == 'b/ä.py'
+    assert unquote_path('"b/say \\"hi\\".py"') == 'b/say "hi".py'
+    assert unquote_path('"b/tab\\there.py"') == 'b/tab\there.py'
+    assert unquote_path('b/plain.py') == 'b/plain.py'
+
+
+def test_space_path_tab_is_stripped():
+    diff = '--- a/p 2/s.js\t\n+++ b/p 2/s.js\t\n@@ -1 +1,2 @@\n'
+    assert parse_changed_line_ranges(diff) == {'p 2/s.js': [(1, 2)]}
+
+
+def test_ranges_are_keyed_like_commit_records(tmp_path):
+    repo = str(tmp_path)
+    git(repo, 'init', '-q', '-b', 'dev')
+    files = ['p 2/s.js', 'p1/ä.py', 'p1/plain.py']
+    for path in files:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text('a\nb\n', encoding='utf-8')
+    git(repo, 'add', '.')
+    git(repo, 'commit', '-qm', 'first')
+    for path in files:
+        (tmp_path / path).write_text('a\nchanged\nc\n', encoding='utf-8')
+    git(repo, 'commit', '-qam', 'second')
+
+    manager = GitManager(repo, repo, 'dev')
+    record = manager.get_commit_records(max_count=1)[0]
+    ranges = manager.get_changed_line_ranges(record['hash'])
+
+    assert sorted(ranges) == sorted(record['modified_files']) == sorted(files)
+    assert all(ranges[path] == [(2, 3)] for path in files)
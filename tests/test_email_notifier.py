@@ -0,0 +1,128 @@
+"""
+Email notifier tests: messages are delivered through a local SMTP server over a reused session
+"""
+import socketserver
+import threading
+
+import pytest
+
+from src.email_notifier import EmailNotifier
+
+RESULTS = {'files': [{'file': 'p1/a.py', 'has_errors': True, 'errors': [{'line': 1, 'message': 'off by one'}]}]}
+
+
+class SMTPStub:
+    """Minimal SMTP server on a free loopback port that records sessions and messages.
+
+    With drop_after=N every session is cut (without a reply) at the MAIL
+    command following its N-th message, like a server dropping idle or
+    over-long sessions.
+    """
+
+    def __init__(self, drop_after=None):
+        self.drop_after = drop_after
+        self.messages = []
+        self.connections = 0
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f'{line}\r\n'.encode())
+
+            def handle(self):
+                stub.connections += 1
+                delivered = 0
+                self.reply('220 stub ESMTP')
+                for line in self.rfile:
+                    command = line.decode().strip().upper()
+                    if command.startswith(('EHLO', 'HELO')):
+                        self.reply('250 stub')
+                    elif command.startswith('MAIL'):
+                        if stub.drop_after is not None and delivered >= stub.drop_after:
+                            return
+                        self.reply('250 ok')
+                    elif command.startswith('RCPT') or command in ('RSET', 'NOOP'):
+                        self.reply('250 ok')
+                    elif command == 'DATA':
+                        self.reply('354 end with .')
+                        body = []
+                        for data in self.rfile:
+                            if data.rstrip(b'\r\n') == b'.':
+                                break
+                            body.append(data)
+                        stub.messages.append(b''.join(body))
+                        delivered += 1
+                        self.reply('250 queued')
+                    elif command == 'QUIT':
+                        self.reply('221 bye')
+                        return
+                    else:
+                        self.reply('502 not implemented')
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(**kwargs):
+        servers.append(SMTPStub(**kwargs))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def notifier(server, **kwargs) -> EmailNotifier:
+    return EmailNotifier('analyzer@example.com', None, '127.0.0.1', server.port, use_tls=False,
+                         retry_base_delay=0.01, **kwargs)
+
+
+def send(email_notifier: EmailNotifier, count: int) -> None:
+    for index in range(count):
+        assert email_notifier.send_error_notification('dev@example.com', 'Dev', 'dev', f'p{index}', RESULTS)
+
+
+def test_messages_share_one_session(smtp_server):
+    server = smtp_server()
+    email_notifier = notifier(server)
+    send(email_notifier, 10)
+    email_notifier.close()
+
+    assert len(server.messages) == 10
+    assert server.connections == 1
+    assert email_notifier.get_stats()['connections'] == 1
+
+
+def test_dropped_session_is_reopened_and_the_message_retried(smtp_server):
+    server = smtp_server(drop_after=3)
+    email_notifier = notifier(server, background=True)
+    send(email_notifier, 7)
+    email_notifier.close()
+
+    stats = email_notifier.get_stats()
+    assert len(server.messages) == 7
+    assert server.connections == 3
+    assert (stats['sent'], stats['failed'], stats['retries']) == (7, 0, 2)
+
+
+def test_flush_drains_the_queue_before_close(smtp_server):
+    server = smtp_server()
+    email_notifier = notifier(server, background=True)
+    send(email_notifier, 20)
+    email_notifier.flush()
+
+    stats = email_notifier.get_stats()
+    assert stats['queued'] == 0
+    assert stats['sent'] == len(server.messages) == 20
+    email_notifier.close()
+    assert server.connections == 1
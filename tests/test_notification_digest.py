@@ -0,0 +1,53 @@
+"""
+Digest collector tests: fixed issues and clean files leave the digest, pending digests persist
+"""
+from src.notification_digest import DigestCollector
+
+
+def commit(sha: str) -> dict:
+    return {'hash': sha, 'author_email': 'dev@example.com', 'author_name': 'Dev'}
+
+
+def report(file_path: str, *messages: str) -> dict:
+    return {
+        'folder_name': file_path.split('/')[0],
+        'file_name': file_path.split('/')[-1],
+        'file_path': file_path,
+        'analysis': {'has_errors': True, 'errors': [{'type': 'bug', 'message': m, 'line': 1} for m in messages]}
+    }
+
+
+def test_clean_file_clears_its_stale_issues():
+    collector = DigestCollector(window_seconds=3600)
+    collector.add(commit('c1'), 'dev', [report('p1/a.py', 'off by one'), report('p1/b.py', 'unused')])
+    collector.add(commit('c2'), 'dev', [], clean_files=['p1/a.py'])
+
+    digest, = collector.take_due(force=True)
+    assert [result['file'] for result in digest.file_results()] == ['p1/b.py']
+    assert digest.commits == ['c1', 'c2']
+
+
+def test_digest_fully_fixed_is_not_sent():
+    collector = DigestCollector(window_seconds=3600)
+    collector.add(commit('c1'), 'dev', [report('p1/a.py', 'off by one')])
+    collector.add(commit('c2'), 'dev', [], clean_files=['p1/a.py'])
+
+    assert collector.take_due(force=True) == []
+
+
+def test_clean_commit_without_a_pending_digest_is_ignored():
+    collector = DigestCollector(window_seconds=3600)
+    assert collector.add(commit('c1'), 'dev', [], clean_files=['p1/a.py']) is None
+    assert collector.pending_authors() == 0
+
+
+def test_pending_digests_are_restored_after_save(tmp_path):
+    state_file = str(tmp_path / 'digests.json')
+    collector = DigestCollector(window_seconds=3600, state_file=state_file)
+    collector.add(commit('c1'), 'dev', [report('p1/a.py', 'off by one')])
+    collector.save()
+
+    restored = DigestCollector(window_seconds=3600, state_file=state_file)
+    digest, = restored.take_due(force=True)
+    assert digest.commits == ['c1']
+    assert digest.issue_count == 1
@@ -0,0 +1,62 @@
+"""
+Rate limiter tests: coroutines wait for concurrency slots in order and never leak them
+"""
+import asyncio
+import threading
+
+from src.rate_limiter import AdaptiveConcurrency
+
+
+def test_async_waiters_are_served_in_order_within_the_limit():
+    concurrency = AdaptiveConcurrency(2)
+    order, peak = [], []
+
+    async def worker(index):
+        await concurrency.acquire_async()
+        peak.append(concurrency.in_flight)
+        order.append(index)
+        await asyncio.sleep(0.01)
+        concurrency.release()
+
+    async def main():
+        await asyncio.gather(*(worker(index) for index in range(8)))
+
+    asyncio.run(main())
+    assert order == list(range(8))
+    assert max(peak) <= 2
+    assert concurrency.in_flight == 0
+
+
+def test_release_from_a_thread_wakes_a_waiting_coroutine():
+    concurrency = AdaptiveConcurrency(1)
+    concurrency.acquire()
+
+    async def main():
+        waiter = asyncio.create_task(concurrency.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        threading.Thread(target=concurrency.release).start()
+        await asyncio.wait_for(waiter, 2)
+
+    asyncio.run(main())
+    assert concurrency.in_flight == 1
+
+
+def test_cancelled_waiter_gives_back_a_handed_over_slot():
+    concurrency = AdaptiveConcurrency(1)
+    concurrency.acquire()
+
+    async def main():
+        waiter = asyncio.create_task(concurrency.acquire_async())
+        await asyncio.sleep(0)
+        concurrency.release()
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        await asyncio.sleep(0.01)
+        assert concurrency.in_flight == 0
+        await asyncio.wait_for(concurrency.acquire_async(), 1)
+
+    asyncio.run(main())
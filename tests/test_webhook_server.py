@@ -0,0 +1,75 @@
+"""
+Webhook receiver tests: deliveries are replayed with post_payload against a local WebhookServer
+"""
+import pytest
+
+from src.webhook_server import PushQueue, WebhookServer, post_payload
+
+SECRET = 'test-secret'
+X, A, B = 'x' * 40, 'a' * 40, 'b' * 40
+
+
+def payload(before: str, after: str, branch: str = 'dev') -> dict:
+    return {
+        'ref': f'refs/heads/{branch}',
+        'before': before,
+        'after': after,
+        'repository': {'clone_url': 'https://github.com/org/repo.git'}
+    }
+
+
+@pytest.fixture
+def receiver():
+    """(push queue, url) of a receiver listening on a free loopback port"""
+    pushes = PushQueue()
+    server = WebhookServer(pushes, '127.0.0.1', 0, SECRET, '/webhook')
+    server.start()
+    host, port = server.address
+    yield pushes, f'http://{host}:{port}/webhook'
+    server.stop()
+
+
+def test_retry_does_not_roll_back_a_newer_pending_push(receiver):
+    pushes, url = receiver
+
+    assert post_payload(url, payload(X, A), SECRET)[0] == 202
+    in_progress = pushes.get(timeout=1)
+    assert (in_progress['before'], in_progress['after']) == (X, A)
+
+    # A newer push arrives while x..a is being analyzed, then x..a fails
+    assert post_payload(url, payload(A, B), SECRET)[0] == 202
+    pushes.retry(in_progress)
+
+    merged = pushes.get(timeout=1)
+    assert (merged['before'], merged['after']) == (X, B)
+    assert pushes.get(timeout=0.1) is None
+
+
+def test_redelivered_push_is_dropped(receiver):
+    pushes, url = receiver
+
+    post_payload(url, payload(X, A), SECRET)
+    assert pushes.get(timeout=1)['after'] == A
+    post_payload(url, payload(X, A), SECRET)
+    assert pushes.get(timeout=0.1) is None
+
+
+def test_out_of_order_delivery_keeps_the_newest_after():
+    history = [X, A, B]
+
+    def is_ancestor(commit, descendant, push):
+        return history.index(commit) <= history.index(descendant)
+
+    pushes = PushQueue(is_ancestor=is_ancestor)
+    pushes.add({'branch': 'dev', 'before': A, 'after': B})
+    pushes.add({'branch': 'dev', 'before': X, 'after': A})
+
+    merged = pushes.get(timeout=1)
+    assert (merged['before'], merged['after']) == (X, B)
+
+
+def test_bad_signature_is_rejected(receiver):
+    pushes, url = receiver
+
+    assert post_payload(url, payload(X, A), 'wrong-secret')[0] == 401
+    assert len(pushes) == 0